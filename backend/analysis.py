@@ -0,0 +1,1759 @@
+"""
+analysis.py
+
+This module defines numerical analyses working directly on the numeric MNA system of a circuit, (G + pC).x = b,
+instead of the polynomial coefficients of a symbolic transfer function.
+
+Classes:
+    ACAnalysis: Batched small-signal frequency sweep of every node voltage and branch current.
+    TuningSession: Interactive re-solve on component value changes with low-rank (Sherman-Morrison-Woodbury) updates.
+    ParameterSweep: Vectorized parameter sweep and Monte Carlo tolerance analysis of a transfer function.
+    PoleZeroAnalysis: Poles, zeros, damping and Q from generalized eigenvalue problems (QZ) on the MNA pencil (G, C).
+    SensitivityAnalysis: Adjoint sensitivities of a transfer function and of its cutoff frequency to every component value.
+    StateSpaceModel: State-space realization (A, B, C, D) of the MNA descriptor system, with cached discretizations.
+    ReducedOrderModel: Passive reduced-order state-space model of a large RC/RLC network (PRIMA, block Arnoldi moment matching).
+    TransientAnalysis: Fixed-step backward Euler / trapezoidal time-domain simulation of every node voltage and branch current.
+    Step, Pulse, Sine, PWL: Source waveforms of the transient analysis.
+
+Functions:
+    tunableComponents: Low-rank description of how each component value enters the MNA system.
+    smallSignalExcitation: Excitation vector of the small-signal analyses, unit sources when every source is at zero.
+"""
+
+import numpy as np
+import scipy.linalg
+import logging
+from collections import OrderedDict
+
+TINY = np.sqrt(np.finfo(float).tiny) # Below it, products of two values are subnormal, see _flushTiny
+
+
+class ACAnalysis:
+    """
+    Solves (G + jwC).x = b for many angular frequencies at once with a batched numpy linalg.solve.
+
+    Attributes:
+        G (numpy.ndarray): Dense conductance and incidence matrix.
+        C (numpy.ndarray): Dense susceptance matrix.
+        b (numpy.ndarray): Excitation vector.
+        labels (list): Label of each unknown (e.g. 'v_1', 'i_V1'), in column order.
+        maxBatchBytes (int): Memory bound of one stacked batch of matrices.
+    """
+    def __init__(self, G, C, b, labels, maxBatchBytes=64 * 2**20):
+        self.G = G.toarray() if hasattr(G, 'toarray') else np.asarray(G, dtype=float)
+        self.C = C.toarray() if hasattr(C, 'toarray') else np.asarray(C, dtype=float)
+        self.b = np.asarray(b, dtype=float)
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.maxBatchBytes = maxBatchBytes
+
+    @classmethod
+    def fromSolver(cls, solver, **kwargs):
+        """
+        Build the analysis from the numeric MNA system of a Solver.
+
+        Args:
+            solver (Solver): A solver whose components all have a numerical value.
+
+        Returns:
+            ACAnalysis: The analysis of the circuit of the solver.
+        """
+        G, C, _ = solver.getNumericSystem()
+        return cls(G, C, smallSignalExcitation(solver), solver.numericMNA.unknownLabels(), **kwargs)
+
+    def defaultFrequencies(self, points=1000):
+        """
+        Build a logarithmic grid of angular frequencies spanning the natural frequencies of the circuit.
+
+        Args:
+            points (int): Number of frequencies.
+
+        Returns:
+            numpy.ndarray: The angular frequencies in rad/s.
+        """
+        magnitudes = np.array([])
+        if self.C.any():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                eigenvalues = scipy.linalg.eigvals(self.G, -self.C)
+            magnitudes = np.abs(eigenvalues[np.isfinite(eigenvalues)])
+            magnitudes = magnitudes[magnitudes > 0]
+        if magnitudes.size == 0:
+            return np.logspace(0, 6, points)
+        low = np.floor(np.log10(magnitudes.min())) - 1
+        high = np.ceil(np.log10(magnitudes.max())) + 1
+        return np.logspace(low, high, points)
+
+    def solve(self, w):
+        """
+        Solve the system for every angular frequency, in batches bounded by maxBatchBytes.
+
+        Args:
+            w (array-like): The angular frequencies in rad/s.
+
+        Returns:
+            numpy.ndarray: Complex array of shape (len(w), number of unknowns).
+        """
+        w = np.atleast_1d(np.asarray(w, dtype=float))
+        n = len(self.labels)
+        batch = max(1, int(self.maxBatchBytes // (16 * n * n))) if n else len(w)
+        X = np.empty((len(w), n), dtype=complex)
+        for start in range(0, len(w), batch):
+            wk = w[start:start + batch]
+            A = self.G[None, :, :] + 1j * wk[:, None, None] * self.C[None, :, :]
+            rhs = np.broadcast_to(self.b, (len(wk), n))[:, :, None]
+            X[start:start + batch] = np.linalg.solve(A, rhs)[:, :, 0]
+        return X
+
+    def sweep(self, w=None, outputs=None):
+        """
+        Compute the complex phasor of the requested node voltages and branch currents in one pass.
+
+        Args:
+            w (array-like): The angular frequencies in rad/s, defaultFrequencies() if None.
+            outputs (list): Labels of the unknowns to return (e.g. ['v_3', 'i_V1']), all of them if None. 'v_0' is the ground.
+
+        Returns:
+            tuple: A tuple containing the frequency array and a dictionary of key label and value the complex response array.
+
+        Raises:
+            ValueError: If an output label is not an unknown of the circuit.
+        """
+        w = self.defaultFrequencies() if w is None else np.atleast_1d(np.asarray(w, dtype=float))
+        outputs = self.labels if outputs is None else list(outputs)
+        for label in outputs:
+            if label not in self.index and label != 'v_0':
+                raise ValueError(f"Unknown output '{label}', expected one of {self.labels}.")
+        logging.info(f"Starting AC sweep over {len(w)} frequencies.")
+        X = self.solve(w)
+        logging.info("Finished AC sweep.")
+        return w, {label: X[:, self.index[label]] if label in self.index else np.zeros(len(w), dtype=complex) for label in outputs}
+
+    def getFrequencyResponse(self, w=None, outputs=None, reference=None):
+        """
+        Return the magnitude (dB) and phase (degrees) of the requested outputs, as scipy.signal.bode does.
+
+        Args:
+            w (array-like): The angular frequencies in rad/s, defaultFrequencies() if None.
+            outputs (list): Labels of the unknowns to return, all of them if None.
+            reference (str): Optional label of the input, every output is then divided by it (transfer function).
+
+        Returns:
+            tuple: A tuple containing the frequency array and two dictionaries (magnitude and phase) keyed by label.
+
+        Raises:
+            ValueError: If a label is not an unknown of the circuit, or the reference does not depend on the sources.
+        """
+        requested = list(self.labels if outputs is None else outputs)
+        w, responses = self.sweep(w, requested + ([reference] if reference else []))
+        if reference:
+            if not responses[reference].any():
+                raise ValueError(f"The input '{reference}' is not driven by any source: the transfer function is undefined.")
+            responses = {label: responses[label] / responses[reference] for label in requested}
+        with np.errstate(divide='ignore'):
+            mag = {label: 20 * np.log10(np.abs(H)) for label, H in responses.items()}
+        phase = {label: np.rad2deg(np.unwrap(np.angle(H))) for label, H in responses.items()}
+        return w, mag, phase
+
+    def getTransferFunctionResponse(self, inputNode, outputNode, w=None):
+        """
+        Return the Bode diagram of V_outputNode / V_inputNode.
+
+        Args:
+            inputNode (str): The node where the input voltage is applied.
+            outputNode (str): The node where the output voltage is measured.
+            w (array-like): The angular frequencies in rad/s, defaultFrequencies() if None.
+
+        Returns:
+            tuple: A tuple containing the frequency array, magnitude array (dB) and phase array (degrees).
+        """
+        output = f'v_{outputNode}'
+        w, mag, phase = self.getFrequencyResponse(w, [output], reference=f'v_{inputNode}')
+        return w, mag[output], phase[output]
+
+
+def tunableComponents(solver, kinds=None):
+    """
+    Describe how the value of each component enters the numeric MNA system: A(p) = G + pC changes by d.u.v^T
+    for a resistor (d = 1/R, in G), a capacitor (d = C, in C) or an inductor (d = -L, in C), and b changes by d.u for a source.
+
+    Args:
+        solver (Solver): A solver whose components all have a numerical value.
+        kinds (str): Only describe the components of these kinds (e.g. 'b' for the sources), all of them if None.
+
+    Returns:
+        tuple: A tuple containing a dictionary {name: (kind, u, v, coefficient)}, kind being 'G', 'C' or 'b' and coefficient
+        the function of the value giving d, and a dictionary {name: value} of the current values.
+    """
+    from solver import Resistor, Capacitor, Inductor, VoltageSource, CurrentSource # solver imports this module
+    solver.getNumericSystem()
+    mna, n = solver.numericMNA, solver.numericMNA.size
+
+    def vector(*entries):
+        u = np.zeros(n)
+        for index, coefficient in entries:
+            if index is not None:
+                u[index] += coefficient
+        return u
+
+    kindOf = ((Resistor, 'G'), (Capacitor, 'C'), (Inductor, 'C'), (VoltageSource, 'b'), (CurrentSource, 'b'))
+    tunables, values = {}, {}
+    for component in solver.circuit.components:
+        if component.isVirtual or component.name not in solver.paramValues:
+            continue
+        if kinds is not None and not any(isinstance(component, cls) and kind in kinds for cls, kind in kindOf):
+            continue
+        i, j = mna.node(component.nodes[0]), mna.node(component.nodes[1])
+        if isinstance(component, Resistor):
+            u = vector((i, 1), (j, -1))
+            tunables[component.name] = ('G', u, u, lambda value: 1 / value)
+        elif isinstance(component, Capacitor):
+            u = vector((i, 1), (j, -1))
+            tunables[component.name] = ('C', u, u, lambda value: value)
+        elif isinstance(component, Inductor):
+            branch = mna.branchIndex[component.name]
+            tunables[component.name] = ('C', vector((mna.constraintRows[component.name], 1)), vector((branch, 1)), lambda value: -value)
+        elif isinstance(component, VoltageSource) and component.name in mna.constraintRows:
+            tunables[component.name] = ('b', vector((mna.constraintRows[component.name], 1)), None, lambda value: value)
+        elif isinstance(component, CurrentSource):
+            tunables[component.name] = ('b', vector((i, -1), (j, 1)), None, lambda value: value)
+        else:
+            continue
+        values[component.name] = solver.paramValues[component.name]
+    return tunables, values
+
+
+def smallSignalExcitation(solver):
+    """
+    Return the excitation vector of the small-signal analyses (frequency response, poles and zeros, sensitivities).
+    They are linear in the sources: a transfer function does not depend on the source amplitudes, but it is undefined
+    when every source is at zero (e.g. a 0 V input source), the whole response being zero. The sources are then taken
+    at unit value, as the AC sources of SPICE.
+
+    Args:
+        solver (Solver): A solver whose components all have a numerical value.
+
+    Returns:
+        numpy.ndarray: The excitation vector b of the netlist values, or the sum of the source vectors if b is zero.
+    """
+    _, _, b = solver.getNumericSystem()
+    if b.any():
+        return b
+    tunables, _ = tunableComponents(solver, kinds='b')
+    if not tunables:
+        return b
+    logging.info("Every source is at zero, the small-signal analyses use unit sources.")
+    return np.sum([u for kind, u, v, coefficient in tunables.values()], axis=0)
+
+
+class TuningSession(ACAnalysis):
+    """
+    Keeps the solved MNA system of a circuit and updates the solution when component values change, without refactoring.
+
+    A resistor, capacitor or inductor value change is a rank-1 change of A(p) = G + pC: A(p) + d(p).u.v^T.
+    The solutions x0 = A0^-1.b are computed once for the DC point and every frequency of the grid, and the column
+    Y_k = A0^-1.u_k of a component the first time its value changes. The Sherman-Morrison-Woodbury formula then gives
+    x = x0 - Y_S.(I + D.V_S^T.Y_S)^-1.D.V_S^T.x0 for the set S of modified components.
+    A source value change only moves the right-hand side: x0 is shifted by the corresponding column.
+    Only the columns of the modified components are kept, (1 + maxRank + number of sources) vectors per point at most,
+    instead of one per tunable component.
+
+    Attributes:
+        w (numpy.ndarray): The angular frequencies of the precomputed grid, in rad/s.
+        tunables (dict): Tunable component name -> (kind, u, v, coefficient), kind being 'G', 'C' or 'b'.
+        values (dict): Current value of each tunable component.
+        maxRank (int): Number of simultaneously modified components above which the base system is refactored.
+    """
+    def __init__(self, G, C, b, labels, tunables, values, w=None, maxRank=8, **kwargs):
+        super().__init__(G, C, b, labels, **kwargs)
+        self.tunables = tunables
+        self.values = dict(values)
+        self.baseValues = dict(values) # Values the precomputed solutions correspond to
+        self.maxRank = maxRank
+        self.w = super().defaultFrequencies() if w is None else np.atleast_1d(np.asarray(w, dtype=float))
+        self.names = list(tunables)
+        self.points = {'dc': np.zeros(1, dtype=complex), 'ac': 1j * self.w}
+        self.rebase()
+
+    @classmethod
+    def fromSolver(cls, solver, w=None, **kwargs):
+        """
+        Build the session from a Solver whose components all have a numerical value.
+
+        Args:
+            solver (Solver): The solver of the circuit.
+            w (array-like): The angular frequencies of the grid, defaultFrequencies() if None.
+
+        Returns:
+            TuningSession: The session, ready for setValue.
+        """
+        G, C, b = solver.getNumericSystem()
+        tunables, values = tunableComponents(solver)
+        return cls(G, C, b, solver.numericMNA.unknownLabels(), tunables, values, w=w, **kwargs)
+
+    def currentSystem(self):
+        """
+        Return the dense matrices G, C and the vector b with the current values folded in.
+
+        Returns:
+            tuple: A tuple containing G, C and b as numpy arrays.
+        """
+        G, C, b = self.G.copy(), self.C.copy(), self.b.copy()
+        for name, value in self.values.items():
+            kind, u, v, coefficient = self.tunables[name]
+            delta = coefficient(value) - coefficient(self.baseValues[name])
+            if kind == 'b':
+                b += delta * u
+            elif delta != 0:
+                (G if kind == 'G' else C)[:, :] += delta * np.outer(u, v)
+        return G, C, b
+
+    def rebase(self):
+        """
+        Fold the current values into G, C and b, then solve x0 at the DC point and on the frequency grid.
+        The columns of the components are dropped and computed again when needed.
+        """
+        logging.info("Starting to factorize the tuning session.")
+        self.G, self.C, self.b = self.currentSystem()
+        self.baseValues = dict(self.values)
+        self.columns = {'dc': {}, 'ac': {}} # Grid -> component name -> A0^-1.u at every point
+        self.x0 = {}
+        try:
+            self.x0['dc'] = self._solveColumns(self.points['dc'], self.b[:, None])[:, :, 0]
+        except np.linalg.LinAlgError:
+            self.x0['dc'] = None # No DC operating point, e.g. a node only connected through capacitors
+        self.x0['ac'] = self._solveColumns(self.points['ac'], self.b[:, None])[:, :, 0]
+        logging.info("Finished factorizing the tuning session.")
+
+    def _solveColumns(self, s, U):
+        # Solve A0(s).Z = U for every point s, in batches bounded by maxBatchBytes
+        n, m = len(self.labels), U.shape[1]
+        batch = max(1, int(self.maxBatchBytes // (16 * n * (n + m)))) if n else len(s)
+        Z = np.empty((len(s), n, m), dtype=complex)
+        for start in range(0, len(s), batch):
+            sk = s[start:start + batch]
+            A = self.G[None, :, :] + sk[:, None, None] * self.C[None, :, :]
+            Z[start:start + batch] = np.linalg.solve(A, np.broadcast_to(U, (len(sk), n, m)))
+        return Z
+
+    def _columnsOf(self, grid, names):
+        """
+        Return the columns A0^-1.u of components on a grid, solving the missing ones in one batched solve.
+
+        Args:
+            grid (str): 'dc' or 'ac'.
+            names (list): Names of tunable components.
+
+        Returns:
+            numpy.ndarray: The columns, shape (number of points, n, len(names)).
+        """
+        columns = self.columns[grid]
+        missing = [name for name in names if name not in columns]
+        if missing:
+            Z = self._solveColumns(self.points[grid], np.column_stack([self.tunables[name][1] for name in missing]))
+            for k, name in enumerate(missing):
+                columns[name] = Z[:, :, k].copy()
+        return np.stack([columns[name] for name in names], axis=2)
+
+    def setValue(self, name, value):
+        """
+        Change the value of one component. The solution is updated on the next request.
+
+        Args:
+            name (str): The name of a resistor, capacitor, inductor or independent source.
+            value (float): The new value, in SI units.
+
+        Raises:
+            ValueError: If the component cannot be tuned or the value is not valid.
+        """
+        if name not in self.tunables:
+            raise ValueError(f"Component '{name}' cannot be tuned, expected one of {self.names}.")
+        if self.tunables[name][0] != 'b' and value == 0:
+            raise ValueError(f"The value of '{name}' must not be zero.")
+        self.values[name] = float(value)
+        modified = [other for other in self.names if self.tunables[other][0] != 'b' and self.values[other] != self.baseValues[other]]
+        if len(modified) > self.maxRank:
+            self.rebase()
+
+    def _update(self, grid):
+        """
+        Apply the Sherman-Morrison-Woodbury update of the current values to the base solutions of a grid.
+
+        Args:
+            grid (str): 'dc' or 'ac'.
+
+        Returns:
+            numpy.ndarray: The solutions, shape (number of points, n).
+        """
+        x, s = self.x0[grid].copy(), self.points[grid]
+        changed = [name for name in self.names if self.values[name] != self.baseValues[name]]
+        if not changed:
+            return x
+        Z = self._columnsOf(grid, changed)
+        modified, deltas = [], []
+        for k, name in enumerate(changed):
+            kind, u, v, coefficient = self.tunables[name]
+            delta = coefficient(self.values[name]) - coefficient(self.baseValues[name])
+            if kind == 'b':
+                x += delta * Z[:, :, k]
+            else:
+                modified.append(k)
+                deltas.append(np.full(len(s), delta, dtype=complex) if kind == 'G' else delta * s)
+        if not modified:
+            return x
+        Y = Z[:, :, modified] # (P, n, k)
+        V = np.column_stack([self.tunables[changed[k]][2] for k in modified]) # (n, k)
+        D = np.stack(deltas, axis=1) # (P, k)
+        VtY = V.T @ Y # (P, k, k)
+        rhs = D * (x @ V)
+        if len(modified) == 1: # Sherman-Morrison
+            return x - Y[:, :, 0] * (rhs / (1 + D * VtY[:, :, 0]))
+        M = np.eye(len(modified))[None, :, :] + D[:, :, None] * VtY
+        return x - (Y @ np.linalg.solve(M, rhs[:, :, None]))[:, :, 0]
+
+    def getSolution(self):
+        """
+        Return the DC operating point (p = 0) with the current values.
+
+        Returns:
+            dict: A dictionary of key unknown label (e.g. 'v_1', 'i_V1') and value the numerical value.
+
+        Raises:
+            ValueError: If the circuit has no DC operating point.
+        """
+        if self.x0['dc'] is None:
+            raise ValueError("The circuit has no DC operating point.")
+        x = self._update('dc')[0].real
+        return dict(zip(self.labels, x.tolist()))
+
+    def solve(self, w):
+        """
+        Solve the system with the current values: low-rank update on the session grid, batched solve otherwise.
+
+        Args:
+            w (array-like): The angular frequencies in rad/s.
+
+        Returns:
+            numpy.ndarray: Complex array of shape (len(w), number of unknowns).
+        """
+        w = np.atleast_1d(np.asarray(w, dtype=float))
+        if np.array_equal(w, self.w):
+            return self._update('ac')
+        return ACAnalysis(*self.currentSystem(), self.labels, self.maxBatchBytes).solve(w)
+
+    def defaultFrequencies(self, points=1000):
+        """
+        Return the frequency grid of the session, the only one that benefits from the low-rank updates.
+        """
+        return self.w
+
+
+class ParameterSweep:
+    """
+    Evaluates the transfer function V_outputNode / V_inputNode for many sets of component values in one batched computation.
+
+    With a symbolic solver, the coefficients in p of the compiled transfer function (Solver.getCompiledTransferFunction)
+    are evaluated on every sample at once. With a numeric solver, the MNA system of every sample is built with the low-rank description of
+    tunableComponents and solved in batches.
+
+    Attributes:
+        solver (Solver): The solver of the circuit.
+        inputNode (str): The node where the input voltage is applied.
+        outputNode (str): The node where the output voltage is measured.
+        parameters (list): Names of the components the transfer function depends on.
+        nominal (dict): Value of each component given in the netlist.
+        w (numpy.ndarray): The angular frequencies in rad/s, derived from the nominal poles if None.
+        maxBatchBytes (int): Memory bound of one batch.
+    """
+    ENVELOPES = {'min': 0, 'p5': 5, 'p50': 50, 'p95': 95, 'max': 100} # Percentiles of the response envelopes
+    DEFAULT_SAMPLES = 1000
+
+    def __init__(self, solver, inputNode, outputNode, w=None, points=200, maxBatchBytes=64 * 2**20):
+        self.solver = solver
+        self.inputNode = inputNode
+        self.outputNode = outputNode
+        self.points = points
+        self.maxBatchBytes = maxBatchBytes
+        self.w = None if w is None else np.atleast_1d(np.asarray(w, dtype=float))
+        self.nominal = {component.name: component.value for component in solver.circuit.components if not component.isVirtual and component.value is not None}
+        if solver.mode == 'symbolic':
+            self.compiled = solver.getCompiledTransferFunction(inputNode, outputNode)
+            self.parameters = list(self.compiled.parameters)
+        else:
+            self.tunables, _ = tunableComponents(solver)
+            G, C, _ = solver.getNumericSystem()
+            self.G, self.C, self.b = G.toarray(), C.toarray(), smallSignalExcitation(solver)
+            self.index = {label: i for i, label in enumerate(solver.numericMNA.unknownLabels())}
+            for node in (inputNode, outputNode):
+                if f'v_{node}' not in self.index:
+                    raise ValueError(f"Node '{node}' is not a (non-ground) node of the circuit.")
+            self.parameters = list(self.tunables)
+
+    def sample(self, spec=None, count=None, seed=None):
+        """
+        Draw the values of every parameter.
+
+        Args:
+            spec (dict): Component name -> fixed number, array of values, or tolerance {'tolerance': 0.05, 'distribution': 'uniform' or 'normal', 'nominal': value}.
+                A normal tolerance is read as 3 standard deviations. Components absent from spec keep their nominal value.
+            count (int): Number of samples, the length of the given arrays or DEFAULT_SAMPLES if None.
+            seed (int): Seed of the random generator.
+
+        Returns:
+            dict: Component name -> numpy array of count values.
+
+        Raises:
+            ValueError: If a component is unknown, has no value, or the array lengths do not match.
+        """
+        spec = dict(spec or {})
+        for name in spec:
+            if name not in self.parameters and name not in self.nominal:
+                raise ValueError(f"Unknown component '{name}', expected one of {self.parameters}.")
+        if count is None:
+            lengths = {len(value) for value in spec.values() if isinstance(value, (list, tuple, np.ndarray))}
+            if len(lengths) > 1:
+                raise ValueError(f"The value arrays have different lengths: {sorted(lengths)}.")
+            count = lengths.pop() if lengths else self.DEFAULT_SAMPLES
+        generator = np.random.default_rng(seed)
+        samples = {}
+        for name in self.parameters:
+            value = spec.get(name, self.nominal.get(name))
+            if isinstance(value, dict):
+                nominal = value.get('nominal', self.nominal.get(name))
+                if nominal is None:
+                    raise ValueError(f"Component '{name}' has no nominal value.")
+                tolerance = value.get('tolerance', 0)
+                distribution = value.get('distribution', 'uniform')
+                if distribution == 'uniform':
+                    samples[name] = nominal * (1 + generator.uniform(-tolerance, tolerance, count))
+                elif distribution == 'normal':
+                    samples[name] = nominal * (1 + generator.normal(0, tolerance / 3, count))
+                else:
+                    raise ValueError(f"Unknown distribution '{distribution}', expected 'uniform' or 'normal'.")
+            elif isinstance(value, (list, tuple, np.ndarray)):
+                if len(value) != count:
+                    raise ValueError(f"Component '{name}' has {len(value)} values for {count} samples.")
+                samples[name] = np.asarray(value, dtype=float)
+            elif value is None:
+                raise ValueError(f"Component '{name}' has no value.")
+            else:
+                samples[name] = np.full(count, float(value))
+        return samples
+
+    def run(self, spec=None, count=None, seed=None):
+        """
+        Evaluate the transfer function on every sample.
+
+        Args:
+            spec (dict): The values of the components, see sample.
+            count (int): Number of samples.
+            seed (int): Seed of the random generator.
+
+        Returns:
+            dict: A dictionary with the frequency array 'w', the drawn 'samples', the 'dcGain' and the -3 dB 'cutoff' (rad/s, NaN when
+            the response never falls 3 dB below its DC gain) of every sample, and the 'magnitude' (dB) and 'phase' (degrees) envelopes
+            (min, p5, p50, p95, max) at every frequency.
+        """
+        samples = self.sample(spec, count, seed)
+        count = len(next(iter(samples.values()))) if samples else (count or 1)
+        logging.info(f"Starting parameter sweep over {count} samples.")
+        if self.solver.mode == 'symbolic':
+            dcGain, H = self._evaluateSymbolic(samples, count)
+        else:
+            dcGain, H = self._evaluateNumeric(samples, count)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            magnitude = 20 * np.log10(np.abs(H))
+            phase = np.rad2deg(np.unwrap(np.angle(H), axis=1))
+            cutoff = self._cutoff(self.w, magnitude, 20 * np.log10(np.abs(dcGain)))
+        logging.info("Finished parameter sweep.")
+        return {
+            'w': self.w,
+            'samples': samples,
+            'dcGain': dcGain,
+            'cutoff': cutoff,
+            'magnitude': self._envelopes(magnitude),
+            'phase': self._envelopes(phase),
+        }
+
+    def _envelopes(self, response):
+        # One partition for every percentile, along the contiguous axis
+        percentiles = np.percentile(np.ascontiguousarray(response.T), list(self.ENVELOPES.values()), axis=1)
+        return dict(zip(self.ENVELOPES, percentiles))
+
+    def _evaluateSymbolic(self, samples, count):
+        numerator, denominator = self.compiled.coefficients(samples)
+        # Coefficients in ascending powers of p
+        numerator = [np.broadcast_to(np.asarray(c, dtype=float), (count,)) for c in reversed(numerator)]
+        denominator = [np.broadcast_to(np.asarray(c, dtype=float), (count,)) for c in reversed(denominator)]
+        if self.w is None:
+            self.w = self._frequencies(np.array([c[0] for c in denominator]))
+        s = 1j * self.w
+        H = np.empty((count, len(s)), dtype=complex)
+        batch = max(1, int(self.maxBatchBytes // (32 * len(s))))
+        for start in range(0, count, batch):
+            stop = min(start + batch, count)
+            H[start:stop] = self._horner(numerator, start, stop, s) / self._horner(denominator, start, stop, s)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dcGain = numerator[0] / denominator[0]
+        return dcGain, H
+
+    @staticmethod
+    def _horner(coefficients, start, stop, s):
+        value = np.zeros((stop - start, len(s)), dtype=complex)
+        for c in reversed(coefficients):
+            value = value * s[None, :] + c[start:stop, None]
+        return value
+
+    def _frequencies(self, denominator):
+        # Grid spanning the nominal poles (roots in p of the first sample denominator) one decade beyond
+        roots = np.roots(np.trim_zeros(denominator[::-1], 'f')) if np.any(denominator) else np.array([])
+        magnitudes = np.abs(roots[np.isfinite(roots)])
+        magnitudes = magnitudes[magnitudes > 0]
+        if magnitudes.size == 0:
+            return np.logspace(0, 6, self.points)
+        return np.logspace(np.floor(np.log10(magnitudes.min())) - 1, np.ceil(np.log10(magnitudes.max())) + 1, self.points)
+
+    def _evaluateNumeric(self, samples, count):
+        if self.w is None:
+            self.w = ACAnalysis(self.G, self.C, self.b, list(self.index)).defaultFrequencies(self.points)
+        n = self.G.shape[0]
+        G = np.broadcast_to(self.G, (count, n, n)).copy()
+        C = np.broadcast_to(self.C, (count, n, n)).copy()
+        b = np.broadcast_to(self.b, (count, n)).copy()
+        for name, (kind, u, v, coefficient) in self.tunables.items():
+            delta = coefficient(samples[name]) - coefficient(self.solver.paramValues[name])
+            if kind == 'b':
+                b += delta[:, None] * u[None, :]
+            else:
+                (G if kind == 'G' else C)[:] += delta[:, None, None] * np.outer(u, v)[None, :, :]
+        inputIndex, outputIndex = self.index[f'v_{self.inputNode}'], self.index[f'v_{self.outputNode}']
+        s = np.concatenate([[0], 1j * self.w])
+        H = np.empty((count, len(s)), dtype=complex)
+        batch = max(1, int(self.maxBatchBytes // (16 * n * n * len(s))))
+        for start in range(0, count, batch):
+            stop = min(start + batch, count)
+            A = G[start:stop, None] + s[None, :, None, None] * C[start:stop, None]
+            rhs = np.broadcast_to(b[start:stop, None, :, None], A.shape[:3] + (1,))
+            X = np.linalg.solve(A, rhs)[..., 0]
+            H[start:stop] = X[:, :, outputIndex] / X[:, :, inputIndex]
+        return H[:, 0].real, H[:, 1:]
+
+    @staticmethod
+    def _cutoff(w, magnitude, dcGain):
+        """
+        Find the first frequency where the magnitude falls 3 dB below the DC gain, interpolated on a logarithmic scale.
+        """
+        below = magnitude < (dcGain - 10 * np.log10(2))[:, None]
+        first = np.argmax(below, axis=1)
+        valid = below.any(axis=1) & (first > 0) & np.isfinite(dcGain)
+        cutoff = np.full(len(magnitude), np.nan)
+        rows, k = np.nonzero(valid)[0], first[valid]
+        target = dcGain[rows] - 10 * np.log10(2)
+        m0, m1 = magnitude[rows, k - 1], magnitude[rows, k]
+        logw = np.log10(w)
+        cutoff[rows] = 10 ** (logw[k - 1] + (target - m0) / (m1 - m0) * (logw[k] - logw[k - 1]))
+        return cutoff
+
+
+class PoleZeroAnalysis:
+    """
+    Poles and zeros of the circuit computed from the MNA pencil, without any polynomial: the natural frequencies are the
+    generalized eigenvalues of G.v = p.(-C).v, computed with the QZ algorithm (scipy.linalg.eig). The infinite eigenvalues
+    of a singular C (algebraic equations) are dropped.
+
+    The zeros of the response of an unknown x_k are the finite eigenvalues of the bordered pencil
+    [[G, -b], [e_k^T, 0]] + p.[[C, 0], [0, 0]] (A(p).x = b.t with x_k = 0). With H = x_out / x_in, the zeros of H are the zeros of x_out
+    and its poles the zeros of x_in, the common roots cancelling (when a source sets x_in, the poles of H are the natural frequencies).
+
+    Attributes:
+        G (numpy.ndarray): Dense conductance and incidence matrix.
+        C (numpy.ndarray): Dense susceptance matrix.
+        b (numpy.ndarray): Excitation vector.
+        labels (list): Label of each unknown (e.g. 'v_1', 'i_V1'), in column order.
+        tolerance (float): Relative threshold under which an eigenvalue is infinite, or a pole and a zero cancel.
+    """
+    def __init__(self, G, C, b, labels, tolerance=1e-8):
+        self.G = G.toarray() if hasattr(G, 'toarray') else np.asarray(G, dtype=float)
+        self.C = C.toarray() if hasattr(C, 'toarray') else np.asarray(C, dtype=float)
+        self.b = np.asarray(b, dtype=float)
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.tolerance = tolerance
+
+    @classmethod
+    def fromSolver(cls, solver, **kwargs):
+        """
+        Build the analysis from the numeric MNA system of a Solver.
+
+        Args:
+            solver (Solver): A solver whose components all have a numerical value.
+
+        Returns:
+            PoleZeroAnalysis: The analysis of the circuit of the solver.
+        """
+        G, C, _ = solver.getNumericSystem()
+        return cls(G, C, smallSignalExcitation(solver), solver.numericMNA.unknownLabels(), **kwargs)
+
+    def _deflate(self, M0, M1):
+        """
+        Eliminate the algebraic unknowns (zero rows and columns of M1) with a Schur complement before the QZ algorithm:
+        det(M0 + p.M1) = det(M0_22).det(M0_11 - M0_12.M0_22^-1.M0_21 + p.M1_11) keeps the finite eigenvalues and the QZ
+        cost falls with the cube of the order. The pencil is kept whole when M0_22 is ill-conditioned.
+
+        Returns:
+            tuple: The deflated pencil (M0, M1).
+        """
+        rows = np.any(M1 != 0, axis=1)
+        columns = np.any(M1 != 0, axis=0)
+        if rows.sum() != columns.sum() or rows.all():
+            return M0, M1
+        G22 = M0[np.ix_(~rows, ~columns)]
+        if np.linalg.cond(G22) > 1 / (self.tolerance * 1e-4):
+            return M0, M1
+        X = np.linalg.solve(G22, M0[np.ix_(~rows, columns)])
+        return M0[np.ix_(rows, columns)] - M0[np.ix_(rows, ~columns)] @ X, M1[np.ix_(rows, columns)]
+
+    def _finiteEigenvalues(self, M0, M1):
+        """
+        Return the finite generalized eigenvalues p of (M0 + p.M1).v = 0.
+
+        Raises:
+            ValueError: If the pencil is singular (det(M0 + p.M1) = 0 for every p).
+        """
+        M0, M1 = self._deflate(M0, M1)
+        if M0.shape[0] == 0:
+            return np.zeros(0, dtype=complex)
+        alpha, beta = scipy.linalg.eig(M0, -M1, right=False, homogeneous_eigvals=True)
+        scale = max(np.abs(M0).max(initial=0), np.abs(M1).max(initial=0), 1e-300)
+        magnitude = np.hypot(np.abs(alpha), np.abs(beta))
+        if np.any(magnitude < self.tolerance * scale * 1e-6):
+            raise ValueError("The pencil is singular: the response does not depend on the sources.")
+        finite = np.abs(beta) > self.tolerance * magnitude
+        return alpha[finite] / beta[finite]
+
+    def getNaturalFrequencies(self):
+        """
+        Return the natural frequencies of the circuit, the roots of det(G + p.C), in rad/s.
+
+        Returns:
+            numpy.ndarray: The complex natural frequencies, sorted by magnitude.
+        """
+        poles = self._finiteEigenvalues(self.G, self.C)
+        return poles[np.argsort(np.abs(poles), kind='stable')]
+
+    def getZeros(self, label):
+        """
+        Return the zeros of the response of one unknown to the sources.
+
+        Args:
+            label (str): The label of the unknown (e.g. 'v_3', 'i_V1').
+
+        Returns:
+            numpy.ndarray: The complex zeros, sorted by magnitude.
+
+        Raises:
+            ValueError: If the label is not an unknown of the circuit or the unknown does not depend on the sources.
+        """
+        if label not in self.index:
+            raise ValueError(f"Unknown output '{label}', expected one of {self.labels}.")
+        n = len(self.labels)
+        M0, M1 = np.zeros((n + 1, n + 1)), np.zeros((n + 1, n + 1))
+        M0[:n, :n], M0[:n, n], M0[n, self.index[label]] = self.G, -self.b, 1
+        M1[:n, :n] = self.C
+        zeros = self._finiteEigenvalues(M0, M1)
+        return zeros[np.argsort(np.abs(zeros), kind='stable')]
+
+    def getPolesZeros(self, inputNode, outputNode):
+        """
+        Return the poles, zeros and gain of H = V_outputNode / V_inputNode = k.prod(p - z) / prod(p - p_i).
+
+        Args:
+            inputNode (str): The node where the input voltage is applied.
+            outputNode (str): The node where the output voltage is measured.
+
+        Returns:
+            tuple: A tuple containing the poles, the zeros (complex numpy arrays sorted by magnitude) and the gain k.
+        """
+        logging.info("Starting pole/zero extraction.")
+        zeros = list(self.getZeros(f'v_{outputNode}'))
+        poles = []
+        for pole in self.getZeros(f'v_{inputNode}'):
+            match = [k for k, zero in enumerate(zeros) if abs(zero - pole) <= self.tolerance * max(abs(pole), 1) * 1e2]
+            if match:
+                zeros.pop(min(match, key=lambda k: abs(zeros[k] - pole))) # Pole-zero cancellation
+            else:
+                poles.append(pole)
+        poles, zeros = np.array(poles, dtype=complex), np.array(zeros, dtype=complex)
+        # Gain from one evaluation away from the poles and zeros
+        roots = np.concatenate([poles, zeros])
+        s0 = 1j * (np.exp(np.mean(np.log(np.abs(roots[roots != 0])))) if np.any(roots != 0) else 1.0) * (1 + 1e-3) + 1e-3
+        x = np.linalg.solve(self.G + s0 * self.C, self.b)
+        H = x[self.index[f'v_{outputNode}']] / x[self.index[f'v_{inputNode}']]
+        with np.errstate(divide='ignore', over='ignore'): # Summed logarithms: inf only when k itself overflows, at high orders
+            gain = np.exp(np.log(complex(H)) + np.sum(np.log(s0 - poles)) - np.sum(np.log(s0 - zeros)))
+        gain = gain.real if abs(gain.imag) <= 1e-9 * abs(gain) else gain
+        logging.info("Finished pole/zero extraction.")
+        return poles, zeros, gain
+
+    @staticmethod
+    def describePoles(poles):
+        """
+        Describe every pole, a complex conjugate pair once, with its natural frequency, damping ratio and quality factor.
+
+        Args:
+            poles (array-like): The complex poles in rad/s.
+
+        Returns:
+            list: Dictionaries {"pole", "naturalFrequency" (rad/s), "damping", "Q", "pair"} sorted by natural frequency.
+        """
+        description = []
+        for pole in poles:
+            if pole.imag < 0 and np.any(np.isclose(poles, np.conj(pole), rtol=1e-9, atol=0)):
+                continue # The conjugate is described with its pair
+            wn = abs(pole)
+            damping = -pole.real / wn if wn > 0 else 1.0
+            description.append({
+                "pole": complex(pole),
+                "naturalFrequency": float(wn),
+                "damping": float(damping),
+                "Q": float(1 / (2 * damping)) if damping != 0 else float('inf'),
+                "pair": bool(pole.imag > 0),
+            })
+        return sorted(description, key=lambda item: item["naturalFrequency"])
+
+    def getStability(self, poles=None, tolerance=1e-9):
+        """
+        Classify the circuit from its poles, the natural frequencies if None.
+
+        Returns:
+            str: 'stable' (every pole in the left half-plane), 'marginal' (poles on the imaginary axis) or 'unstable'.
+        """
+        poles = self.getNaturalFrequencies() if poles is None else np.asarray(poles, dtype=complex)
+        if poles.size == 0:
+            return 'stable'
+        margin = poles.real / np.maximum(np.abs(poles), 1e-300)
+        if np.any((poles.real > 0) & (margin > tolerance)):
+            return 'unstable'
+        if np.any(np.abs(margin) <= tolerance):
+            return 'marginal'
+        return 'stable'
+
+
+class SensitivityAnalysis(ACAnalysis):
+    """
+    Sensitivities of the transfer function H = V_outputNode / V_inputNode to every component value, from one forward solve
+    A.x = b and one transposed (adjoint) solve A^T.lambda = c per frequency, whatever the number of components.
+
+    With c = (e_out - H.e_in) / x_in, the derivative of H with respect to a value q is dH/dq = lambda^T.(db/dq - dA/dq.x).
+    A component enters A(p) = G + pC as d(q).u.v^T (see tunableComponents), so that for every component at once
+    dH/dq = -d'(q).(lambda^T.u).(v^T.x), multiplied by p for a capacitor or an inductor, and dH/dq = lambda^T.u for a source.
+    The normalized sensitivity S = (q/H).dH/dq is complex: its real part is the sensitivity of the gain |H|, d ln|H| / d ln q,
+    its imaginary part the sensitivity of the phase in radians.
+
+    Attributes:
+        tunables (dict): Component name -> (kind, u, v, coefficient), kind being 'G', 'C' or 'b', see tunableComponents.
+        values (dict): Value of each component.
+        names (list): The component names, in column order of the sensitivity arrays.
+    """
+    def __init__(self, G, C, b, labels, tunables, values, **kwargs):
+        super().__init__(G, C, b, labels, **kwargs)
+        self.tunables = tunables
+        self.values = dict(values)
+        self.names = list(tunables)
+        n = len(self.labels)
+        kinds = [tunables[name][0] for name in self.names]
+        self.U = np.column_stack([tunables[name][1] for name in self.names]) if self.names else np.zeros((n, 0))
+        self.V = np.column_stack([tunables[name][2] if kind != 'b' else np.zeros(n) for name, kind in zip(self.names, kinds)]) if self.names else np.zeros((n, 0))
+        q = np.array([self.values[name] for name in self.names], dtype=float)
+        d = np.array([tunables[name][3](self.values[name]) for name in self.names], dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # d(q) is 1/q for a resistor (d' = -d/q), +/-q for a capacitor or an inductor (d' = d/q) and q for a source
+            self.derivatives = np.where(np.array(kinds) == 'G', -d / q, d / q) if self.names else np.zeros(0)
+        self.isDynamic = np.array([kind == 'C' for kind in kinds], dtype=bool)
+        self.isSource = np.array([kind == 'b' for kind in kinds], dtype=bool)
+        self.q = q
+
+    @classmethod
+    def fromSolver(cls, solver, **kwargs):
+        """
+        Build the analysis from the numeric MNA system of a Solver.
+
+        Args:
+            solver (Solver): A solver whose components all have a numerical value.
+
+        Returns:
+            SensitivityAnalysis: The analysis of the circuit of the solver.
+        """
+        G, C, _ = solver.getNumericSystem()
+        tunables, values = tunableComponents(solver)
+        return cls(G, C, smallSignalExcitation(solver), solver.numericMNA.unknownLabels(), tunables, values, **kwargs)
+
+    def _index(self, node):
+        label = f'v_{node}'
+        if label not in self.index:
+            raise ValueError(f"Node '{node}' is not a (non-ground) node of the circuit.")
+        return self.index[label]
+
+    def solveAdjoint(self, s, inputNode, outputNode):
+        """
+        Solve the forward and the adjoint systems at every point s of the Laplace variable, in batches bounded by maxBatchBytes.
+
+        Args:
+            s (numpy.ndarray): The complex points (0 for DC, jw for AC).
+            inputNode (str): The node where the input voltage is applied.
+            outputNode (str): The node where the output voltage is measured.
+
+        Returns:
+            tuple: A tuple containing H (len(s)), the solutions x and the adjoint solutions lambda (len(s), unknowns).
+        """
+        i, o = self._index(inputNode), self._index(outputNode)
+        n = len(self.labels)
+        batch = max(1, int(self.maxBatchBytes // (16 * n * n))) if n else len(s)
+        X = np.empty((len(s), n), dtype=complex)
+        Lambda = np.empty((len(s), n), dtype=complex)
+        for start in range(0, len(s), batch):
+            sk = s[start:start + batch]
+            A = self.G[None, :, :] + sk[:, None, None] * self.C[None, :, :]
+            x = np.linalg.solve(A, np.broadcast_to(self.b, (len(sk), n))[:, :, None])[:, :, 0]
+            c = np.zeros((len(sk), n), dtype=complex)
+            c[:, o] = 1 / x[:, i]
+            c[:, i] -= x[:, o] / x[:, i] ** 2
+            Lambda[start:start + batch] = np.linalg.solve(A.transpose(0, 2, 1), c[:, :, None])[:, :, 0]
+            X[start:start + batch] = x
+        return X[:, o] / X[:, i], X, Lambda
+
+    def _derivatives(self, s, X, Lambda):
+        # dH/dq of every component at every point: (len(s), components)
+        projected = (Lambda @ self.U) # lambda^T.u
+        dH = -self.derivatives[None, :] * projected * (X @ self.V)
+        dH = np.where(self.isDynamic[None, :], s[:, None] * dH, dH)
+        return np.where(self.isSource[None, :], projected, dH)
+
+    def getSensitivities(self, inputNode, outputNode, w=None):
+        """
+        Compute dH/dq and the normalized sensitivity (q/H).dH/dq of the transfer function to every component on a frequency grid.
+
+        Args:
+            inputNode (str): The node where the input voltage is applied.
+            outputNode (str): The node where the output voltage is measured.
+            w (array-like): The angular frequencies in rad/s (0 for the DC gain), defaultFrequencies() if None.
+
+        Returns:
+            tuple: A tuple containing the frequency array, H, and two dictionaries {component name: array over w}
+            of dH/dq and of the normalized sensitivities.
+        """
+        w = self.defaultFrequencies() if w is None else np.atleast_1d(np.asarray(w, dtype=float))
+        logging.info(f"Starting adjoint sensitivity analysis over {len(w)} frequencies.")
+        s = 1j * w
+        H, X, Lambda = self.solveAdjoint(s, inputNode, outputNode)
+        dH = self._derivatives(s, X, Lambda)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normalized = dH * self.q[None, :] / H[:, None]
+        logging.info("Finished adjoint sensitivity analysis.")
+        return w, H, {name: dH[:, k] for k, name in enumerate(self.names)}, {name: normalized[:, k] for k, name in enumerate(self.names)}
+
+    def getGainRanking(self, inputNode, outputNode, w=None):
+        """
+        Rank the components by their largest gain sensitivity |Re(S)| over the frequency grid.
+
+        Returns:
+            list: Tuples (component name, largest |d ln|H| / d ln q|), the most influential first.
+        """
+        _, _, _, normalized = self.getSensitivities(inputNode, outputNode, w)
+        scores = {name: float(np.nanmax(np.abs(sensitivity.real))) for name, sensitivity in normalized.items()}
+        return sorted(scores.items(), key=lambda item: -item[1])
+
+    def getCutoffSensitivities(self, inputNode, outputNode, w=None, iterations=4):
+        """
+        Compute the -3 dB cutoff frequency w_c (the first frequency 3 dB below the DC gain) and its sensitivity to every component.
+        With F(w, q) = ln|H(jw)| - ln|H(0)| + ln(2)/2, the cutoff is refined by Newton iterations on F(w_c) = 0
+        and dw_c/dq = -(dF/dq)/(dF/dw), every derivative coming from the adjoint solutions (dH/dp = -lambda^T.C.x).
+
+        Args:
+            inputNode (str): The node where the input voltage is applied.
+            outputNode (str): The node where the output voltage is measured.
+            w (array-like): The frequency grid the cutoff is bracketed on, defaultFrequencies() if None.
+            iterations (int): Newton iterations refining the cutoff.
+
+        Returns:
+            tuple: A tuple containing the cutoff w_c in rad/s and two dictionaries {component name: value}
+            of dw_c/dq and of the normalized sensitivities (q/w_c).dw_c/dq.
+
+        Raises:
+            ValueError: If the magnitude never falls 3 dB below the DC gain on the grid.
+        """
+        w = self.defaultFrequencies() if w is None else np.atleast_1d(np.asarray(w, dtype=float))
+        H0, X0, Lambda0 = self.solveAdjoint(np.zeros(1, dtype=complex), inputNode, outputNode)
+        level = np.log(np.abs(H0[0])) - np.log(2) / 2
+        H, _, _ = self.solveAdjoint(1j * w, inputNode, outputNode)
+        below = np.flatnonzero(np.log(np.abs(H)) < level)
+        if len(below) == 0 or below[0] == 0:
+            raise ValueError("The magnitude does not fall 3 dB below the DC gain on the frequency grid.")
+        k = below[0]
+        m0, m1 = np.log(np.abs(H[k - 1])), np.log(np.abs(H[k]))
+        cutoff = np.exp(np.log(w[k - 1]) + (level - m0) / (m1 - m0) * (np.log(w[k]) - np.log(w[k - 1])))
+        for iteration in range(iterations + 1):
+            Hc, Xc, Lambdac = self.solveAdjoint(np.array([1j * cutoff]), inputNode, outputNode)
+            dHds = -(Lambdac[0] @ self.C @ Xc[0])
+            dFdw = np.real(1j * dHds / Hc[0])
+            F = np.log(np.abs(Hc[0])) - level
+            if iteration == iterations or abs(F) < 1e-12 or dFdw == 0:
+                break
+            cutoff = max(cutoff - F / dFdw, cutoff / 2)
+        dFdq = np.real(self._derivatives(np.array([1j * cutoff]), Xc, Lambdac)[0] / Hc[0]) - np.real(self._derivatives(np.zeros(1), X0, Lambda0)[0] / H0[0])
+        dwdq = -dFdq / dFdw
+        return cutoff, dict(zip(self.names, dwdq.tolist())), dict(zip(self.names, (dwdq * self.q / cutoff).tolist()))
+
+
+class StateSpaceModel:
+    """
+    State-space realization x' = A.x + B.u, y = C.x + D.u of the descriptor system C_mna.x_mna' + G.x_mna = b(u) of the MNA,
+    the inputs u being the values of the independent sources and the outputs every node voltage and branch current.
+
+    The realization is computed once from the matrices, without expanding any polynomial: with the SVD C_mna = U.S.V^T
+    the unknowns split into the r differential coordinates z1 and the algebraic ones z2 = G22^-1.(B2.u - G21.z1),
+    which gives A = -S^-1.(G11 - G12.G22^-1.G21) and B = S^-1.(B1 - G12.G22^-1.B2).
+    A is then balanced (diagonal similarity) to improve the conditioning of its exponential.
+    The discretizations of a time step are cached, the inputs being interpolated linearly between the time points.
+
+    Attributes:
+        A, B (numpy.ndarray): State and input matrices.
+        C, D (numpy.ndarray): Output and feedthrough matrices, one row per unknown of the MNA system.
+        inputs (list): Names of the independent sources, in column order of B and D.
+        values (numpy.ndarray): Value of each source in the netlist.
+        labels (list): Label of each unknown (e.g. 'v_1', 'i_V1'), in row order of C and D.
+    """
+    MAX_DISCRETIZATIONS = 32
+
+    def __init__(self, G, C, sources, labels, tolerance=1e-12):
+        """
+        Args:
+            G (array-like): Conductance and incidence matrix of the MNA system.
+            C (array-like): Susceptance matrix of the MNA system.
+            sources (dict): Source name -> (u, value): the excitation vector is the sum of u.value.
+            labels (list): Label of each unknown.
+            tolerance (float): Relative threshold of the singular values of C_mna.
+
+        Raises:
+            ValueError: If the system has no state-space realization (impulsive modes, e.g. a loop of capacitors and voltage sources).
+        """
+        G = G.toarray() if hasattr(G, 'toarray') else np.asarray(G, dtype=float)
+        C = C.toarray() if hasattr(C, 'toarray') else np.asarray(C, dtype=float)
+        n = len(labels)
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.inputs = list(sources)
+        self.values = np.array([sources[name][1] for name in self.inputs], dtype=float)
+        Bmna = np.column_stack([sources[name][0] for name in self.inputs]) if self.inputs else np.zeros((n, 0))
+        U, S, Vt = np.linalg.svd(C) if n else (np.zeros((0, 0)), np.zeros(0), np.zeros((0, 0)))
+        r = int(np.sum(S > tolerance * S[0])) if S.size and S[0] > 0 else 0
+        Gh, Bh, V = U.T @ G @ Vt.T, U.T @ Bmna, Vt.T
+        G22 = Gh[r:, r:]
+        if r < n and np.linalg.cond(G22) > 1 / tolerance:
+            raise ValueError("The circuit has no state-space realization: its algebraic part is singular (impulsive modes).")
+        solve = lambda M: np.linalg.solve(G22, M) if r < n else M[:0]
+        X21, X2u = solve(Gh[r:, :r]), solve(Bh[r:]) # z2 = X2u.u - X21.z1
+        A = -(Gh[:r, :r] - Gh[:r, r:] @ X21) / S[:r, None]
+        B = (Bh[:r] - Gh[:r, r:] @ X2u) / S[:r, None]
+        Cx = V[:, :r] - V[:, r:] @ X21
+        self.D = V[:, r:] @ X2u
+        if r:
+            _, (scale, _) = scipy.linalg.matrix_balance(A, permute=False, separate=True)
+            A, B, Cx = A * scale[None, :] / scale[:, None], B / scale[:, None], Cx * scale[None, :]
+        self.A, self.B, self.C = A, B, Cx
+        self._discretizations = OrderedDict()
+
+    @classmethod
+    def fromSolver(cls, solver, **kwargs):
+        """
+        Build the realization of the numeric MNA system of a Solver.
+
+        Args:
+            solver (Solver): A solver whose components all have a numerical value.
+
+        Returns:
+            StateSpaceModel: The realization, every independent source being an input.
+        """
+        G, C, b = solver.getNumericSystem()
+        tunables, values = tunableComponents(solver)
+        sources = {name: (u, values[name]) for name, (kind, u, v, coefficient) in tunables.items() if kind == 'b'}
+        return cls(G, C, sources, solver.numericMNA.unknownLabels(), **kwargs)
+
+    @property
+    def order(self):
+        return self.A.shape[0]
+
+    def outputMatrices(self, outputs=None):
+        """
+        Return the rows of C and D of the requested outputs.
+
+        Args:
+            outputs (list): Labels of the unknowns (e.g. ['v_3', 'i_V1']), all of them if None. 'v_0' is the ground.
+
+        Returns:
+            tuple: A tuple containing the output labels, C and D.
+
+        Raises:
+            ValueError: If an output label is not an unknown of the circuit.
+        """
+        outputs = self.labels if outputs is None else list(outputs)
+        C, D = np.zeros((len(outputs), self.order)), np.zeros((len(outputs), len(self.inputs)))
+        for k, label in enumerate(outputs):
+            if label in self.index:
+                C[k], D[k] = self.C[self.index[label]], self.D[self.index[label]]
+            elif label != 'v_0':
+                raise ValueError(f"Unknown output '{label}', expected one of {self.labels}.")
+        return outputs, C, D
+
+    def inputColumn(self, name):
+        """
+        Return the column of an input source.
+
+        Raises:
+            ValueError: If the source is not an input of the model.
+        """
+        if name not in self.inputs:
+            raise ValueError(f"Unknown source '{name}', expected one of {self.inputs}.")
+        return self.inputs.index(name)
+
+    def discretize(self, step):
+        """
+        Discretize the model for a time step, with inputs interpolated linearly between the time points:
+        x_k+1 = Ad.x_k + B0.u_k + B1.u_k+1. The result is cached by step.
+
+        Args:
+            step (float): The time step in seconds.
+
+        Returns:
+            tuple: A tuple containing Ad, B0 and B1.
+        """
+        step = float(step)
+        cached = self._discretizations.get(step)
+        if cached is not None:
+            self._discretizations.move_to_end(step)
+            return cached
+        n, m = self.order, len(self.inputs)
+        M = np.zeros((n + 2 * m, n + 2 * m))
+        M[:n, :n], M[:n, n:n + m], M[n:n + m, n + m:] = self.A * step, self.B * step, np.eye(m)
+        E = scipy.linalg.expm(M)
+        B1 = E[:n, n + m:]
+        cached = (E[:n, :n], E[:n, n:n + m] - B1, B1)
+        self._discretizations[step] = cached
+        while len(self._discretizations) > self.MAX_DISCRETIZATIONS:
+            self._discretizations.popitem(last=False)
+        return cached
+
+    def defaultTimes(self, points=1000):
+        """
+        Build a time grid covering about 7 time constants of the slowest mode, as scipy.signal.step does.
+        """
+        eigenvalues = np.linalg.eigvals(self.A) if self.order else np.array([])
+        rates = np.abs(eigenvalues.real)
+        rates = rates[rates > 0]
+        return np.linspace(0, 7 / rates.min() if rates.size else 1.0, points)
+
+    def simulate(self, t, u=None, outputs=None, x0=None):
+        """
+        Compute the response to one or many input signals at once.
+
+        Args:
+            t (array-like): Increasing time points in seconds. Uniform grids use one cached discretization.
+            u (dict or array-like): Source name -> signal sampled on t (or constant), the other sources keeping their netlist value;
+                or an array of shape (len(t), inputs) or (signals, len(t), inputs) with the value of every source.
+            outputs (list): Labels of the unknowns to return, all of them if None.
+            x0 (array-like): Initial state (order, or signals x order), zero if None.
+
+        Returns:
+            tuple: A tuple containing the time array and a dictionary of key label and value the response array,
+            of shape (len(t),) or (signals, len(t)).
+
+        Raises:
+            ValueError: If the time points are not increasing, or a source or an output is unknown.
+        """
+        t = np.atleast_1d(np.asarray(t, dtype=float))
+        if t.ndim != 1 or np.any(np.diff(t) <= 0):
+            raise ValueError("The time points must be strictly increasing.")
+        outputs, Cy, Dy = self.outputMatrices(outputs)
+        U = self._inputs(t, u)
+        single = U.ndim == 2
+        U = U[None] if single else U
+        signals, n = U.shape[0], self.order
+        X = np.zeros((len(t), signals, n))
+        if x0 is not None:
+            X[0] = np.broadcast_to(np.asarray(x0, dtype=float), (signals, n))
+        if n and len(t) > 1:
+            steps = np.diff(t)
+            uniform = np.allclose(steps, steps[0], rtol=1e-9, atol=0)
+            Ut = U.transpose(1, 0, 2) # (len(t), signals, inputs)
+            if uniform:
+                Ad, B0, B1 = self.discretize(steps.mean())
+                W = Ut[:-1] @ B0.T + Ut[1:] @ B1.T
+                AdT, x = Ad.T, X[0]
+                for k in range(len(t) - 1):
+                    x = x @ AdT + W[k]
+                    X[k + 1] = x
+            else:
+                for k, h in enumerate(steps):
+                    Ad, B0, B1 = self.discretize(h)
+                    X[k + 1] = X[k] @ Ad.T + Ut[k] @ B0.T + Ut[k + 1] @ B1.T
+        Y = X @ Cy.T + U.transpose(1, 0, 2) @ Dy.T # (len(t), signals, outputs)
+        return t, {label: Y[:, 0, k] if single else Y[:, :, k].T for k, label in enumerate(outputs)}
+
+    def _inputs(self, t, u):
+        # Input array of shape (len(t), inputs) or (signals, len(t), inputs)
+        if u is None or isinstance(u, dict):
+            U = np.tile(self.values, (len(t), 1))
+            for name, signal in (u or {}).items():
+                U[:, self.inputColumn(name)] = np.broadcast_to(np.asarray(signal(t) if callable(signal) else signal, dtype=float), t.shape)
+            return U
+        U = np.asarray(u, dtype=float)
+        if U.shape[-2:] != (len(t), len(self.inputs)) or U.ndim not in (2, 3):
+            raise ValueError(f"The input signals must have the shape ([signals,] {len(t)}, {len(self.inputs)}).")
+        return U
+
+    def getStepResponse(self, source, t=None, outputs=None, amplitude=1.0):
+        """
+        Compute the response to a step of one source from zero, the other sources being zero.
+
+        Args:
+            source (str): The name of the stepped source.
+            t (array-like): The time points, defaultTimes() if None.
+            outputs (list): Labels of the unknowns to return, all of them if None.
+            amplitude (float): Height of the step.
+
+        Returns:
+            tuple: A tuple containing the time array and a dictionary of key label and value the response array.
+        """
+        t = self.defaultTimes() if t is None else np.atleast_1d(np.asarray(t, dtype=float))
+        U = np.zeros((len(t), len(self.inputs)))
+        U[:, self.inputColumn(source)] = amplitude
+        return self.simulate(t, U, outputs)
+
+    def getFrequencyResponse(self, w, outputs=None):
+        """
+        Compute the complex frequency response C.(jw.I - A)^-1.B + D of every output to every input.
+
+        Args:
+            w (array-like): The angular frequencies in rad/s.
+            outputs (list): Labels of the unknowns to return, all of them if None.
+
+        Returns:
+            tuple: A tuple containing the frequency array and a dictionary of key label and value an array (len(w), inputs).
+        """
+        w = np.atleast_1d(np.asarray(w, dtype=float))
+        outputs, Cy, Dy = self.outputMatrices(outputs)
+        n = self.order
+        H = np.broadcast_to(Dy.astype(complex), (len(w),) + Dy.shape).copy()
+        if n:
+            A = 1j * w[:, None, None] * np.eye(n)[None] - self.A[None]
+            H += Cy[None] @ np.linalg.solve(A, np.broadcast_to(self.B, (len(w),) + self.B.shape))
+        return w, {label: H[:, k] for k, label in enumerate(outputs)}
+
+
+class ReducedOrderModel(StateSpaceModel):
+    """
+    Reduced-order model of a large RC/RLC network by PRIMA: the MNA system is put in passive form (constraint rows negated,
+    so that G + G^T >= 0 and C = C^T >= 0 for R, L, C and sources), an orthonormal basis V of the block Krylov subspace of
+    (G + s0.C)^-1.C started from (G + s0.C)^-1.[B, L] is built by block Arnoldi with one sparse factorization, and the
+    system is projected by congruence: Gr = V^T.G.V, Cr = V^T.C.V, Br = V^T.B, y = L^T.V.z.
+    The moments of the responses around s0 are matched and the congruence keeps the passive form, hence a stable reduced
+    model (passive as a multiport when the outputs are the port conjugates of the inputs). The reduced descriptor system
+    is then realized as a StateSpaceModel whose outputs are only the requested unknowns.
+
+    Attributes:
+        size (int): Number of basis vectors, the dimension of the reduced descriptor system.
+        expansionPoint (float): The real expansion point s0 in rad/s.
+        passive (bool): Whether the reduced pencil is in passive form (no opamp or other active element).
+    """
+    def __init__(self, G, C, sources, labels, outputs, nodeCount, order=30, expansionPoint=0.0, tolerance=1e-10):
+        """
+        Args:
+            G, C (scipy.sparse matrix or array-like): The MNA matrices.
+            sources (dict): Source name -> (u, value), as StateSpaceModel.
+            labels (list): Label of each unknown of the MNA system.
+            outputs (list): Labels of the unknowns kept as outputs (e.g. ['v_1', 'v_42']).
+            nodeCount (int): Number of node rows, the following rows being branch constraints.
+            order (int): Maximum number of Krylov basis vectors, besides the branches and nodes of the voltage sources.
+            expansionPoint (float): Real expansion point s0 in rad/s, 0 matches the moments around DC.
+            tolerance (float): Relative threshold under which a Krylov vector is deflated.
+
+        Raises:
+            ValueError: If G + s0.C is singular or an output is not an unknown of the circuit.
+        """
+        import scipy.sparse
+        from scipy.sparse.linalg import splu
+        index = {label: i for i, label in enumerate(labels)}
+        outputs = list(outputs)
+        for label in outputs:
+            if label not in index and label != 'v_0':
+                raise ValueError(f"Unknown output '{label}', expected one of {list(labels)}.")
+        n = len(labels)
+        sign = scipy.sparse.diags(np.where(np.arange(n) < nodeCount, 1.0, -1.0))
+        G, C = (sign @ scipy.sparse.csr_matrix(G)).tocsr(), (sign @ scipy.sparse.csr_matrix(C)).tocsr()
+        inputs = list(sources)
+        B = sign @ (np.column_stack([sources[name][0] for name in inputs]) if inputs else np.zeros((n, 0)))
+        L = np.zeros((n, len(outputs)))
+        for k, label in enumerate(outputs):
+            if label in index:
+                L[index[label], k] = 1
+        logging.info(f"Starting PRIMA reduction of {n} unknowns to at most {order} states.")
+        try:
+            lu = splu((G + expansionPoint * C).tocsc())
+        except RuntimeError as e:
+            raise ValueError(f"G + s0.C is singular at the expansion point s0 = {expansionPoint}, choose another one: {e}")
+        # The branch currents of the voltage sources and their node voltages are basis vectors: the source constraints
+        # stay exact, so the driven node voltages are algebraic in the sources as in the full system
+        rows = np.flatnonzero(np.any(B[nodeCount:] != 0, axis=1)) + nodeCount
+        fixed = np.union1d(rows, np.flatnonzero(np.any(G[rows, :nodeCount].toarray() != 0, axis=0))) if rows.size else rows
+        V = self._arnoldi(lu, C, np.hstack([B, L]), order, tolerance, fixed)
+        Gr, Cr, Br, Lr = V.T @ (G @ V), V.T @ (C @ V), V.T @ B, V.T @ L
+        self.size, self.expansionPoint = V.shape[1], expansionPoint
+        symmetric = (Gr + Gr.T) / 2
+        scale = max(np.abs(Gr).max(initial=0), 1e-300)
+        self.passive = bool(np.linalg.eigvalsh(symmetric).min(initial=0) >= -1e-9 * scale
+                            and np.allclose(Cr, Cr.T, atol=1e-12 * max(np.abs(Cr).max(initial=0), 1e-300))
+                            and np.linalg.eigvalsh((Cr + Cr.T) / 2).min(initial=0) >= -1e-9 * max(np.abs(Cr).max(initial=0), 1e-300))
+        # Descriptor system of the reduced states z and the outputs y = Lr^T.z, realized by StateSpaceModel
+        q, p = self.size, len(outputs)
+        Ga, Ca = np.zeros((q + p, q + p)), np.zeros((q + p, q + p))
+        Ga[:q, :q], Ga[q:, :q], Ga[q:, q:], Ca[:q, :q] = Gr, -Lr.T, np.eye(p), Cr
+        reduced = {name: (np.concatenate([Br[:, k], np.zeros(p)]), sources[name][1]) for k, name in enumerate(inputs)}
+        super().__init__(Ga, Ca, reduced, [f'z_{k}' for k in range(q)] + outputs)
+        self.C, self.D = self.C[q:], self.D[q:]
+        self.labels = outputs
+        self.index = {label: k for k, label in enumerate(outputs)}
+        logging.info(f"Finished PRIMA reduction: {self.size} basis vectors, {self.order} states.")
+
+    @classmethod
+    def fromSolver(cls, solver, outputs=None, **kwargs):
+        """
+        Reduce the numeric MNA system of a Solver.
+
+        Args:
+            solver (Solver): A solver whose components all have a numerical value.
+            outputs (list): Labels of the unknowns kept as outputs, every node voltage if None.
+
+        Returns:
+            ReducedOrderModel: The reduced model, every independent source being an input.
+        """
+        G, C, b = solver.getNumericSystem()
+        tunables, values = tunableComponents(solver, kinds='b')
+        sources = {name: (u, values[name]) for name, (kind, u, v, coefficient) in tunables.items()}
+        labels = solver.numericMNA.unknownLabels()
+        nodeCount = solver.numericMNA.nodeCount
+        return cls(G, C, sources, labels, labels[:nodeCount] if outputs is None else outputs, nodeCount, **kwargs)
+
+    @staticmethod
+    def _arnoldi(lu, C, R, order, tolerance, fixed=()):
+        """
+        Build an orthonormal basis of the block Krylov subspace span{R0, M.R0, M^2.R0, ...}, R0 = lu^-1.R and M = lu^-1.C,
+        with two passes of block Gram-Schmidt and pivoted QR to deflate the dependent vectors.
+
+        Args:
+            fixed (array-like): Indices of unknowns whose unit vectors start the basis, their images under M being added to the subspace.
+
+        Returns:
+            numpy.ndarray: The basis, of shape (unknowns, at most order + len(fixed)).
+        """
+        n = R.shape[0]
+        fixed = np.asarray(fixed, dtype=int)
+        V = np.zeros((n, len(fixed)))
+        V[fixed, np.arange(len(fixed))] = 1
+        order += V.shape[1]
+        W = lu.solve(np.asfortranarray(np.hstack([R, C @ V]), dtype=float)) if R.shape[1] + V.shape[1] else np.zeros((n, 0))
+        while V.shape[1] < order and W.shape[1]:
+            norm = np.linalg.norm(W, axis=0).max(initial=0)
+            for _ in range(2):
+                W = W - V @ (V.T @ W)
+            if norm == 0:
+                break
+            Q, Rq, _ = scipy.linalg.qr(W, mode='economic', pivoting=True)
+            kept = np.abs(np.diag(Rq)) > tolerance * norm
+            Q = Q[:, kept][:, :order - V.shape[1]]
+            if not Q.shape[1]:
+                break # Invariant subspace: the reduced model is exact
+            V = np.hstack([V, Q])
+            W = lu.solve(np.asfortranarray(C @ Q))
+        return V
+
+    def defaultFrequencies(self, points=1000):
+        """
+        Build a logarithmic grid of angular frequencies spanning the poles of the reduced model.
+        """
+        magnitudes = np.abs(np.linalg.eigvals(self.A)) if self.order else np.array([])
+        magnitudes = magnitudes[magnitudes > 0]
+        if magnitudes.size == 0:
+            return np.logspace(0, 6, points)
+        return np.logspace(np.floor(np.log10(magnitudes.min())) - 1, np.ceil(np.log10(magnitudes.max())) + 1, points)
+
+    def getTransferFunctionResponse(self, inputNode, outputNode, w=None):
+        """
+        Return the Bode diagram of V_outputNode / V_inputNode, every source at its netlist value (or at unit value when
+        they are all at zero) as ACAnalysis does.
+
+        Args:
+            inputNode (str): The node where the input voltage is applied, one of the outputs.
+            outputNode (str): The node where the output voltage is measured, one of the outputs.
+            w (array-like): The angular frequencies in rad/s, defaultFrequencies() if None.
+
+        Returns:
+            tuple: A tuple containing the frequency array, magnitude array (dB) and phase array (degrees).
+        """
+        w = self.defaultFrequencies() if w is None else w
+        w, H = self.getFrequencyResponse(w, [f'v_{inputNode}', f'v_{outputNode}'])
+        values = self.values if self.values.any() else np.ones(len(self.inputs)) # Unit sources when every source is at zero, see smallSignalExcitation
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = (H[f'v_{outputNode}'] @ values) / (H[f'v_{inputNode}'] @ values)
+            mag = 20 * np.log10(np.abs(ratio))
+        return w, mag, np.rad2deg(np.unwrap(np.angle(ratio)))
+
+    def toDict(self):
+        """
+        Serialize the model to plain JSON-serializable data, e.g. to cache it.
+
+        Returns:
+            dict: The matrices as nested lists with the inputs, their values and the output labels.
+        """
+        return {
+            "A": self.A.tolist(), "B": self.B.tolist(), "C": self.C.tolist(), "D": self.D.tolist(),
+            "inputs": self.inputs, "values": self.values.tolist(), "labels": self.labels,
+            "size": self.size, "expansionPoint": self.expansionPoint, "passive": self.passive,
+        }
+
+    @classmethod
+    def fromDict(cls, data):
+        """
+        Rebuild a model serialized with toDict.
+
+        Args:
+            data (dict): The serialized model.
+
+        Returns:
+            ReducedOrderModel: The model.
+        """
+        model = cls.__new__(cls)
+        inputs, outputs = len(data["inputs"]), len(data["labels"])
+        model.A = np.array(data["A"], dtype=float).reshape(len(data["A"]), len(data["A"]))
+        model.B = np.array(data["B"], dtype=float).reshape(model.order, inputs)
+        model.C = np.array(data["C"], dtype=float).reshape(outputs, model.order)
+        model.D = np.array(data["D"], dtype=float).reshape(outputs, inputs)
+        model.inputs, model.values, model.labels = list(data["inputs"]), np.array(data["values"], dtype=float), list(data["labels"])
+        model.index = {label: k for k, label in enumerate(model.labels)}
+        model.size, model.expansionPoint, model.passive = data["size"], data["expansionPoint"], data["passive"]
+        model._discretizations = OrderedDict()
+        return model
+
+
+class Step:
+    """
+    Step waveform: initial value up to the delay, then the amplitude. At t = delay the value is still the initial one,
+    so that a step at t = 0 starts from the operating point before the step.
+    """
+    def __init__(self, amplitude=1.0, delay=0.0, initial=0.0):
+        self.amplitude, self.delay, self.initial = float(amplitude), float(delay), float(initial)
+
+    def __call__(self, t):
+        return np.where(t > self.delay, self.amplitude, self.initial)
+
+
+class Pulse:
+    """
+    Trapezoidal pulse train, as the SPICE PULSE(V1 V2 TD TR TF PW PER) source. A period of 0 gives a single pulse.
+    """
+    def __init__(self, initial, pulsed, delay=0.0, rise=0.0, fall=0.0, width=np.inf, period=0.0):
+        self.initial, self.pulsed = float(initial), float(pulsed)
+        self.delay, self.rise, self.fall, self.width, self.period = float(delay), float(rise), float(fall), float(width), float(period)
+
+    def __call__(self, t):
+        local = np.asarray(t, dtype=float) - self.delay
+        if self.period > 0:
+            local = np.where(local > 0, np.mod(local, self.period), local)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rising = np.clip(local / self.rise, 0, 1) if self.rise > 0 else (local > 0).astype(float)
+            end = local - self.rise - self.width
+            falling = np.clip(end / self.fall, 0, 1) if self.fall > 0 else (end > 0).astype(float)
+        level = np.where(local > self.rise + self.width, 1 - falling, rising)
+        return self.initial + (self.pulsed - self.initial) * level
+
+
+class Sine:
+    """
+    Damped sine, as the SPICE SIN(VO VA FREQ TD THETA PHASE) source: the offset up to the delay,
+    then offset + amplitude.exp(-damping.(t - delay)).sin(2.pi.frequency.(t - delay) + phase), phase in degrees.
+    """
+    def __init__(self, offset, amplitude, frequency, delay=0.0, damping=0.0, phase=0.0):
+        self.offset, self.amplitude, self.frequency = float(offset), float(amplitude), float(frequency)
+        self.delay, self.damping, self.phase = float(delay), float(damping), float(phase)
+
+    def __call__(self, t):
+        local = np.maximum(np.asarray(t, dtype=float) - self.delay, 0)
+        value = self.offset + self.amplitude * np.exp(-self.damping * local) * np.sin(2 * np.pi * self.frequency * local + np.deg2rad(self.phase))
+        return np.where(np.asarray(t) > self.delay, value, self.offset + self.amplitude * np.sin(np.deg2rad(self.phase)))
+
+
+class PWL:
+    """
+    Piecewise linear waveform through the points (times[k], values[k]), constant before the first and after the last point.
+    """
+    def __init__(self, times, values):
+        self.times, self.values = np.asarray(times, dtype=float), np.asarray(values, dtype=float)
+        if self.times.ndim != 1 or self.times.shape != self.values.shape or len(self.times) == 0:
+            raise ValueError("A PWL waveform needs as many times as values.")
+        if np.any(np.diff(self.times) < 0):
+            raise ValueError("The times of a PWL waveform must be increasing.")
+
+    def __call__(self, t):
+        return np.interp(t, self.times, self.values)
+
+
+def _flushTiny(array):
+    """
+    Set the entries of an array below 1.5e-154 (the square root of the smallest normal float) to zero, in place.
+    A product of two such values underflows into the subnormal range, where every floating-point operation is about ten
+    times slower: the tail of a decaying response (e.g. along a long RC ladder) would slow down all the products of the
+    transient analysis. Values that small are zero for any circuit quantity.
+    """
+    array[np.abs(array) < TINY] = 0
+    return array
+
+
+class TransientAnalysis:
+    """
+    Fixed-step transient analysis of the descriptor system C.x' + G.x = b(t) given by the numeric MNA system.
+
+    Discretizing C.x' is the companion model of every capacitor and inductor: with backward Euler,
+    (G + C/h).x_n+1 = (C/h).x_n + b_n+1, with the trapezoidal rule (G + 2C/h).x_n+1 = (2C/h - G).x_n + b_n+1 + b_n.
+    Rows without a capacitor or inductor (voltage source constraints, purely resistive nodes) are algebraic: they are
+    enforced at t_n+1 only, so that a discontinuous source does not make the trapezoidal rule ring.
+    The matrix of the left-hand side only depends on the step: it is factored once and reused for every time point, and
+    the right-hand sides only move along the vectors of the driven sources, which are solved once.
+    Up to denseLimit unknowns, the recurrence x_n+1 = M.x_n + y_n is evaluated with blocks of matrix products (see
+    propagate), larger systems are propagated with a sparse LU solve per step. For an RC ladder, the dense products are
+    faster up to about 250 unknowns.
+
+    Attributes:
+        G (scipy.sparse.csc_matrix): Conductance and incidence matrix.
+        C (scipy.sparse.csc_matrix): Susceptance matrix (capacitances, and -L in the inductor rows).
+        b (numpy.ndarray): Excitation vector with the values of the netlist.
+        labels (list): Label of each unknown (e.g. 'v_1', 'i_V1'), in column order.
+        sources (dict): Source name -> (u, value): b moves by u.(w(t) - value) when the source follows the waveform w.
+        method (str): 'trapezoidal' or 'euler' (backward Euler).
+        denseLimit (int): Number of unknowns up to which the steps are propagated with dense matrices.
+        maxBatchBytes (int): Memory bound of one batch of right-hand sides.
+    """
+    METHODS = ('trapezoidal', 'euler')
+
+    def __init__(self, G, C, b, labels, sources=None, method='trapezoidal', denseLimit=250, maxBatchBytes=64 * 2**20):
+        from scipy.sparse import csc_matrix
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown integration method '{method}', expected one of {self.METHODS}.")
+        self.G, self.C = csc_matrix(G, dtype=float), csc_matrix(C, dtype=float)
+        self.b = np.asarray(b, dtype=float)
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.sources = dict(sources or {})
+        self.method = method
+        self.denseLimit = denseLimit
+        self.maxBatchBytes = maxBatchBytes
+        self.differential = np.asarray(abs(self.C).sum(axis=1)).ravel() > 0 # Rows with a capacitor or inductor
+        self._factorization = None # (step, factorization, propagation matrix, weight of b_n)
+
+    @classmethod
+    def fromSolver(cls, solver, **kwargs):
+        """
+        Build the analysis from the numeric MNA system of a Solver, every independent source being drivable by a waveform.
+
+        Args:
+            solver (Solver): A solver whose components all have a numerical value.
+
+        Returns:
+            TransientAnalysis: The analysis of the circuit of the solver.
+        """
+        G, C, b = solver.getNumericSystem()
+        tunables, values = tunableComponents(solver)
+        sources = {name: (u, values[name]) for name, (kind, u, v, coefficient) in tunables.items() if kind == 'b'}
+        return cls(G, C, b, solver.numericMNA.unknownLabels(), sources, **kwargs)
+
+    def factorize(self, step):
+        """
+        Factor the left-hand side matrix for a time step, once: the factorization is kept while the step does not change.
+
+        Args:
+            step (float): The time step in seconds.
+
+        Raises:
+            ValueError: If the step is not positive or the system is singular.
+        """
+        if not step > 0:
+            raise ValueError("The time step must be positive.")
+        if self._factorization is not None and self._factorization[0] == step:
+            return
+        from scipy.sparse import diags
+        from scipy.sparse.linalg import splu
+        if self.method == 'euler':
+            A, N, weight = self.G + self.C / step, self.C / step, np.zeros(len(self.labels))
+        else:
+            weight = self.differential.astype(float)
+            A, N = self.G + 2 * self.C / step, 2 * self.C / step - diags(weight) @ self.G
+        try:
+            if len(self.labels) <= self.denseLimit:
+                lu = scipy.linalg.lu_factor(A.toarray(), check_finite=False)
+                if not np.all(np.isfinite(lu[0])) or np.any(np.diag(lu[0]) == 0):
+                    raise np.linalg.LinAlgError("singular matrix")
+                M = scipy.linalg.lu_solve(lu, N.toarray(), check_finite=False)
+                self._factorization = (step, lu, _flushTiny(M), weight)
+            else:
+                self._factorization = (step, splu(A.tocsc()), N.tocsr(), weight)
+        except (RuntimeError, np.linalg.LinAlgError) as e:
+            raise ValueError(f"The transient system is singular for a step of {step} s: {e}")
+
+    @staticmethod
+    def propagate(M, x, Y):
+        """
+        Solve the recurrence x_k+1 = M.x_k + y_k over all the rows of Y with matrix products instead of one Python step per row.
+
+        The K steps are cut into blocks of L ~ sqrt(K) steps. The response of every block from a zero state is computed for
+        all the blocks together, the states at the block boundaries are chained with M^L, then the free response M^j.x of
+        every block start is added, again for all the blocks together: 2L products of (K/L, n) by (n, n) matrices and
+        K/L matrix-vector products.
+
+        Args:
+            M (numpy.ndarray): The propagation matrix, of shape (n, n).
+            x (numpy.ndarray): The initial state x_0.
+            Y (numpy.ndarray): The inputs y_0 ... y_K-1, of shape (K, n).
+
+        Returns:
+            numpy.ndarray: The states x_1 ... x_K, of shape (K, n).
+        """
+        steps, n = Y.shape
+        length = max(1, int(np.ceil(np.sqrt(steps))))
+        blocks = -(-steps // length)
+        inputs = np.zeros((blocks * length, n))
+        inputs[:steps] = _flushTiny(Y)
+        inputs = inputs.reshape(blocks, length, n)
+        X = np.empty_like(inputs)
+        forced = np.zeros((blocks, n))
+        for j in range(length):
+            forced = _flushTiny(forced @ M.T + inputs[:, j])
+            X[:, j] = forced
+        jump = _flushTiny(np.linalg.matrix_power(M, length))
+        starts = np.empty((blocks, n))
+        starts[0] = x
+        for block in range(1, blocks):
+            starts[block] = jump @ starts[block - 1] + forced[block - 1]
+        for j in range(length):
+            starts = _flushTiny(starts @ M.T)
+            X[:, j] += starts
+        return X.reshape(blocks * length, n)[:steps]
+
+    def excitation(self, t, waveforms):
+        """
+        Evaluate the excitation vector at every time point.
+
+        Args:
+            t (numpy.ndarray): The time points in seconds.
+            waveforms (dict): Source name -> callable of the time array (Step, Pulse, Sine, PWL or any function) or constant.
+
+        Returns:
+            numpy.ndarray: Array of shape (len(t), number of unknowns).
+        """
+        coefficients, basis = self.excitationBasis(t, waveforms)
+        return coefficients @ basis
+
+    def excitationBasis(self, t, waveforms):
+        """
+        Evaluate the excitation in factored form b(t) = coefficients(t).basis: it only moves along the vectors of the
+        sources driven by a waveform, so that the solves of the right-hand sides are done once per source, not per time point.
+
+        Args:
+            t (numpy.ndarray): The time points in seconds.
+            waveforms (dict): Source name -> callable of the time array (Step, Pulse, Sine, PWL or any function) or constant.
+
+        Returns:
+            tuple: A tuple containing the coefficients, of shape (len(t), 1 + number of waveforms), and the basis: the
+            netlist excitation vector then the vector of each source, of shape (1 + number of waveforms, number of unknowns).
+        """
+        coefficients = np.ones((len(t), 1 + len(waveforms)))
+        basis = [self.b]
+        for i, (name, waveform) in enumerate(waveforms.items(), 1):
+            u, value = self.sources[name]
+            w = waveform(t) if callable(waveform) else waveform
+            coefficients[:, i] = np.broadcast_to(np.asarray(w, dtype=float), t.shape) - value
+            basis.append(np.asarray(u, dtype=float))
+        return coefficients, np.vstack(basis)
+
+    def operatingPoint(self, t, waveforms):
+        """
+        Solve the DC operating point G.x = b(t), the initial state of the transient analysis.
+
+        Raises:
+            numpy.linalg.LinAlgError: If the circuit has no DC operating point (e.g. a node only connected through capacitors).
+        """
+        from scipy.sparse.linalg import splu
+        try:
+            return splu(self.G.tocsc()).solve(self.excitation(np.array([t]), waveforms)[0])
+        except RuntimeError as e:
+            raise np.linalg.LinAlgError(str(e))
+
+    def run(self, tStop, step, waveforms=None, outputs=None, x0=None):
+        """
+        Integrate the circuit from t = 0 to tStop with a fixed step.
+
+        Args:
+            tStop (float): The end time in seconds.
+            step (float): The time step in seconds.
+            waveforms (dict): Source name -> waveform (Step, Pulse, Sine, PWL, any vectorized function of t, or constant).
+                The other sources keep the value of the netlist.
+            outputs (list): Labels of the unknowns to return (e.g. ['v_3', 'i_V1']), all of them if None. 'v_0' is the ground.
+            x0 (array-like): Initial state, the DC operating point at t = 0 if None (zero if the circuit has none).
+
+        Returns:
+            tuple: A tuple containing the time array and a dictionary of key label and value the waveform array.
+
+        Raises:
+            ValueError: If a source or an output is unknown, or the step is not valid.
+        """
+        waveforms = dict(waveforms or {})
+        for name in waveforms:
+            if name not in self.sources:
+                raise ValueError(f"Unknown source '{name}', expected one of {list(self.sources)}.")
+        outputs = self.labels if outputs is None else list(outputs)
+        for label in outputs:
+            if label not in self.index and label != 'v_0':
+                raise ValueError(f"Unknown output '{label}', expected one of {self.labels}.")
+        if not tStop > 0:
+            raise ValueError("The end time must be positive.")
+        if not step > 0:
+            raise ValueError("The time step must be positive.")
+        steps = int(round(tStop / step))
+        if steps < 1:
+            raise ValueError("The time step must be smaller than the end time.")
+        logging.info(f"Starting transient analysis over {steps} steps.")
+        self.factorize(step)
+        t = np.arange(steps + 1) * step
+        n = len(self.labels)
+        X = np.empty((steps + 1, n))
+        if x0 is not None:
+            X[0] = np.asarray(x0, dtype=float)
+        else:
+            try:
+                X[0] = self.operatingPoint(0.0, waveforms)
+            except np.linalg.LinAlgError:
+                logging.warning("No DC operating point, the transient analysis starts from a zero state.")
+                X[0] = 0
+        _, lu, N, weight = self._factorization
+        dense = isinstance(lu, tuple)
+        coefficients, basis = self.excitationBasis(t, waveforms)
+        # x_n+1 = M.x_n + y_n with y_n = A^-1.(b_n+1 + weight.b_n), from the solves of the basis vectors only
+        solve = (lambda B: scipy.linalg.lu_solve(lu, B, check_finite=False)) if dense else lu.solve
+        current, previous = _flushTiny(solve(basis.T)), _flushTiny(solve((weight[None, :] * basis).T))
+        batch = max(1, int(self.maxBatchBytes // (8 * max(n, 1))))
+        for start in range(0, steps, batch):
+            stop = min(start + batch, steps)
+            Y = coefficients[start + 1:stop + 1] @ current.T + coefficients[start:stop] @ previous.T
+            if dense:
+                X[start + 1:stop + 1] = self.propagate(N, X[start], Y)
+            else:
+                for k in range(start, stop):
+                    X[k + 1] = lu.solve(N @ X[k]) + Y[k - start]
+        logging.info("Finished transient analysis.")
+        return t, {label: X[:, self.index[label]] if label in self.index else np.zeros(len(t)) for label in outputs}
@@ -2,12 +2,13 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 import os
 from flask_cors import CORS
+from executor import SolveExecutor
 
 db = SQLAlchemy()
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
-    CORS(app)
+    CORS(app, expose_headers=['Link', 'X-Next-Cursor']) # En-têtes de pagination de la galerie
 
     # Configuration de l'application
     BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
@@ -16,9 +17,17 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(DB_DIR, 'circuits.db')}"
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['UPLOAD_FOLDER'] = os.path.join(DB_DIR, 'uploads')
+    app.config['SOLVE_WORKERS'] = int(os.environ.get('SOLVE_WORKERS', os.cpu_count() or 1))
+    app.config['SOLVE_TIMEOUT'] = float(os.environ.get('SOLVE_TIMEOUT', 60)) # Secondes
+    app.config['SOLVE_MAX_MEMORY'] = int(os.environ.get('SOLVE_MAX_MEMORY', 2**30)) # Octets
+    app.config['SOLVE_BATCH_MAX'] = int(os.environ.get('SOLVE_BATCH_MAX', 500)) # Circuits par requête /solve/batch
+    if test_config:
+        app.config.update(test_config) # Tests : base de données et dossiers temporaires
 
     # Initialisation des extensions
     db.init_app(app)
+    # Processus de résolution, démarrés à la première requête
+    app.extensions['solve_executor'] = SolveExecutor(app.config['SOLVE_WORKERS'], app.config['SOLVE_TIMEOUT'], app.config['SOLVE_MAX_MEMORY'])
 
     # Enregistrement des blueprints
     from .routes import init_routes
@@ -26,5 +35,17 @@ def create_app():
 
     with app.app_context():
         db.create_all()
+        # create_all ne crée pas les index ajoutés à une table existante
+        # (IF NOT EXISTS : la réflexion de SQLite ne voit pas les index sur expression comme lower(nom))
+        from sqlalchemy.schema import CreateIndex
+        from .models import Circuit
+        with db.engine.begin() as connection:
+            for index in Circuit.__table__.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+
+    # File d'attente persistante des résolutions asynchrones
+    from .solve_queue import SolveQueue
+    app.extensions['solve_queue'] = SolveQueue(app, app.extensions['solve_executor'])
+    app.extensions['solve_queue'].start()
 
     return app
@@ -3,9 +3,27 @@ from datetime import datetime
 
 class Circuit(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    nom = db.Column(db.String(255), nullable=False)
+    nom = db.Column(db.String(255), nullable=False, index=True)
     description = db.Column(db.Text, nullable=False)
     image = db.Column(db.String(255))
-    auteur = db.Column(db.String(255), nullable=False)
-    date = db.Column(db.Date, nullable=False, default=datetime.utcnow)
+    auteur = db.Column(db.String(255), nullable=False, index=True)
+    date = db.Column(db.Date, nullable=False, default=datetime.utcnow, index=True) # Index de tri et de filtre de la galerie (clé, id)
     netlist = db.Column(db.Text, nullable=False)
+
+    # Filtre par préfixe du nom insensible à la casse (galerie) : recherche dans l'index au lieu d'un parcours de la table
+    __table_args__ = (db.Index('ix_circuit_nom_lower', db.func.lower(nom)),)
+
+
+class SolveJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    netlist = db.Column(db.Text, nullable=False)
+    inputNode = db.Column(db.String(255))
+    outputNode = db.Column(db.String(255))
+    mode = db.Column(db.String(16), nullable=False, default='symbolic')
+    status = db.Column(db.String(16), nullable=False, default='queued', index=True) # queued, running, done, failed
+    worker = db.Column(db.String(255)) # hote:pid du processus qui exécute le job
+    result = db.Column(db.Text) # JSON
+    error = db.Column(db.Text)
+    created = db.Column(db.Float, nullable=False) # Horodatages time.time()
+    started = db.Column(db.Float)
+    finished = db.Column(db.Float)
@@ -1,25 +1,133 @@
 from flask import Blueprint, jsonify, request
+from sqlalchemy.orm import load_only
 from ..models import Circuit
 from .. import db
-from datetime import datetime, timezone
+from datetime import datetime, timezone, date
+import base64
+import json
+from urllib.parse import urlencode
 
 galerie_bp = Blueprint('galerie', __name__, url_prefix='/galerie')
 
+FIELDS = ('id', 'nom', 'description', 'image', 'auteur', 'date', 'netlist')
+DEFAULT_FIELDS = ('id', 'nom', 'image', 'auteur', 'date') # Grille de la galerie : les textes longs seulement sur demande
+SORTS = ('id', 'nom', 'auteur', 'date')
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def circuit_to_dict(circuit, fields=FIELDS):
+    values = {
+        "id": lambda: circuit.id,
+        "nom": lambda: circuit.nom,
+        "description": lambda: circuit.description,
+        "image": lambda: circuit.image,
+        "auteur": lambda: circuit.auteur,
+        "date": lambda: circuit.date.strftime('%Y-%m-%d'),
+        "netlist": lambda: circuit.netlist,
+    }
+    return {field: values[field]() for field in fields}
+
+
+def requested_fields(args, default):
+    fields = tuple(field.strip() for field in args['fields'].split(',') if field.strip()) if 'fields' in args else default
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise ValueError(f"Champs inconnus : {', '.join(unknown)}. Champs disponibles : {', '.join(FIELDS)}.")
+    return fields
+
+
+def encode_cursor(sort, order, circuit):
+    # Curseur opaque : clé de tri et id du dernier circuit de la page
+    value = getattr(circuit, sort)
+    value = value.isoformat() if isinstance(value, date) else value
+    document = json.dumps({"sort": sort, "order": order, "value": value, "id": circuit.id})
+    return base64.urlsafe_b64encode(document.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort, order):
+    try:
+        document = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        value = date.fromisoformat(document["value"]) if sort == 'date' else document["value"]
+        last = int(document["id"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Curseur invalide.")
+    if document["sort"] != sort or document["order"] != order:
+        raise ValueError("Curseur invalide : le tri a changé depuis la première page.")
+    return value, last
+
+
 @galerie_bp.route('/', methods=['GET'])
 def get_galerie():
-    circuits = Circuit.query.all()
-    return jsonify([
-        {
-            "id": circuit.id,
-            "nom": circuit.nom,
-            "description": circuit.description,
-            "image": circuit.image,
-            "auteur": circuit.auteur,
-            "date": circuit.date.strftime('%Y-%m-%d'),
-            "netlist": circuit.netlist
-        }
-        for circuit in circuits
-    ])
+    # Pagination par clé (keyset) : chaque page est une recherche dans l'index (tri, id), quelle que soit la taille de la table
+    args = request.args
+    try:
+        fields = requested_fields(args, DEFAULT_FIELDS)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    sort, order = args.get('sort', 'id'), args.get('order', 'asc')
+    if sort not in SORTS or order not in ('asc', 'desc'):
+        return jsonify({"message": f"Tri invalide : sort parmi {', '.join(SORTS)}, order parmi asc, desc."}), 400
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValueError
+    except ValueError:
+        return jsonify({"message": f"Limite invalide : un entier entre 1 et {MAX_LIMIT}."}), 400
+
+    column = getattr(Circuit, sort)
+    loaded = [getattr(Circuit, field) for field in dict.fromkeys(fields + ('id', sort))] # Le tri et l'id servent au curseur
+    query = Circuit.query.options(load_only(*loaded))
+    if 'auteur' in args:
+        query = query.filter(Circuit.auteur == args['auteur'])
+    if 'nom' in args:
+        # Préfixe insensible à la casse, par intervalle sur l'index lower(nom) : un filtre '%…%' parcourrait toute la table
+        prefix = args['nom'].lower()
+        query = query.filter(db.func.lower(Circuit.nom) >= prefix, db.func.lower(Circuit.nom) < prefix + '\U0010ffff')
+    try:
+        if 'dateMin' in args:
+            query = query.filter(Circuit.date >= date.fromisoformat(args['dateMin']))
+        if 'dateMax' in args:
+            query = query.filter(Circuit.date <= date.fromisoformat(args['dateMax']))
+    except ValueError:
+        return jsonify({"message": "Date invalide : format AAAA-MM-JJ attendu."}), 400
+    if 'cursor' in args:
+        try:
+            value, last = decode_cursor(args['cursor'], sort, order)
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+        if order == 'asc':
+            query = query.filter(db.or_(column > value, db.and_(column == value, Circuit.id > last)))
+        else:
+            query = query.filter(db.or_(column < value, db.and_(column == value, Circuit.id < last)))
+    if order == 'asc':
+        query = query.order_by(column.asc(), Circuit.id.asc())
+    else:
+        query = query.order_by(column.desc(), Circuit.id.desc())
+    circuits = query.limit(limit + 1).all()
+
+    response = jsonify([circuit_to_dict(circuit, fields) for circuit in circuits[:limit]])
+    if len(circuits) > limit:
+        cursor = encode_cursor(sort, order, circuits[limit - 1])
+        response.headers['X-Next-Cursor'] = cursor
+        nextArgs = request.args.to_dict()
+        nextArgs['cursor'] = cursor
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(nextArgs)}>; rel="next"'
+    return response
+
+
+@galerie_bp.route('/<int:circuit_id>', methods=['GET'])
+def get_circuit(circuit_id):
+    # Détail d'un circuit ouvert dans la galerie : la netlist et la description ne sont pas dans la liste
+    try:
+        fields = requested_fields(request.args, FIELDS)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    circuit = Circuit.query.options(load_only(*[getattr(Circuit, field) for field in dict.fromkeys(fields + ('id',))])).filter_by(id=circuit_id).first()
+    if circuit is None:
+        return jsonify({"message": "Circuit introuvable."}), 404
+
+    return jsonify(circuit_to_dict(circuit, fields))
 
 
 @galerie_bp.route('/', methods=['POST'])
@@ -45,15 +153,7 @@ def add_circuit():
     
     return jsonify({
         "message": "Circuit ajouté avec succès.",
-        "circuit": {
-            "id": new_circuit.id,
-            "nom": new_circuit.nom,
-            "description": new_circuit.description,
-            "image": new_circuit.image,
-            "auteur": new_circuit.auteur,
-            "date": new_circuit.date.strftime('%Y-%m-%d'),
-            "netlist": new_circuit.netlist
-        }
+        "circuit": circuit_to_dict(new_circuit)
     }), 201
 
 
@@ -94,13 +194,5 @@ def update_circuit(circuit_id):
 
     return jsonify({
         "message": "Circuit modifié avec succès.",
-        "circuit": {
-            "id": circuit.id,
-            "nom": circuit.nom,
-            "description": circuit.description,
-            "image": circuit.image,
-            "auteur": circuit.auteur,
-            "date": circuit.date.strftime('%Y-%m-%d'),
-            "netlist": circuit.netlist
-        }
+        "circuit": circuit_to_dict(circuit)
     }), 200
\ No newline at end of file
@@ -0,0 +1,161 @@
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context
+import json
+import numpy as np
+import sympy
+from ..models import SolveJob
+from .. import db
+from executor import SolveTimeoutError, SolveMemoryError, WorkerCrashedError
+from jobs import solveNetlist, solveStages, solveBatch
+
+solve_bp = Blueprint('solve', __name__, url_prefix='/solve')
+
+# Erreurs d'un circuit dégénéré ou mal écrit : résistance nulle, système singulier, expression que SymPy ne sait pas lire
+CIRCUIT_ERRORS = (ValueError, ArithmeticError, np.linalg.LinAlgError, sympy.SympifyError)
+
+@solve_bp.route('/', methods=['POST'])
+def solve_circuit():
+    data = request.json
+
+    if not data:
+        return jsonify({"message": "Les données doivent être au format JSON."}), 400
+
+    if 'netlist' not in data:
+        return jsonify({"message": "Données manquantes."}), 400
+
+    executor = current_app.extensions['solve_executor']
+    try:
+        result = executor.run(solveNetlist, data['netlist'], data.get('inputNode'), data.get('outputNode'), data.get('mode', 'symbolic'), data.get('approximation'))
+    except SolveTimeoutError:
+        return jsonify({"message": "La résolution a dépassé le temps imparti."}), 504
+    except SolveMemoryError:
+        return jsonify({"message": "La résolution a dépassé la mémoire autorisée."}), 503
+    except WorkerCrashedError:
+        return jsonify({"message": "La résolution a échoué."}), 500
+    except CIRCUIT_ERRORS as e:
+        return jsonify({"message": f"Circuit invalide : {e}"}), 400
+    except Exception as e:
+        return jsonify({"message": f"La résolution a échoué : {e}"}), 500
+
+    return jsonify(result)
+
+
+@solve_bp.route('/batch', methods=['POST'])
+def solve_batch():
+    data = request.json
+
+    if not data:
+        return jsonify({"message": "Les données doivent être au format JSON."}), 400
+
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return jsonify({"message": "Données manquantes."}), 400
+
+    if len(items) > current_app.config['SOLVE_BATCH_MAX']:
+        return jsonify({"message": f"Trop de circuits : {current_app.config['SOLVE_BATCH_MAX']} au maximum."}), 413
+
+    results = []
+    for index, item in enumerate(solveBatch(items, current_app.extensions['solve_executor'])):
+        if "error" in item:
+            results.append({"index": index, "message": error_message(item["error"])})
+        else:
+            results.append({"index": index, "result": item["result"]})
+
+    return jsonify({"results": results})
+
+
+def error_message(error):
+    if isinstance(error, SolveTimeoutError):
+        return "La résolution a dépassé le temps imparti."
+    if isinstance(error, SolveMemoryError):
+        return "La résolution a dépassé la mémoire autorisée."
+    if isinstance(error, CIRCUIT_ERRORS):
+        return f"Circuit invalide : {error}"
+    return f"La résolution a échoué : {error}"
+
+
+@solve_bp.route('/jobs', methods=['POST'])
+def submit_job():
+    data = request.json
+
+    if not data:
+        return jsonify({"message": "Les données doivent être au format JSON."}), 400
+
+    if 'netlist' not in data:
+        return jsonify({"message": "Données manquantes."}), 400
+
+    mode = data.get('mode', 'symbolic')
+    if mode not in ('symbolic', 'numeric'):
+        return jsonify({"message": f"Mode de résolution inconnu : {mode}"}), 400
+
+    job = current_app.extensions['solve_queue'].enqueue(data['netlist'], data.get('inputNode'), data.get('outputNode'), mode)
+
+    return jsonify({
+        "message": "Résolution en file d'attente.",
+        "id": job.id,
+        "status": job.status
+    }), 202
+
+
+@solve_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = db.session.get(SolveJob, job_id)
+    if job is None:
+        return jsonify({"message": "Résolution introuvable."}), 404
+
+    stages = {}
+    if job.started is not None:
+        stages["queue"] = job.started - job.created
+    if job.finished is not None:
+        stages["total"] = job.finished - job.started
+    response = {
+        "id": job.id,
+        "status": job.status,
+        "stages": stages
+    }
+    if job.status == 'done':
+        result = json.loads(job.result)
+        stages.update(result.pop("stages", {}))
+        response["result"] = result
+    elif job.status == 'failed':
+        response["message"] = job.error
+
+    return jsonify(response)
+
+
+@solve_bp.route('/stream', methods=['GET', 'POST'])
+def stream_solve():
+    # POST avec un corps JSON, ou GET avec des paramètres pour EventSource
+    data = request.json if request.method == 'POST' else request.args
+
+    if not data:
+        return jsonify({"message": "Les données doivent être au format JSON."}), 400
+
+    if 'netlist' not in data:
+        return jsonify({"message": "Données manquantes."}), 400
+
+    ndjson = request.args.get('format') == 'ndjson' or 'application/x-ndjson' in request.headers.get('Accept', '')
+    executor = current_app.extensions['solve_executor']
+    events = executor.stream(solveStages, data['netlist'], data.get('inputNode'), data.get('outputNode'))
+
+    def generate():
+        try:
+            for event in events:
+                yield format_event(event["stage"], event, ndjson)
+            yield format_event("end", {"stage": "end"}, ndjson)
+        except SolveTimeoutError:
+            yield format_event("error", {"stage": "error", "message": "La résolution a dépassé le temps imparti."}, ndjson)
+        except SolveMemoryError:
+            yield format_event("error", {"stage": "error", "message": "La résolution a dépassé la mémoire autorisée."}, ndjson)
+        except Exception as e:
+            yield format_event("error", {"stage": "error", "message": f"La résolution a échoué : {e}"}, ndjson)
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson' if ndjson else 'text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # nginx transmet chaque étape sans la mettre en tampon
+    return response
+
+
+def format_event(stage, data, ndjson):
+    if ndjson:
+        return json.dumps(data) + "\n"
+    return f"event: {stage}\ndata: {json.dumps(data)}\n\n"
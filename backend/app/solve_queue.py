@@ -0,0 +1,149 @@
+"""
+solve_queue.py
+
+This module defines the persistent queue of asynchronous solves, stored in the SolveJob table of the SQLite database:
+no external broker is needed and the queued jobs survive a restart of the server.
+A dispatcher thread claims the queued jobs and hands them to the SolveExecutor, never more than it has workers.
+
+Classes:
+    SolveQueue: SQLite-backed queue of solve jobs.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import logging
+import threading
+
+from jobs import solveNetlist
+from .models import SolveJob
+from . import db
+
+
+class SolveQueue:
+    """
+    Persistent queue of solve jobs.
+
+    Attributes:
+        app (Flask): The application, for the database context of the dispatcher thread.
+        executor (SolveExecutor): The pool the jobs are run in.
+        retention (float): Age in seconds after which finished jobs are deleted.
+    """
+    def __init__(self, app, executor, retention=24 * 3600, pollInterval=0.5):
+        self.app = app
+        self.executor = executor
+        self.retention = retention
+        self.pollInterval = pollInterval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.inFlight = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """
+        Requeue the jobs of dead processes and start the dispatcher thread.
+        """
+        if self.thread is not None:
+            return
+        with self.app.app_context():
+            self._recover()
+        self.thread = threading.Thread(target=self._dispatch, name='solve-queue', daemon=True)
+        self.thread.start()
+
+    def enqueue(self, netlist, inputNode=None, outputNode=None, mode='symbolic'):
+        """
+        Queue a netlist to solve.
+
+        Returns:
+            SolveJob: The queued job.
+        """
+        job = SolveJob(id=uuid.uuid4().hex, netlist=netlist, inputNode=inputNode, outputNode=outputNode, mode=mode, status='queued', created=time.time())
+        db.session.add(job)
+        db.session.commit()
+        self.start()
+        self.wakeup.set()
+        return job
+
+    def _recover(self):
+        # Jobs left running by a process that no longer exists on this host are queued again
+        host = socket.gethostname()
+        for job in SolveJob.query.filter_by(status='running').all():
+            jobHost, _, pid = (job.worker or '').rpartition(':')
+            if jobHost == host and not self._alive(int(pid or 0)):
+                logging.warning(f"Requeuing solve job {job.id} of dead process {job.worker}.")
+                job.status, job.worker, job.started = 'queued', None, None
+        db.session.commit()
+
+    @staticmethod
+    def _alive(pid):
+        if pid <= 0:
+            return False
+        try:
+            os.kill(pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+
+    def _dispatch(self):
+        lastCleanup = 0
+        while True:
+            self.wakeup.wait(self.pollInterval)
+            self.wakeup.clear()
+            try:
+                with self.app.app_context():
+                    while self._claimNext():
+                        pass
+                    if time.time() - lastCleanup > 3600:
+                        SolveJob.query.filter(SolveJob.status.in_(['done', 'failed']), SolveJob.finished < time.time() - self.retention).delete(synchronize_session=False)
+                        db.session.commit()
+                        lastCleanup = time.time()
+            except Exception as e:
+                logging.error(f"Error dispatching solve jobs: {e}")
+
+    def _claimNext(self):
+        """
+        Claim the oldest queued job and submit it, if a worker is free.
+
+        Returns:
+            bool: Whether a job was submitted.
+        """
+        with self.lock:
+            if self.inFlight >= self.executor.workers:
+                return False
+        job = SolveJob.query.filter_by(status='queued').order_by(SolveJob.created).first()
+        if job is None:
+            return False
+        # Conditional update: another web worker may claim the same job
+        claimed = SolveJob.query.filter_by(id=job.id, status='queued').update({"status": 'running', "worker": self.owner, "started": time.time()})
+        db.session.commit()
+        if not claimed:
+            return True
+        with self.lock:
+            self.inFlight += 1
+        future = self.executor.submit(solveNetlist, job.netlist, job.inputNode, job.outputNode, job.mode)
+        future.add_done_callback(lambda future, jobId=job.id: self._finish(jobId, future))
+        return True
+
+    def _finish(self, jobId, future):
+        with self.lock:
+            self.inFlight -= 1
+        try:
+            with self.app.app_context():
+                job = db.session.get(SolveJob, jobId)
+                try:
+                    job.result = json.dumps(future.result())
+                    job.status = 'done'
+                except Exception as e:
+                    logging.error(f"Solve job {jobId} failed: {e}")
+                    job.error = f"{type(e).__name__}: {e}"
+                    job.status = 'failed'
+                job.finished = time.time()
+                db.session.commit()
+        except Exception as e:
+            logging.error(f"Error recording solve job {jobId}: {e}")
+        self.wakeup.set()
@@ -0,0 +1,217 @@
+"""
+approximation.py
+
+This module computes compact approximate symbolic transfer functions in bounded time.
+
+The exact transfer function N(p) / D(p) of the polynomial solver is expanded into monomials of the component values. With the
+nominal values, the terms of each coefficient of p that are numerically insignificant are dropped, the threshold being chosen
+so that the frequency response of the approximation stays within a user-chosen relative error of the exact one. The kept
+coefficients are then simplified, cheapest passes first, while the time budget lasts.
+
+Classes:
+    TransferFunctionApproximation: Term-dropping approximation of a symbolic transfer function within an error bound.
+
+Functions:
+    simplifyWithBudget: Apply simplification passes, cheapest first, while a time budget lasts.
+"""
+
+import time
+import logging
+
+import numpy as np
+import sympy
+
+SIMPLIFICATION_PASSES = (('cancel', sympy.cancel), ('factor', sympy.factor), ('simplify', sympy.simplify)) # Cheapest first
+THRESHOLDS = 2.0 ** -np.arange(0, 41) # Relative coefficient thresholds tried, from 1 down to about 1e-12
+
+
+def simplifyWithBudget(expression, budget=1.0, passes=SIMPLIFICATION_PASSES):
+    """
+    Apply simplification passes one after the other while the time budget lasts, keeping the shortest result (sympy.count_ops).
+    A running Sympy pass cannot be interrupted: a pass is only started when the time left is at least twice the duration
+    of the previous one, each pass being more expensive than the one before. The solver executor enforces the hard limit.
+
+    Args:
+        expression (sympy.Expr): The expression to simplify.
+        budget (float): The time budget in seconds.
+        passes (tuple): (name, function) pairs, cheapest first.
+
+    Returns:
+        tuple: A tuple containing the simplest expression found and the names of the passes applied.
+    """
+    start = time.perf_counter()
+    best, bestOperations = expression, sympy.count_ops(expression)
+    applied, previous = [], 0.0
+    for name, simplification in passes:
+        left = budget - (time.perf_counter() - start)
+        if left <= 0 or left < 2 * previous:
+            logging.info(f"Simplification budget exhausted before the {name} pass.")
+            break
+        passStart = time.perf_counter()
+        candidate = simplification(best)
+        previous = time.perf_counter() - passStart
+        applied.append(name)
+        operations = sympy.count_ops(candidate)
+        if operations < bestOperations:
+            best, bestOperations = candidate, operations
+    return best, applied
+
+
+class TransferFunctionApproximation:
+    """
+    Approximation of a symbolic transfer function by dropping the insignificant terms of each coefficient of p.
+
+    For a relative threshold eps, the smallest terms of each coefficient a_k are dropped as long as the sum of their nominal
+    magnitudes stays under eps.|a_k|. Every threshold from 1 down to about 1e-12 is tried, and the one keeping the fewest terms
+    with a frequency response error max |H_approx(jw) / H(jw) - 1| under the tolerance is chosen (the exact function if none).
+
+    Attributes:
+        expression (sympy.Expr): The approximate transfer function, ratio of polynomials in p with simplified coefficients.
+        error (float): The achieved maximum relative error of the frequency response over w.
+        tolerance (float): The requested error bound.
+        threshold (float): The chosen relative coefficient threshold, 0 for the exact function.
+        terms (int): Number of terms kept in the numerator and denominator.
+        exactTerms (int): Number of terms of the exact numerator and denominator.
+        w (numpy.ndarray): Angular frequencies in rad/s where the error is measured.
+        passes (list): Names of the simplification passes applied to the coefficients.
+    """
+    def __init__(self, expression, p, values, tolerance=0.05, w=None, budget=1.0, points=200):
+        """
+        Args:
+            expression (sympy.Expr): The exact transfer function, a rational function of p and of the component values.
+            p (sympy.Symbol): The Laplace variable.
+            values (dict): Symbol -> nominal value of every other symbol of the expression.
+            tolerance (float): The relative error bound of the frequency response.
+            w (array-like): Angular frequencies where the error is measured, a grid spanning the poles and zeros if None.
+            budget (float): Time budget in seconds of the simplification of the kept coefficients.
+            points (int): Number of frequencies of the default grid.
+
+        Raises:
+            ValueError: If a symbol has no nominal value.
+        """
+        logging.info("Starting transfer function approximation.")
+        start = time.perf_counter()
+        self.tolerance = tolerance
+        self.p = p
+        self.symbols = sorted(expression.free_symbols - {p}, key=str)
+        missing = [symbol for symbol in self.symbols if symbol not in values]
+        if missing:
+            raise ValueError(f"Missing nominal values for symbols: {missing}")
+        logValues = np.log(np.abs(np.array([float(values[symbol]) for symbol in self.symbols]))) if self.symbols else np.zeros(0)
+        signs = np.sign(np.array([float(values[symbol]) for symbol in self.symbols])) if self.symbols else np.zeros(0)
+        numerator, denominator = sympy.fraction(sympy.together(expression))
+        self.polynomials = [self._terms(polynomial, logValues, signs) for polynomial in (numerator, denominator)]
+        self.exactTerms = sum(len(terms["coefficients"]) for terms in self.polynomials)
+
+        exact = [self._coefficients(terms, None) for terms in self.polynomials]
+        self.w = self._frequencies(*exact, points) if w is None else np.atleast_1d(np.asarray(w, dtype=float))
+        response = self._response(*exact)
+        best = (self.exactTerms, 0.0, 0.0, [None, None]) # (terms, error, threshold, kept masks)
+        for threshold in THRESHOLDS:
+            masks = [self._drop(terms, threshold) for terms in self.polynomials]
+            kept = sum(int(mask.sum()) for mask in masks)
+            if kept >= best[0]:
+                continue
+            approximate = [self._coefficients(terms, mask) for terms, mask in zip(self.polynomials, masks)]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                error = np.max(np.abs(self._response(*approximate) / response - 1), initial=0.0)
+            if np.isfinite(error) and error <= tolerance:
+                best = (kept, float(error), float(threshold), masks)
+        self.terms, self.error, self.threshold, masks = best
+
+        remaining = max(budget - (time.perf_counter() - start), 0.0)
+        polynomials, self.passes = [], set()
+        for terms, mask in zip(self.polynomials, masks):
+            polynomial, applied = self._expression(terms, mask, remaining / 2)
+            polynomials.append(polynomial)
+            self.passes.update(applied)
+        self.passes = [name for name, _ in SIMPLIFICATION_PASSES if name in self.passes]
+        self.expression = polynomials[0] / polynomials[1]
+        logging.info(f"Finished transfer function approximation: {self.terms} of {self.exactTerms} terms, error {self.error:.3g}.")
+
+    def _terms(self, polynomial, logValues, signs):
+        """
+        Expand a polynomial into its monomials with their nominal values, scaled per power of p to avoid overflows.
+
+        Returns:
+            dict: "monomials" (exponent tuples, p first), "coefficients" (integers), "powers" (power of p of each term),
+            "values" (nominal value of each term divided by the scale of its power) and "scales" (power -> scale).
+        """
+        poly = sympy.Poly(polynomial, self.p, *self.symbols)
+        monomials, coefficients = zip(*poly.terms()) if not poly.is_zero else ((), ())
+        exponents = np.array([monomial[1:] for monomial in monomials], dtype=float).reshape(len(monomials), len(self.symbols))
+        powers = np.array([monomial[0] for monomial in monomials], dtype=int)
+        logMagnitudes = np.log(np.abs(np.array(coefficients, dtype=float))) + exponents @ logValues
+        termSigns = np.sign(np.array(coefficients, dtype=float)) * np.prod(np.where(exponents % 2 == 1, signs, 1.0), axis=1)
+        scales = {power: logMagnitudes[powers == power].max() for power in set(powers.tolist())}
+        values = termSigns * np.exp(logMagnitudes - np.array([scales[power] for power in powers]))
+        return {"monomials": monomials, "coefficients": coefficients, "powers": powers, "values": values, "scales": scales}
+
+    @staticmethod
+    def _drop(terms, threshold):
+        """
+        Select the terms kept for a threshold: per power of p, the smallest terms are dropped while the sum of their
+        magnitudes stays under threshold times the magnitude of the coefficient. A coefficient cancelling at the nominal values is kept whole.
+
+        Returns:
+            numpy.ndarray: Boolean mask of the kept terms.
+        """
+        kept = np.ones(len(terms["values"]), dtype=bool)
+        for power in terms["scales"]:
+            indices = np.flatnonzero(terms["powers"] == power)
+            values = terms["values"][indices]
+            coefficient = abs(values.sum())
+            if coefficient <= 1e-12 * np.abs(values).sum():
+                continue
+            order = np.argsort(np.abs(values), kind='stable')
+            dropped = np.cumsum(np.abs(values[order])) <= threshold * coefficient
+            dropped[-1] = False # At least the largest term
+            kept[indices[order[dropped]]] = False
+        return kept
+
+    @staticmethod
+    def _coefficients(terms, mask):
+        """
+        Return the nominal coefficients of the polynomial in p, highest power first (numpy.polyval order).
+        """
+        values = terms["values"] if mask is None else np.where(mask, terms["values"], 0.0)
+        degree = int(terms["powers"].max(initial=0))
+        coefficients = np.zeros(degree + 1)
+        for power, scale in terms["scales"].items():
+            coefficients[degree - power] = values[terms["powers"] == power].sum() * np.exp(scale)
+        return coefficients
+
+    def _response(self, numerator, denominator):
+        s = 1j * self.w
+        return np.polyval(numerator, s) / np.polyval(denominator, s)
+
+    @staticmethod
+    def _frequencies(numerator, denominator, points):
+        """
+        Build a logarithmic grid of angular frequencies spanning the nominal poles and zeros, as ACAnalysis.defaultFrequencies.
+        """
+        roots = np.concatenate([np.roots(numerator) if len(numerator) > 1 else [], np.roots(denominator) if len(denominator) > 1 else []])
+        magnitudes = np.abs(roots[np.isfinite(roots)])
+        magnitudes = magnitudes[magnitudes > 0]
+        if magnitudes.size == 0:
+            return np.logspace(0, 6, points)
+        return np.logspace(np.floor(np.log10(magnitudes.min())) - 1, np.ceil(np.log10(magnitudes.max())) + 1, points)
+
+    def _expression(self, terms, mask, budget):
+        """
+        Build the kept polynomial as a sum of powers of p, each coefficient simplified within its share of the budget.
+
+        Returns:
+            tuple: A tuple containing the polynomial expression and the names of the passes applied.
+        """
+        byPower = {}
+        for keep, monomial, coefficient in zip(mask if mask is not None else [True] * len(terms["monomials"]), terms["monomials"], terms["coefficients"]):
+            if keep:
+                byPower.setdefault(monomial[0], {})[monomial[1:]] = coefficient
+        polynomial, applied = sympy.Integer(0), set()
+        for power in sorted(byPower, reverse=True):
+            coefficient = sympy.Poly.from_dict(byPower[power], *self.symbols).as_expr() if self.symbols else sympy.Integer(byPower[power][()])
+            coefficient, passes = simplifyWithBudget(coefficient, budget / len(byPower))
+            applied.update(passes)
+            polynomial += coefficient * self.p ** power
+        return polynomial, applied
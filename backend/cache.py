@@ -0,0 +1,291 @@
+"""
+cache.py
+
+This module defines a persistent cache of solved circuits, so that a circuit opened many times is only solved once.
+Entries are keyed by the canonical fingerprint of the netlist and the solver options, kept in an in-process LRU
+and backed by a SQLite file next to data/circuits.db, which survives worker restarts and redeploys.
+Results are stored in canonical names, so that circuits equal up to node names, component names, line order
+or unit spelling share one entry, and are renamed back to the user's names on the way out.
+
+Classes:
+    SolverCache: Two-level (memory, then disk) LRU cache of solver states and reduced-order models.
+
+Functions:
+    normalizeNetlist: Remove comments, blank lines and whitespace differences from a netlist.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import sympy
+
+from solver import Circuit, Solver
+from analysis import ReducedOrderModel
+from canonical import CanonicalNetlist
+
+CACHE_VERSION = 3 # Bump to invalidate every stored entry when the solver results change
+DEFAULT_PATH = os.environ.get('SOLVER_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'solver_cache.db'))
+
+
+def normalizeNetlist(netlist):
+    """
+    Normalize a netlist so that cosmetic differences do not change its cache key.
+
+    Args:
+        netlist (str): The netlist as written by the user.
+
+    Returns:
+        str: One component per line, tokens separated by a single space, comments, blank lines and directives other than .SUBCKT/.ENDS removed.
+    """
+    lines = []
+    for line in netlist.strip().split('\n'):
+        line = line.strip()
+        if not line or line.startswith('*') or (line.startswith('.') and line.split()[0].upper() not in ('.SUBCKT', '.ENDS')):
+            continue
+        lines.append(' '.join(line.split()))
+    return '\n'.join(lines)
+
+
+class SolverCache:
+    """
+    Content-addressed cache of solver states (equations, solutions, transfer functions and their numerical coefficients).
+
+    Attributes:
+        path (str): Path of the SQLite file, None to keep the cache in memory only.
+        maxEntries (int): Size bound of the in-process LRU.
+        maxDiskEntries (int): Size bound of the SQLite store, the least recently used entries are evicted first.
+    """
+    def __init__(self, path=DEFAULT_PATH, maxEntries=128, maxDiskEntries=10000):
+        self.path = path
+        self.maxEntries = maxEntries
+        self.maxDiskEntries = maxDiskEntries
+        self.memory = OrderedDict() # {key: state}, most recently used last
+        self.lock = threading.Lock()
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with self._connect() as connection:
+                connection.execute("CREATE TABLE IF NOT EXISTS solver_cache (key TEXT PRIMARY KEY, state TEXT NOT NULL, accessed REAL NOT NULL)")
+                connection.execute("CREATE TABLE IF NOT EXISTS model_cache (key TEXT PRIMARY KEY, model TEXT NOT NULL, accessed REAL NOT NULL)")
+
+    def _connect(self):
+        # One connection per operation: safe across the forked gunicorn workers sharing the file
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def key(netlist, **options):
+        """
+        Compute the cache key of a netlist solved with some options.
+
+        Args:
+            netlist (str): The netlist of the circuit, usually the canonical one.
+            **options: The solver options (e.g. mode, lazy).
+
+        Returns:
+            str: The hexadecimal SHA-256 digest of the normalized netlist and options.
+        """
+        content = json.dumps({"version": CACHE_VERSION, "netlist": normalizeNetlist(netlist), "options": options}, sort_keys=True)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def getSolver(self, netlist, mode='symbolic', lazy=False):
+        """
+        Return a solver of the netlist, restored from the cache when the same circuit was already solved.
+        Numeric solvers are cheap to build and are never cached.
+
+        Args:
+            netlist (str): The netlist of the circuit.
+            mode (str): 'symbolic' or 'numeric'.
+            lazy (bool): Only solve the requested unknowns, see Solver.
+
+        Returns:
+            Solver: The solver of the circuit.
+        """
+        circuit = Circuit(netlist)
+        if mode == 'numeric':
+            return Solver(circuit, mode=mode)
+        canonical = CanonicalNetlist(netlist)
+        key = self.key(canonical.netlist, mode=mode, lazy=lazy)
+        state = self.get(key)
+        if state is not None:
+            logging.info(f"Solver cache hit for {key}.")
+            userState = canonical.toUser(state)
+            if state["source"] == self.key(netlist):
+                userState["equations"] = state["equations"] # Same netlist as written: same row order and explanations
+            return Solver(circuit, mode=mode, lazy=lazy, state=userState)
+        logging.info(f"Solver cache miss for {key}.")
+        solver = Solver(circuit, mode=mode, lazy=lazy)
+        self.put(key, self._canonicalState(netlist, canonical, solver))
+        return solver
+
+    def getReducedModel(self, netlist, inputNode, outputNode, order=30):
+        """
+        Return the PRIMA reduced-order model of the input and output voltages of a large network, reduced once and then
+        restored from memory or disk. Models are keyed by the netlist as written, their outputs being named after its nodes.
+
+        Args:
+            netlist (str): The netlist of the circuit, every component with a value.
+            inputNode (str): The node where the input voltage is applied.
+            outputNode (str): The node where the output voltage is measured.
+            order (int): Maximum number of Krylov basis vectors, see ReducedOrderModel.
+
+        Returns:
+            ReducedOrderModel: The reduced model, to be given to Simulator as its reduction.
+        """
+        key = self.key(netlist, reduction=order, inputNode=inputNode, outputNode=outputNode)
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key]
+        model = None
+        if self.path:
+            try:
+                with self._connect() as connection:
+                    row = connection.execute("SELECT model FROM model_cache WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        connection.execute("UPDATE model_cache SET accessed = ? WHERE key = ?", (time.time(), key))
+                model = ReducedOrderModel.fromDict(json.loads(row[0])) if row is not None else None
+            except (sqlite3.Error, ValueError, KeyError) as e:
+                logging.error(f"Error reading the model cache: {e}")
+        if model is None:
+            logging.info(f"Model cache miss for {key}.")
+            solver = Solver(Circuit(netlist), mode='numeric')
+            model = ReducedOrderModel.fromSolver(solver, outputs=[f'v_{inputNode}', f'v_{outputNode}'], order=order)
+            if self.path:
+                try:
+                    with self._connect() as connection:
+                        connection.execute("INSERT OR REPLACE INTO model_cache (key, model, accessed) VALUES (?, ?, ?)", (key, json.dumps(model.toDict()), time.time()))
+                        connection.execute("DELETE FROM model_cache WHERE key NOT IN (SELECT key FROM model_cache ORDER BY accessed DESC LIMIT ?)", (self.maxDiskEntries,))
+                except sqlite3.Error as e:
+                    logging.error(f"Error writing the model cache: {e}")
+        self._remember(key, model)
+        return model
+
+    def save(self, netlist, solver):
+        """
+        Store the results of a solver again, e.g. after new transfer functions have been computed on a lazy solver.
+
+        Args:
+            netlist (str): The netlist the solver was built from.
+            solver (Solver): The solver to store.
+        """
+        if solver.mode != 'numeric':
+            canonical = CanonicalNetlist(netlist)
+            self.put(self.key(canonical.netlist, mode=solver.mode, lazy=solver.lazy), self._canonicalState(netlist, canonical, solver))
+
+    def _canonicalState(self, netlist, canonical, solver):
+        # The equations are kept as written, with the key of the netlist they are valid for
+        state = solver.getState()
+        stored = canonical.toCanonical(state)
+        stored["equations"] = state["equations"]
+        stored["source"] = self.key(netlist)
+        return stored
+
+    def get(self, key):
+        """
+        Look a state up in memory first, then on disk.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            dict: The solver state, or None if the key is not cached.
+        """
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key]
+        if not self.path:
+            return None
+        try:
+            with self._connect() as connection:
+                row = connection.execute("SELECT state FROM solver_cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                connection.execute("UPDATE solver_cache SET accessed = ? WHERE key = ?", (time.time(), key))
+            state = self.deserialize(row[0])
+        except (sqlite3.Error, ValueError, sympy.SympifyError) as e:
+            logging.error(f"Error reading the solver cache: {e}")
+            return None
+        self._remember(key, state)
+        return state
+
+    def put(self, key, state):
+        """
+        Store a state in memory and on disk, evicting the least recently used entries beyond the size bounds.
+
+        Args:
+            key (str): The cache key.
+            state (dict): The solver state in canonical names, with the key of the netlist its equations were written for ("source").
+        """
+        self._remember(key, state)
+        if not self.path:
+            return
+        try:
+            with self._connect() as connection:
+                connection.execute("INSERT OR REPLACE INTO solver_cache (key, state, accessed) VALUES (?, ?, ?)", (key, self.serialize(state), time.time()))
+                connection.execute("DELETE FROM solver_cache WHERE key NOT IN (SELECT key FROM solver_cache ORDER BY accessed DESC LIMIT ?)", (self.maxDiskEntries,))
+        except sqlite3.Error as e:
+            # The cache is only an optimization, a failing disk must not fail the solve
+            logging.error(f"Error writing the solver cache: {e}")
+
+    def clear(self):
+        """
+        Remove every entry, in memory and on disk.
+        """
+        with self.lock:
+            self.memory.clear()
+        if self.path:
+            with self._connect() as connection:
+                connection.execute("DELETE FROM solver_cache")
+                connection.execute("DELETE FROM model_cache")
+
+    def _remember(self, key, state):
+        with self.lock:
+            self.memory[key] = state
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.maxEntries:
+                self.memory.popitem(last=False)
+
+    @staticmethod
+    def serialize(state):
+        """
+        Serialize a solver state to JSON, Sympy expressions are stored with srepr.
+
+        Args:
+            state (dict): The solver state, as returned by Solver.getState.
+
+        Returns:
+            str: The JSON document.
+        """
+        return json.dumps({
+            "source": state["source"],
+            "equations": [[sympy.srepr(equation), explanation] for equation, explanation in state["equations"]],
+            "solutions": [[sympy.srepr(unknown), sympy.srepr(solution)] for unknown, solution in state["solutions"].items()],
+            "transferFunctions": [[list(nodes), sympy.srepr(tf)] for nodes, tf in state["transferFunctions"].items()],
+            "numericalTransferFunctions": [[list(nodes), [num, den]] for nodes, (num, den) in state["numericalTransferFunctions"].items()],
+        })
+
+    @staticmethod
+    def deserialize(document):
+        """
+        Rebuild a solver state serialized with serialize.
+
+        Args:
+            document (str): The JSON document.
+
+        Returns:
+            dict: The solver state, to be given to Solver.
+        """
+        data = json.loads(document)
+        return {
+            "source": data["source"],
+            "equations": [(sympy.sympify(equation), explanation) for equation, explanation in data["equations"]],
+            "solutions": {sympy.sympify(unknown): sympy.sympify(solution) for unknown, solution in data["solutions"]},
+            "transferFunctions": {tuple(nodes): sympy.sympify(tf) for nodes, tf in data["transferFunctions"]},
+            "numericalTransferFunctions": {tuple(nodes): (num, den) for nodes, (num, den) in data["numericalTransferFunctions"]},
+        }
@@ -0,0 +1,235 @@
+"""
+canonical.py
+
+This module computes a canonical form of a netlist, invariant to node names, component names, line order and unit spelling,
+so that equivalent submissions share their cached results.
+
+The canonical labeling is computed on the bipartite component/node graph: colour refinement, then individualization of
+the vertices of the first ambiguous cell, keeping the labeling whose netlist is the smallest.
+
+Classes:
+    CanonicalNetlist: Canonical netlist, fingerprint and mapping back to the user's names.
+"""
+
+import hashlib
+import logging
+
+import sympy
+
+from solver import Parser, Subcircuit
+
+SYMMETRIC_TYPES = ('R', 'C') # Components whose terminals can be swapped: the branch current of an inductor has an orientation
+MAX_LEAVES = 1024 # Bound of the individualization search, highly symmetric circuits keep the best labeling found
+
+
+class CanonicalNetlist:
+    """
+    Canonical form of a netlist.
+
+    Attributes:
+        netlist (str): The canonical netlist: components named by type and rank (R1, R2, ...), nodes numbered 1, 2, ... and '0' for the ground.
+        fingerprint (str): The hexadecimal SHA-256 digest of the canonical netlist.
+        componentNames (dict): Canonical component name -> user component name.
+        nodeNames (dict): Canonical node name -> user node name.
+    """
+    def __init__(self, netlist):
+        components, _ = Parser.parse_netlist(netlist)
+        self.components = components
+        self.userNodes = sorted({node for component in components for node in component.nodes})
+        labeling = self._canonicalLabeling()
+        self._build(labeling)
+        self.fingerprint = hashlib.sha256(self.netlist.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _valueKey(component):
+        if isinstance(component, Subcircuit):
+            return component.definition.name # The definitions are part of the canonical netlist, with their names
+        if isinstance(component.value, str):
+            return component.value # Transistor type
+        # 12 significant digits: the unit spellings of a value (100n, 0.1u) differ in the last bits of their float
+        return 'SYMBOLIC' if component.value is None else f'{float(component.value):.12g}'
+
+    def _terminals(self, component):
+        # Edge labels of the terminals: the terminals of a symmetric component are indistinguishable
+        kind = component.name[0]
+        return [(0 if kind in SYMMETRIC_TYPES else position, node) for position, node in enumerate(component.nodes)]
+
+    def _canonicalLabeling(self):
+        """
+        Compute the canonical rank of every node.
+
+        Returns:
+            dict: User node name -> canonical rank (0 for the ground).
+        """
+        nodes = [node for node in self.userNodes if node != '0']
+        vertices = [('c', i) for i in range(len(self.components))] + [('n', node) for node in nodes]
+        neighbours = {vertex: [] for vertex in vertices}
+        for i, component in enumerate(self.components):
+            for label, node in self._terminals(component):
+                if node == '0':
+                    continue
+                neighbours[('c', i)].append((label, ('n', node)))
+                neighbours[('n', node)].append((label, ('c', i)))
+        initial = {('c', i): (0, component.name[0], self._valueKey(component), tuple(label for label, node in self._terminals(component) if node == '0'))
+                   for i, component in enumerate(self.components)}
+        initial.update({('n', node): (1,) for node in nodes})
+        colours = self._refine(initial, neighbours)
+
+        best = [None, None] # [certificate, labeling]
+        leaves = [0]
+
+        def search(colours):
+            if leaves[0] >= MAX_LEAVES:
+                return
+            cells = {}
+            for vertex, colour in colours.items():
+                cells.setdefault(colour, []).append(vertex)
+            ambiguous = [colour for colour, cell in cells.items() if len(cell) > 1]
+            if not ambiguous:
+                leaves[0] += 1
+                labeling = {vertex[1]: colour + 1 for vertex, colour in colours.items() if vertex[0] == 'n'}
+                labeling['0'] = 0
+                certificate = self._certificate(labeling)
+                if best[0] is None or certificate < best[0]:
+                    best[0], best[1] = certificate, labeling
+                return
+            target = min(ambiguous)
+            tried = set()
+            for vertex in sorted(cells[target], key=lambda v: (v[0], str(v[1]))):
+                twin = tuple(sorted(neighbours[vertex], key=str))
+                if twin in tried:
+                    continue # Vertices with the same neighbours are interchangeable, e.g. identical resistors in parallel
+                tried.add(twin)
+                individualized = {v: (colour, 0 if v == vertex else 1) if colour == target else (colour, 0) for v, colour in colours.items()}
+                search(self._refine(individualized, neighbours))
+
+        search(colours)
+        if leaves[0] >= MAX_LEAVES:
+            logging.warning(f"Canonical labeling search stopped after {MAX_LEAVES} leaves, the fingerprint may not be invariant.")
+        ranks = sorted(set(best[1].values()))
+        return {node: ranks.index(colour) for node, colour in best[1].items()}
+
+    @staticmethod
+    def _refine(colours, neighbours):
+        """
+        Colour refinement: split the colour classes by the multiset of (edge label, neighbour colour) until stable.
+
+        Args:
+            colours (dict): Vertex -> sortable colour.
+            neighbours (dict): Vertex -> list of (edge label, neighbour vertex).
+
+        Returns:
+            dict: Vertex -> integer colour, the integers being ordered as the signatures.
+        """
+        ranks = sorted(set(colours.values()))
+        current = {vertex: ranks.index(colour) for vertex, colour in colours.items()}
+        while True:
+            signatures = {vertex: (current[vertex], tuple(sorted((label, current[other]) for label, other in neighbours[vertex]))) for vertex in current}
+            ranks = sorted(set(signatures.values()))
+            index = {signature: rank for rank, signature in enumerate(ranks)}
+            refined = {vertex: index[signature] for vertex, signature in signatures.items()}
+            if len(ranks) == len(set(current.values())):
+                return refined
+            current = refined
+
+    def _line(self, component, labeling):
+        kind = component.name[0]
+        nodes = [labeling[node] for node in component.nodes]
+        if kind in SYMMETRIC_TYPES:
+            nodes.sort()
+        return (kind, self._valueKey(component), tuple(nodes))
+
+    def _certificate(self, labeling):
+        return tuple(sorted(self._line(component, labeling) for component in self.components))
+
+    def _build(self, labeling):
+        """
+        Name the components and nodes after the canonical labeling and write the canonical netlist.
+
+        Args:
+            labeling (dict): User node name -> canonical rank.
+        """
+        self.nodeNames = {str(rank): node for node, rank in labeling.items()}
+        canonicalNode = {node: name for name, node in self.nodeNames.items()}
+        lines, counts = [], {}
+        self.componentNames = {}
+        for line, component in sorted((self._line(component, labeling), i) for i, component in enumerate(self.components)):
+            component = self.components[component]
+            kind = line[0]
+            counts[kind] = counts.get(kind, 0) + 1
+            name = f'{kind}{counts[kind]}'
+            self.componentNames[name] = component.name
+            nodes = [canonicalNode[node] for node in component.nodes]
+            if kind in SYMMETRIC_TYPES:
+                nodes.sort(key=lambda node: labeling[self.nodeNames[node]])
+            value = '' if kind == 'O' else f' {line[1]}'
+            lines.append(f"{name} {' '.join(nodes)}{value}")
+        definitions = {}
+        for component in self.components:
+            if isinstance(component, Subcircuit):
+                definitions.update((definition.name, definition) for definition in component.definition.definitions())
+        for definitionName in sorted(definitions, reverse=True):
+            lines.insert(0, definitions[definitionName].source)
+        self.netlist = '\n'.join(lines)
+        self.userNode = canonicalNode # User node name -> canonical node name
+
+    def symbolMap(self):
+        """
+        Map every symbol of the canonical circuit to the symbol of the user's circuit: component values, node voltages and branch currents.
+
+        Returns:
+            dict: Canonical sympy.Symbol -> user sympy.Symbol.
+        """
+        mapping = {}
+        components = {component.name: component for component in self.components}
+        for canonical, user in self.componentNames.items():
+            kind = canonical[0]
+            if kind == 'I':
+                mapping[sympy.Symbol(f'i_{canonical}')] = sympy.Symbol(f'i_{user}')
+            elif kind == 'O':
+                mapping[sympy.Symbol(f'i_{canonical}_voltage')] = sympy.Symbol(f'i_{user}_voltage')
+            elif kind == 'X':
+                for port in components[user].definition.ports:
+                    mapping[sympy.Symbol(f'i_{canonical}.{port}')] = sympy.Symbol(f'i_{user}.{port}')
+            else:
+                mapping[sympy.Symbol(canonical)] = sympy.Symbol(user)
+                if kind in ('V', 'L'):
+                    mapping[sympy.Symbol(f'i_{canonical}')] = sympy.Symbol(f'i_{user}')
+        for canonical, user in self.nodeNames.items():
+            mapping[sympy.Symbol(f'v_{canonical}')] = sympy.Symbol(f'v_{user}')
+        return mapping
+
+    def toUser(self, state):
+        """
+        Rename a solver state of the canonical circuit into the names of the user's circuit.
+        The equations are not renamed: their order and explanations depend on the netlist as written.
+
+        Args:
+            state (dict): A solver state in canonical names, see Solver.getState.
+
+        Returns:
+            dict: The solver state in the user's names.
+        """
+        return self._rename(state, self.symbolMap(), self.nodeNames)
+
+    def toCanonical(self, state):
+        """
+        Rename a solver state of the user's circuit into the canonical names, equations excepted.
+
+        Args:
+            state (dict): A solver state in the user's names, see Solver.getState.
+
+        Returns:
+            dict: The solver state in canonical names.
+        """
+        inverse = {user: canonical for canonical, user in self.symbolMap().items()}
+        return self._rename(state, inverse, self.userNode)
+
+    @staticmethod
+    def _rename(state, symbols, nodes):
+        # xreplace renames simultaneously: canonical and user names may overlap (e.g. R1 <-> R2)
+        return {
+            "solutions": {symbols.get(unknown, unknown): solution.xreplace(symbols) for unknown, solution in state.get("solutions", {}).items()},
+            "transferFunctions": {(nodes[i], nodes[o]): tf.xreplace(symbols) for (i, o), tf in state.get("transferFunctions", {}).items()},
+            "numericalTransferFunctions": {(nodes[i], nodes[o]): coefficients for (i, o), coefficients in state.get("numericalTransferFunctions", {}).items()},
+        }
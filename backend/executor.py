@@ -0,0 +1,301 @@
+"""
+executor.py
+
+This module runs solver jobs in a pool of warm worker processes, so that a pathological netlist cannot pin a web worker.
+Each job has a hard wall-clock timeout and a memory cap: a runaway worker is killed and replaced,
+the other jobs and the web worker keep running. The cap is enforced twice: the worker limits its own address space
+(RLIMIT_AS, an allocation beyond it raises MemoryError at once) and the parent polls its resident memory.
+
+Classes:
+    SolveExecutor: Pool of worker processes with SymPy/SciPy preloaded, one job at a time per worker.
+    SolveTimeoutError: Raised when a job exceeds its wall-clock timeout.
+    SolveMemoryError: Raised when a job exceeds the memory cap.
+    WorkerCrashedError: Raised when a worker process dies during a job.
+"""
+
+import os
+import time
+import queue
+import atexit
+import logging
+import inspect
+import importlib
+import threading
+import multiprocessing
+from concurrent.futures import Future
+
+try:
+    import resource
+except ImportError: # Not available on Windows: the memory cap then relies on the resident memory polling only
+    resource = None
+
+
+class SolveTimeoutError(Exception):
+    pass
+
+
+class SolveMemoryError(Exception):
+    pass
+
+
+class WorkerCrashedError(Exception):
+    pass
+
+
+def _limitAddressSpace(maxMemory):
+    # Address space of the worker: what the preloaded modules already map, plus the memory cap
+    try:
+        with open('/proc/self/statm') as statm:
+            mapped = int(statm.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        limit = mapped + maxMemory
+        resource.setrlimit(resource.RLIMIT_AS, (limit if hard == resource.RLIM_INFINITY else min(limit, hard), hard))
+    except (OSError, ValueError, IndexError) as e:
+        logging.warning(f"Could not limit the address space of the solver worker: {e}")
+
+
+def _serve(connection, preload, maxMemory=None):
+    """
+    Main loop of a worker process: import the heavy modules once, then run the jobs received on the connection.
+
+    Args:
+        connection (multiprocessing.connection.Connection): The worker end of the pipe.
+        preload (list): Names of the modules to import before the first job.
+        maxMemory (int): Memory cap of the jobs in bytes, on top of the preloaded modules, None for no cap.
+    """
+    for module in preload:
+        importlib.import_module(module)
+    if maxMemory and resource is not None:
+        _limitAddressSpace(maxMemory)
+    connection.send(('ready', os.getpid()))
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        function, args, kwargs = job
+        try:
+            result = function(*args, **kwargs)
+            if inspect.isgenerator(result): # Streaming job: every item is sent as soon as it is produced
+                for event in result:
+                    connection.send(('event', event))
+                result = None
+            result = ('ok', result)
+        except MemoryError:
+            result = ('memory', None) # The parent replaces the worker
+        except BaseException as e:
+            result = ('error', e)
+        try:
+            connection.send(result)
+        except Exception as e: # The result or the exception cannot be pickled
+            connection.send(('error', RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class _Worker:
+    """
+    One worker process and the parent end of its pipe.
+    """
+    def __init__(self, context, preload, startTimeout, maxMemory=None):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child, preload, maxMemory), daemon=True)
+        self.process.start()
+        child.close()
+        if not self.connection.poll(startTimeout):
+            self.kill()
+            raise WorkerCrashedError("The solver worker did not start in time.")
+        self.connection.recv()
+
+    def rss(self):
+        # Resident set size in bytes, from /proc (Linux); None where it is not available
+        try:
+            with open(f'/proc/{self.process.pid}/statm') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class SolveExecutor:
+    """
+    Runs functions in warm worker processes with a wall-clock timeout and a memory cap per job.
+    The workers are started on first use, after the web server has forked its own workers.
+
+    Attributes:
+        workers (int): Number of worker processes, one job at a time each.
+        timeout (float): Default wall-clock timeout of a job, in seconds.
+        maxMemory (int): Memory cap of a worker, in bytes, None for no cap: resident memory, and address space on top of the preloaded modules.
+        preload (list): Modules imported by every worker before its first job.
+    """
+    PRELOAD = ['sympy', 'numpy', 'scipy.signal', 'scipy.sparse.linalg', 'solver', 'jobs']
+
+    def __init__(self, workers=None, timeout=60, maxMemory=2**30, preload=None, pollInterval=0.05, startTimeout=120):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.maxMemory = maxMemory
+        self.preload = self.PRELOAD if preload is None else list(preload)
+        self.pollInterval = pollInterval
+        self.startTimeout = startTimeout
+        self.context = multiprocessing.get_context('spawn') # No fork of the (threaded) web worker
+        self.jobs = queue.Queue()
+        self.threads = []
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def start(self):
+        """
+        Start the workers now instead of on the first job.
+        """
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("The solve executor is shut down.")
+            if self.threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._slot, name=f'solve-worker-{i}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+            atexit.register(self.shutdown)
+
+    def submit(self, function, *args, timeout=None, onEvent=None, **kwargs):
+        """
+        Schedule a job.
+
+        Args:
+            function (callable): A module-level (picklable) function, or generator function for a streaming job.
+            *args: Positional arguments of the function.
+            timeout (float): Wall-clock timeout of this job, the executor timeout if None.
+            onEvent (callable): Called in a thread of the executor with every item yielded by a streaming job.
+            **kwargs: Keyword arguments of the function.
+
+        Returns:
+            concurrent.futures.Future: The future result, failing with SolveTimeoutError, SolveMemoryError, WorkerCrashedError
+            or the exception raised by the function.
+        """
+        self.start()
+        future = Future()
+        self.jobs.put((future, function, args, kwargs, self.timeout if timeout is None else timeout, onEvent))
+        return future
+
+    def run(self, function, *args, timeout=None, **kwargs):
+        """
+        Run a job and wait for its result, see submit.
+        """
+        return self.submit(function, *args, timeout=timeout, **kwargs).result()
+
+    def stream(self, function, *args, timeout=None, **kwargs):
+        """
+        Run a streaming job and yield its items as soon as the worker produces them.
+
+        Args:
+            function (callable): A module-level generator function.
+            *args: Positional arguments of the function.
+            timeout (float): Wall-clock timeout of the whole job, the executor timeout if None.
+            **kwargs: Keyword arguments of the function.
+
+        Yields:
+            The items yielded by the function.
+
+        Raises:
+            SolveTimeoutError, SolveMemoryError, WorkerCrashedError or the exception raised by the function, after the last item.
+        """
+        events = queue.Queue()
+        end = object()
+        future = self.submit(function, *args, timeout=timeout, onEvent=events.put, **kwargs)
+        future.add_done_callback(lambda future: events.put(end))
+        while True:
+            event = events.get()
+            if event is end:
+                break
+            yield event
+        future.result()
+
+    def shutdown(self):
+        """
+        Stop the workers once the queued jobs are done.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def _slot(self):
+        """
+        Own one worker process: send it the jobs one at a time, watch its time and memory, replace it when it is killed.
+        """
+        worker = None
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                break
+            future, function, args, kwargs, timeout, onEvent = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if worker is None or not worker.process.is_alive():
+                    worker = _Worker(self.context, self.preload, self.startTimeout, self.maxMemory)
+                worker.connection.send((function, args, kwargs))
+            except Exception as e:
+                logging.error(f"Error sending a job to a solver worker: {e}")
+                future.set_exception(e)
+                continue
+            worker = self._wait(worker, future, timeout, onEvent)
+        if worker is not None:
+            try:
+                worker.connection.send(None)
+                worker.process.join(5)
+            except OSError:
+                pass
+            if worker.process.is_alive():
+                worker.kill()
+
+    def _wait(self, worker, future, timeout, onEvent=None):
+        """
+        Wait for the result of the running job and resolve its future.
+
+        Returns:
+            _Worker: The worker, or None if it had to be killed.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                message = worker.connection.recv() if worker.connection.poll(self.pollInterval) else None
+            except (EOFError, OSError):
+                error = WorkerCrashedError("The solver worker died during the job.")
+                break
+            if message is not None:
+                status, value = message
+                if status == 'ok':
+                    future.set_result(value)
+                    return worker
+                if status == 'error':
+                    future.set_exception(value)
+                    return worker
+                if status == 'memory':
+                    error = SolveMemoryError(f"The job exceeded the {self.maxMemory} bytes memory cap.")
+                    break
+                if onEvent is not None: # A streaming job keeps sending events: the checks below still run on every one
+                    onEvent(value)
+            if time.monotonic() > deadline:
+                error = SolveTimeoutError(f"The job exceeded its {timeout} s timeout.")
+                break
+            rss = worker.rss() if self.maxMemory else None
+            if rss is not None and rss > self.maxMemory:
+                error = SolveMemoryError(f"The job exceeded the {self.maxMemory} bytes memory cap.")
+                break
+            if not worker.process.is_alive():
+                error = WorkerCrashedError("The solver worker died during the job.")
+                break
+        logging.error(f"Killing solver worker {worker.process.pid}: {error}")
+        worker.kill()
+        future.set_exception(error)
+        return None
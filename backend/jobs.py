@@ -0,0 +1,177 @@
+"""
+jobs.py
+
+This module defines the solver jobs run by the worker processes of the SolveExecutor.
+Jobs are module-level functions taking and returning plain (picklable, JSON serializable) data.
+
+Functions:
+    solveNetlist: Solve a netlist and return its equations, solutions and transfer function.
+    solveStages: Solve a netlist stage by stage, yielding the result of every stage as soon as it is ready.
+    solveBatch: Solve many netlists in parallel, identical inputs once, with one result or error per item.
+"""
+
+import time
+from contextlib import contextmanager
+
+import sympy
+
+from cache import SolverCache, normalizeNetlist
+from solver import Circuit, Solver, Simulator
+
+_cache = None # Solver cache of the worker process, opened on the first job
+
+
+def getCache():
+    """
+    Return the solver cache of the current process, shared on disk with the other workers.
+    """
+    global _cache
+    if _cache is None:
+        _cache = SolverCache()
+    return _cache
+
+
+@contextmanager
+def timed(stages, name):
+    """
+    Record the duration of a stage, in seconds, in the stages dictionary.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = time.perf_counter() - start
+
+
+def solveNetlist(netlist, inputNode=None, outputNode=None, mode='symbolic', approximation=None):
+    """
+    Solve a netlist.
+
+    Args:
+        netlist (str): The netlist of the circuit.
+        inputNode (str): The node where the input voltage is applied, optional.
+        outputNode (str): The node where the output voltage is measured, optional.
+        mode (str): 'symbolic' or 'numeric'.
+        approximation (float): Relative error bound of an approximate transfer function, optional, see Solver.getApproximateTransferFunction.
+
+    Returns:
+        dict: A dictionary with the equations and solutions in LaTeX and, if both nodes are given, the transfer function
+        in LaTeX with its numerical coefficients when every component has a value, and with an approximation its approximate
+        transfer function and achieved error. "stages" holds the duration of each stage in seconds.
+    """
+    stages = {}
+    cache = getCache()
+    with timed(stages, "solve"):
+        solver = cache.getSolver(netlist, mode=mode)
+    if mode == 'numeric':
+        with timed(stages, "numeric"):
+            solutions = solver.getNumericalSolution()
+        return {"solutions": solutions, "stages": stages}
+    with timed(stages, "latex"):
+        result = {
+            "equations": [{"equation": sympy.latex(equation), "explication": explanation} for equation, explanation in solver.equations],
+            "solutions": {sympy.latex(unknown): sympy.latex(solution) for unknown, solution in solver.solutions.items()},
+        }
+    if inputNode is not None and outputNode is not None:
+        inputNode, outputNode = str(inputNode).upper(), str(outputNode).upper() # The parser upper-cases the node names
+        with timed(stages, "transferFunction"):
+            result["transferFunction"] = sympy.latex(solver.getTransferFunction(inputNode, outputNode))
+        with timed(stages, "numeric"):
+            try:
+                result["numerator"], result["denominator"] = solver.getNumericalTransferFunction(inputNode, outputNode)
+            except ValueError:
+                pass # Symbolic components: no numerical transfer function
+        if approximation is not None and "denominator" in result:
+            with timed(stages, "approximation"):
+                approximate = solver.getApproximateTransferFunction(inputNode, outputNode, tolerance=float(approximation))
+                result["approximateTransferFunction"] = sympy.latex(approximate.expression)
+                result["approximationError"] = approximate.error
+                result["approximationTerms"] = [approximate.terms, approximate.exactTerms]
+        cache.save(netlist, solver)
+    result["stages"] = stages
+    return result
+
+
+def solveStages(netlist, inputNode=None, outputNode=None):
+    """
+    Solve a netlist stage by stage: the equations are sent first, long before the solutions of a large circuit.
+
+    Args:
+        netlist (str): The netlist of the circuit.
+        inputNode (str): The node where the input voltage is applied, optional.
+        outputNode (str): The node where the output voltage is measured, optional.
+
+    Yields:
+        dict: One event per stage ("parse", "equations", "solutions", then with both nodes "transferFunction" and, when every
+        component has a value, "numeric", "bode" and "step"), with the "elapsed" time in seconds since the start.
+    """
+    start = time.perf_counter()
+
+    def event(stage, **data):
+        return {"stage": stage, "elapsed": time.perf_counter() - start, **data}
+
+    circuit = Circuit(netlist) # Parsing and linearization
+    yield event("parse",
+                components=[{"name": c.name, "type": type(c).__name__, "nodes": c.nodes, "value": c.value} for c in circuit.components if not c.isVirtual],
+                nodes=circuit.nodes)
+    solver = Solver(circuit, lazy=True)
+    yield event("equations", equations=[{"equation": sympy.latex(equation), "explication": explanation} for equation, explanation in solver.equations])
+    solver.solveEqSys()
+    yield event("solutions", solutions={sympy.latex(unknown): sympy.latex(solution) for unknown, solution in solver.solutions.items()})
+    if inputNode is None or outputNode is None:
+        return
+    inputNode, outputNode = str(inputNode).upper(), str(outputNode).upper() # The parser upper-cases the node names
+    yield event("transferFunction", transferFunction=sympy.latex(solver.getTransferFunction(inputNode, outputNode)))
+    try:
+        num, den = solver.getNumericalTransferFunction(inputNode, outputNode)
+    except ValueError:
+        return # Symbolic components: no numerical curves
+    yield event("numeric", numerator=num, denominator=den)
+    simulator = Simulator(circuit, num, den, solver=solver, inputNode=inputNode, outputNode=outputNode)
+    w, mag, phase = simulator.getFrequencyResponse()
+    yield event("bode", w=w.tolist(), magnitude=mag.tolist(), phase=phase.tolist())
+    t, x, y = simulator.getStepResponse()
+    yield event("step", t=t.tolist(), input=x.tolist(), output=y.tolist())
+
+
+def solveBatch(items, executor=None, timeout=None):
+    """
+    Solve many netlists in parallel in the worker processes of an executor. Identical inputs are solved once,
+    and a failing item does not fail the others.
+
+    Args:
+        items (list): Dictionaries with a "netlist" and optionally "inputNode", "outputNode" and "mode", as solveNetlist.
+        executor (SolveExecutor): The executor to use, a temporary one with one worker per core if None.
+        timeout (float): Wall-clock timeout of each item, the executor timeout if None.
+
+    Returns:
+        list: One dictionary per item, in order: {"result": dict} as returned by solveNetlist, or {"error": Exception}.
+    """
+    from executor import SolveExecutor # The workers import this module
+    ownExecutor = executor is None
+    if ownExecutor:
+        executor = SolveExecutor()
+    try:
+        futures, keys = {}, []
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get("netlist"), str):
+                keys.append(None)
+                continue
+            arguments = (item["netlist"], item.get("inputNode"), item.get("outputNode"), item.get("mode", "symbolic"))
+            key = (normalizeNetlist(arguments[0]).upper(),) + tuple(None if a is None else str(a).upper() for a in arguments[1:3]) + arguments[3:]
+            if key not in futures:
+                futures[key] = executor.submit(solveNetlist, *arguments, timeout=timeout)
+            keys.append(key)
+        results = []
+        for key in keys:
+            if key is None:
+                results.append({"error": ValueError("Each item needs a netlist.")})
+                continue
+            try:
+                results.append({"result": futures[key].result()})
+            except Exception as e:
+                results.append({"error": e})
+        return results
+    finally:
+        if ownExecutor:
+            executor.shutdown()
@@ -0,0 +1,325 @@
+"""
+nonlinear.py
+
+This module computes the DC operating point of circuits with nonlinear devices (diodes, bipolar transistors, saturating opamps)
+with the Newton-Raphson method on the numeric MNA system of their linear part.
+
+The model of each device type (Diode, BJT, Opamp) is written once with Sympy: its residual and Jacobian are derived symbolically,
+then compiled with sympy.lambdify into NumPy functions evaluated on every device of the type at once.
+
+Classes:
+    CompiledDeviceModel: Residual and Jacobian of a device type, compiled for arrays of devices.
+    DeviceGroup: The devices of one type in a circuit, with their gather and scatter indices.
+    NonlinearDCSolver: Newton-Raphson DC operating point with gmin stepping and source stepping.
+"""
+
+import logging
+
+import numpy as np
+import sympy
+from scipy.sparse import coo_matrix
+from scipy.sparse.linalg import splu
+
+from solver import MNASystem, Diode, BJT, Opamp, LimitedExp, LimitedExpDerivative
+
+
+class CompiledDeviceModel:
+    """
+    Residual f(v) and Jacobian df/dv of a device type, compiled from the symbolic model of its class.
+
+    Attributes:
+        deviceClass (type): The component class, with MODEL_PARAMETERS and modelExpressions.
+        inputs (int): Number of unknowns the model depends on.
+        outputs (int): Number of rows the model adds to.
+    """
+    MODULES = [{'LimitedExp': LimitedExp.evaluate, 'LimitedExpDerivative': LimitedExpDerivative.evaluate}, 'numpy']
+    _compiled = {} # Device class -> CompiledDeviceModel, shared by every circuit
+
+    def __init__(self, deviceClass, inputs):
+        self.deviceClass = deviceClass
+        self.inputs = inputs
+        v = sympy.symbols(f'v0:{inputs}')
+        parameters = sympy.symbols(' '.join(deviceClass.MODEL_PARAMETERS), seq=True)
+        expressions = deviceClass.modelExpressions(v, parameters)
+        self.outputs = len(expressions)
+        jacobian = [sympy.diff(expression, variable) for expression in expressions for variable in v]
+        self._residual = sympy.lambdify(v + tuple(parameters), expressions, modules=self.MODULES)
+        self._jacobian = sympy.lambdify(v + tuple(parameters), jacobian, modules=self.MODULES)
+
+    @classmethod
+    def get(cls, deviceClass, inputs):
+        """
+        Return the compiled model of a device class, compiled on first use.
+        """
+        model = cls._compiled.get(deviceClass)
+        if model is None:
+            model = cls._compiled[deviceClass] = cls(deviceClass, inputs)
+        return model
+
+    def evaluate(self, V, P):
+        """
+        Evaluate the residual and the Jacobian of every device.
+
+        Args:
+            V (numpy.ndarray): Input values, shape (devices, inputs).
+            P (numpy.ndarray): Parameter values, shape (devices, parameters).
+
+        Returns:
+            tuple: A tuple containing the residuals (devices, outputs) and the Jacobians (devices, outputs, inputs).
+        """
+        count = len(V)
+        arguments = list(V.T) + list(P.T)
+        F = np.column_stack([np.broadcast_to(value, (count,)) for value in self._residual(*arguments)])
+        J = np.column_stack([np.broadcast_to(value, (count,)) for value in self._jacobian(*arguments)])
+        return F, J.reshape(count, self.outputs, self.inputs)
+
+
+class DeviceGroup:
+    """
+    The devices of one type in a circuit: the model is evaluated on all of them at once, the results are scattered into the residual and the Jacobian.
+
+    Attributes:
+        model (CompiledDeviceModel): The compiled model of the type.
+        names (list): The names of the devices.
+        inputs (numpy.ndarray): Index of the unknown of each input, shape (devices, inputs); the ground is the extra index n.
+        rows (numpy.ndarray): Row of each output, shape (devices, outputs); the ground is the extra index n.
+        parameters (numpy.ndarray): Parameter values, shape (devices, parameters).
+    """
+    def __init__(self, model, devices, mna, parameters):
+        ground = mna.size
+        self.model = model
+        self.names = [device.name for device in devices]
+        terminals = [device.getModelTerminals(mna) for device in devices]
+        self.inputs = np.array([[ground if index is None else index for index in inputs] for inputs, rows, replaced in terminals], dtype=np.int64)
+        self.rows = np.array([[ground if index is None else index for index in rows] for inputs, rows, replaced in terminals], dtype=np.int64)
+        self.replaced = [row for inputs, rows, replaced in terminals for row in replaced]
+        self.parameters = np.array(parameters, dtype=float).reshape(len(devices), len(model.deviceClass.MODEL_PARAMETERS))
+        # Scatter pattern of the Jacobian, fixed by the topology: entry (device, output, input) -> (row, column)
+        self.jacobianRows = np.repeat(self.rows[:, :, None], model.inputs, axis=2).ravel()
+        self.jacobianColumns = np.repeat(self.inputs[:, None, :], model.outputs, axis=1).ravel()
+
+    def stamp(self, xGround, previous=None, initial=False):
+        """
+        Linearize the devices and return the contributions of their companion models.
+        With the inputs the devices were evaluated at in the previous iteration, the junction voltages are limited first:
+        the devices are linearized at the limited inputs V* and contribute f(V*) + J(V*).(V - V*) to the residual.
+
+        Args:
+            xGround (numpy.ndarray): The unknowns, extended with the ground (0).
+            previous (numpy.ndarray): The inputs of the previous evaluation, None for no limiting.
+            initial (bool): Evaluate the devices at their initial junction voltages (first iteration from a blind guess).
+
+        Returns:
+            tuple: A tuple containing the rows and values of the residual, the rows, columns and values of the Jacobian,
+            and the inputs the devices were evaluated at.
+        """
+        V = xGround[self.inputs]
+        deviceClass = self.model.deviceClass
+        if initial and hasattr(deviceClass, 'initialInputs'):
+            evaluated = deviceClass.initialInputs(V, self.parameters)
+        elif previous is not None and hasattr(deviceClass, 'limitInputs'):
+            evaluated = deviceClass.limitInputs(previous, V, self.parameters)
+        else:
+            evaluated = V
+        F, J = self.model.evaluate(evaluated, self.parameters)
+        F = F + np.einsum('doi,di->do', J, V - evaluated)
+        return self.rows.ravel(), F.ravel(), self.jacobianRows, self.jacobianColumns, J.ravel(), evaluated
+
+
+class NonlinearDCSolver:
+    """
+    DC operating point of a circuit with nonlinear devices.
+
+    The linear part is the numeric MNA system at p = 0 (capacitors open, inductors shorted), the residual is
+    F(x) = G.x + f(x) - lambda.b with f the device models. Each Newton-Raphson iteration solves J.dx = -F with J = G + df/dx:
+    the Jacobian and residual of a device are the conductances and equivalent current sources of its companion model.
+    When Newton-Raphson does not converge from the initial guess, gmin stepping (a conductance to the ground on every node,
+    decreased by decades) then source stepping (lambda increased from 0 to 1) are tried.
+
+    Attributes:
+        circuit (Circuit): The circuit.
+        mna (MNASystem): The numeric MNA system of the linear part.
+        labels (list): Label of each unknown (e.g. 'v_1', 'i_V1'), in column order.
+        groups (list): The DeviceGroup of every device type.
+        gmin (float): Conductance from every node to the ground, kept in the final solution as in SPICE.
+        relativeTolerance, voltageTolerance, currentTolerance (float): Convergence criteria on the Newton-Raphson updates.
+        maxIterations (int): Iterations of one Newton-Raphson solve.
+        maxStep (float): Largest change of a node voltage in one iteration, in Volts, None for no damping: the junction voltages are limited anyway.
+        iterations (int): Newton-Raphson iterations of the last solve, every stepping stage included.
+        strategy (str): How the last solve converged: 'newton', 'gmin' or 'source'.
+    """
+    def __init__(self, circuit, opampGain=None, opampSaturation=15.0, gmin=1e-12, relativeTolerance=1e-6,
+                 voltageTolerance=1e-6, currentTolerance=1e-12, maxIterations=100, maxStep=None):
+        """
+        Args:
+            circuit (Circuit): The circuit, every linear component with a numerical value.
+            opampGain (float): Open-loop gain of the opamps, which then saturate at +/- opampSaturation. Ideal opamps if None.
+            opampSaturation (float): Output saturation voltage of the opamps, in Volts.
+
+        Raises:
+            ValueError: If a linear component has no numerical value.
+        """
+        self.circuit = circuit
+        self.gmin = gmin
+        self.relativeTolerance = relativeTolerance
+        self.voltageTolerance = voltageTolerance
+        self.currentTolerance = currentTolerance
+        self.maxIterations = maxIterations
+        self.maxStep = maxStep
+        self.iterations = 0
+        self.strategy = None
+        self.solution = None
+        self.mna = MNASystem(circuit, None)
+        self.labels = self.mna.unknownLabels()
+        G, _, b = self.mna.toScipy()
+        self.b = np.asarray(b, dtype=float)
+        n = self.mna.size
+
+        devices = {}
+        for component in circuit.components:
+            if isinstance(component, (Diode, BJT)) or (isinstance(component, Opamp) and opampGain is not None):
+                devices.setdefault(type(component), []).append(component)
+        self.groups = []
+        for deviceClass, members in devices.items():
+            if deviceClass is Opamp:
+                parameters = [(opampGain, opampSaturation)] * len(members)
+            else:
+                parameters = [member.getModelParameters() for member in members]
+            model = CompiledDeviceModel.get(deviceClass, len(members[0].nodes))
+            self.groups.append(DeviceGroup(model, members, self.mna, parameters))
+
+        G = G.tocoo()
+        replaced = np.array([row for group in self.groups for row in group.replaced], dtype=np.int64)
+        keep = ~np.isin(G.row, replaced) # The equations of the ideal opamps are replaced by their saturating model
+        self.G = coo_matrix((G.data[keep], (G.row[keep], G.col[keep])), shape=(n, n)).tocsr()
+        self.nodeCount = self.mna.nodeCount
+        self.tolerances = np.concatenate([np.full(self.nodeCount, voltageTolerance), np.full(n - self.nodeCount, currentTolerance)])
+
+    def residual(self, x, scale=1.0, gmin=None, states=None, initial=False):
+        """
+        Evaluate the residual F(x) and the sparse Jacobian J(x) of the whole circuit.
+
+        Args:
+            x (numpy.ndarray): The unknowns.
+            scale (float): The factor lambda of the independent sources.
+            gmin (float): The conductance from every node to the ground, self.gmin if None.
+            states (list): The inputs each device group was evaluated at in the previous iteration, updated in place.
+                The junction voltages are limited when given, see DeviceGroup.stamp.
+            initial (bool): Evaluate the devices at their initial junction voltages.
+
+        Returns:
+            tuple: A tuple containing F (numpy.ndarray), J (scipy.sparse.csc_matrix) and whether a junction voltage was limited.
+        """
+        n = len(x)
+        gmin = self.gmin if gmin is None else gmin
+        xGround = np.append(x, 0.0)
+        F = self.G @ x - scale * self.b
+        F[:self.nodeCount] += gmin * x[:self.nodeCount]
+        rows, columns, values = [np.arange(self.nodeCount)], [np.arange(self.nodeCount)], [np.full(self.nodeCount, gmin)]
+        limited = False
+        for k, group in enumerate(self.groups):
+            fRows, fValues, jRows, jColumns, jValues, evaluated = group.stamp(xGround, None if states is None else states[k], initial)
+            if states is not None:
+                limited = limited or not np.allclose(evaluated, xGround[group.inputs], rtol=0, atol=1e-12)
+                states[k] = evaluated
+            F += np.bincount(fRows, weights=fValues, minlength=n + 1)[:n]
+            mask = (jRows < n) & (jColumns < n)
+            rows.append(jRows[mask])
+            columns.append(jColumns[mask])
+            values.append(jValues[mask])
+        G = self.G.tocoo()
+        rows, columns, values = [G.row] + rows, [G.col] + columns, [G.data] + values
+        J = coo_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))), shape=(n, n)).tocsc()
+        return F, J, limited
+
+    def newton(self, x, scale=1.0, gmin=None, initial=False):
+        """
+        Run Newton-Raphson iterations from x.
+        With initial, the first iteration evaluates the junctions at their critical voltage instead of x, as SPICE does from a blind guess.
+
+        Returns:
+            numpy.ndarray: The converged unknowns, None if the iterations did not converge.
+        """
+        states = [None] * len(self.groups)
+        for iteration in range(self.maxIterations):
+            F, J, junctionLimited = self.residual(x, scale, gmin, states, initial and iteration == 0)
+            try:
+                dx = splu(J).solve(-F)
+            except RuntimeError: # Singular Jacobian
+                return None
+            self.iterations += 1
+            if not np.all(np.isfinite(dx)):
+                return None
+            largest = np.abs(dx[:self.nodeCount]).max(initial=0)
+            limited = self.maxStep is not None and largest > self.maxStep
+            if limited:
+                dx *= self.maxStep / largest # Damped step: the exponential of a junction is only accurate near the iterate
+            xNew = x + dx
+            if not limited and not junctionLimited and np.all(np.abs(dx) <= self.relativeTolerance * np.maximum(np.abs(x), np.abs(xNew)) + self.tolerances):
+                return xNew
+            x = xNew
+        return None
+
+    def solve(self, x0=None):
+        """
+        Compute the DC operating point.
+
+        Args:
+            x0 (array-like): Initial guess of the unknowns, zero if None.
+
+        Returns:
+            dict: A dictionary of key label (e.g. 'v_1', 'i_V1') and value the numerical solution.
+
+        Raises:
+            ValueError: If neither Newton-Raphson nor gmin and source stepping converge.
+        """
+        try:
+            logging.info("Starting to solve the nonlinear DC operating point.")
+            self.iterations = 0
+            start = np.zeros(len(self.labels)) if x0 is None else np.asarray(x0, dtype=float)
+            x, self.strategy = self.newton(start, initial=x0 is None), 'newton'
+            if x is None:
+                x, self.strategy = self._gminStepping(start, initial=x0 is None), 'gmin'
+            if x is None:
+                x, self.strategy = self._sourceStepping(), 'source'
+            if x is None:
+                raise ValueError(f"The DC operating point did not converge after {self.iterations} Newton-Raphson iterations.")
+            self.solution = x
+            logging.info(f"Finished solving the nonlinear DC operating point in {self.iterations} iterations ({self.strategy}).")
+            return dict(zip(self.labels, x.tolist()))
+        except Exception as e:
+            logging.error(f"Error solving the nonlinear DC operating point: {e}")
+            raise
+
+    def _gminStepping(self, x, start=1e-2, initial=False):
+        """
+        Solve with a large conductance from every node to the ground, then decrease it by decades down to gmin.
+        """
+        gmin = start
+        while True:
+            x = self.newton(x, gmin=max(gmin, self.gmin), initial=initial)
+            initial = False
+            if x is None:
+                return None
+            if gmin <= self.gmin:
+                return x
+            gmin /= 10
+
+    def _sourceStepping(self, minStep=1e-4):
+        """
+        Increase the independent sources from 0 to their value, halving the step after a failure.
+        """
+        x = self.newton(np.zeros(len(self.labels)), scale=0.0)
+        if x is None:
+            return None
+        scale, step = 0.0, 0.1
+        while scale < 1:
+            target = min(1.0, scale + step)
+            candidate = self.newton(x, scale=target)
+            if candidate is None:
+                step /= 4
+                if step < minStep:
+                    return None
+                continue
+            x, scale, step = candidate, target, min(step * 2, 0.5)
+        return x
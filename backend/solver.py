@@ -6,8 +6,18 @@ The solver is designed to produce transfer functions using Sympy for equation ma
 
 Classes:
     Component: Represents an electronic component in the circuit.
+    Diode, BJT: Nonlinear devices, solved by the Newton-Raphson DC solver of nonlinear.py.
+    LimitedExp: Exponential with a linear continuation, used by the device models.
+    Subcircuit: Instance of a subcircuit, stamped with the port model of its definition.
+    SubcircuitDefinition: .SUBCKT definition, reduced once to a port model by elimination of its internal unknowns.
+    CircuitArrays: Struct-of-arrays view of the components of a circuit, with a CSR node-to-component adjacency.
+    MNASystem: Sparse Modified Nodal Analysis matrices stamped by the components.
+    PolynomialSystem: Fraction-free solver of the MNA system in a polynomial ring.
+    CompiledTransferFunction: Transfer function compiled once into NumPy callables.
     Circuit: Represents the entire electronic circuit and provides methods to analyze and solve it.
-TODO : le résultat renvoyé est faux
+
+Functions:
+    limitJunction: Junction voltage limiting between Newton-Raphson iterations.
 """
 
 import sympy
@@ -18,8 +28,18 @@ import requests
 from dotenv import load_dotenv
 import os
 from scipy.signal import TransferFunction, bode, step, lti
+from scipy.sparse import coo_matrix
+from scipy.sparse.linalg import splu
+from sympy.polys.rings import PolyRing
+from sympy.polys.domains import ZZ
+from sympy.polys.polyerrors import ExactQuotientFailed
+import heapq
+import copy
+from collections import OrderedDict
 import numpy as np
 import logging
+from approximation import TransferFunctionApproximation
+from analysis import ACAnalysis, TransientAnalysis, StateSpaceModel, PoleZeroAnalysis, ReducedOrderModel, smallSignalExcitation
 
 # Configure logging at the beginning of the file
 logging.basicConfig(level=logging.ERROR)
@@ -30,76 +50,161 @@ api_key = os.getenv('OPENROUTER_API_KEY')
 
 class Parser:
     """
-    The parse_netlist static method parses a netlist string and returns a Circuit object with the components.
+    The parse_netlist static method parses a netlist in a single pass and returns the components and the nodes of the circuit.
     """
+    # Number with an optional exponent, then the unit letters (the line is already upper-cased)
+    VALUE_PATTERN = re.compile(r"([+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:E[+-]?[0-9]+)?)([A-Z]*)")
+    UNITS = {
+        'T': 1e12,
+        'G': 1e9,
+        'MEG': 1e6,
+        'K': 1e3,
+        'M': 1e-3,
+        'MIL': 25.4e-6,
+        'U': 1e-6,
+        'N': 1e-9,
+        'P': 1e-12,
+        'F': 1e-15,
+    }
+
     @staticmethod
     def parse_netlist(netlist, compute_numeric=True):
         """
-        Parses the netlist string and returns a list of Component objects and a list of nodes.
+        Parses the netlist line by line and returns a list of Component objects and a list of nodes.
+        The nodes are interned in one pass: the index of a node in the list is its integer id, in order of first appearance.
 
         Args:
-            netlist (str): The netlist string representing the circuit.
+            netlist (str or iterable): The netlist string, an open file or any iterable of lines.
             compute_numeric (bool): Flag to indicate whether to look for numeric values in netlist.
 
         Returns:
             tuple: A tuple containing a list of Component objects and a list of nodes.
+
+        Raises:
+            ValueError: If a line cannot be parsed, with its line number.
         """
         try:
             logging.info("Starting to parse netlist.")
-            component_list, node_list = [], []
-            lines = netlist.strip().split('\n')
-            value = None
-            for line in lines:
-                line = line.strip().upper()
-                if not line or line.startswith('*') or line.startswith('.'):
-                    continue  # Skip comments and directives
-                tokens = line.split()
+            componentTypes = {'R': Resistor, 'V': VoltageSource, 'L': Inductor, 'C': Capacitor, 'I': CurrentSource}
+            component_list, nodeIds, values = [], {}, {}
+            definitions, instances = {}, [] # Subcircuit definitions by name, (line number, instance) to resolve at the end
+            definition, target = None, component_list # Definition being read and the list its components go to
+            lines = netlist.splitlines() if isinstance(netlist, str) else netlist
+            for lineNumber, line in enumerate(lines, 1):
+                tokens = line.upper().split()
                 if not tokens:
-                    logging.warning(f"Empty tokens found in line: {line}")
                     continue
-
-                component_type = tokens[0][0].upper()  # First letter indicates component type
                 name = tokens[0]
-                nodes = Parser.extract_node_tokens(tokens, component_type)
-                
-                if compute_numeric:
-                    value_token = Parser.extract_value_token(component_type, tokens)
-                    if value_token != 'SYMBOLIC': # Symbolic is used to indicate that the value is not known (input variable for instance)
-                        value = Parser.parse_value(value_token)
-                
-                if component_type == 'R': # Resistor
-                    component = Resistor(name, nodes, value)
-                elif component_type == 'V': # Voltage source
-                    component = VoltageSource(name, nodes, value)
-                elif component_type == 'L': # Inductor
-                    component = Inductor(name, nodes, value)
-                elif component_type == 'C': # Capacitor
-                    component = Capacitor(name, nodes, value)
-                elif component_type == 'O': # Opamp
-                    component = Opamp(name, nodes)
-                elif component_type == 'I': # Current source
-                    component = CurrentSource(name, nodes, value)
-                else:
-                    logging.error(f"Unknown component type: {component_type}")
-                    raise ValueError(f"Unknown component type: {component_type}")
-                
-                component_list.append(component)
-
+                component_type = name[0]  # First letter indicates component type
+                if component_type in '*.':
+                    if name == '.SUBCKT':
+                        if definition is not None:
+                            raise ValueError(f"Line {lineNumber}: Nested .SUBCKT definitions are not supported")
+                        if len(tokens) < 3:
+                            raise ValueError(f"Line {lineNumber}: Missing name or ports for .SUBCKT")
+                        if tokens[1] in definitions:
+                            raise ValueError(f"Line {lineNumber}: Subcircuit {tokens[1]} is already defined")
+                        if '0' in tokens[2:]:
+                            raise ValueError(f"Line {lineNumber}: The ground cannot be a port of subcircuit {tokens[1]}")
+                        definition = definitions[tokens[1]] = SubcircuitDefinition(tokens[1], tokens[2:])
+                        target = definition.components
+                    elif name == '.ENDS':
+                        if definition is None:
+                            raise ValueError(f"Line {lineNumber}: .ENDS without .SUBCKT")
+                        definition, target = None, component_list
+                    continue  # Skip comments and other directives
+                componentClass = componentTypes.get(component_type)
+                try:
+                    if component_type == 'O': # Opamp: three nodes, no value
+                        nodes = tokens[1:4]
+                        if len(nodes) < 3:
+                            raise ValueError(f"Missing nodes for component {name}")
+                        component = Opamp(name, nodes)
+                    elif component_type == 'D': # Diode: anode, cathode, optional saturation current
+                        nodes = tokens[1:3]
+                        if len(nodes) < 2:
+                            raise ValueError(f"Missing nodes for component {name}")
+                        component = Diode(name, nodes, Parser.parse_value(tokens[3]) if compute_numeric and len(tokens) > 3 else None)
+                    elif component_type == 'Q': # Bipolar transistor: collector, base, emitter, optional NPN or PNP
+                        nodes = tokens[1:4]
+                        if len(nodes) < 3:
+                            raise ValueError(f"Missing nodes for component {name}")
+                        polarity = tokens[4] if len(tokens) > 4 else 'NPN'
+                        if polarity not in BJT.POLARITIES:
+                            raise ValueError(f"Unknown transistor type {polarity} for component {name}, expected NPN or PNP")
+                        component = BJT(name, nodes, polarity)
+                    elif component_type == 'X': # Subcircuit instance: nodes, then the name of the subcircuit
+                        nodes = tokens[1:-1]
+                        if not nodes:
+                            raise ValueError(f"Missing nodes or subcircuit name for instance {name}")
+                        component = Subcircuit(name, nodes, tokens[-1])
+                        instances.append((lineNumber, component))
+                    elif componentClass is None:
+                        raise ValueError(f"Unknown component type: {component_type}")
+                    else:
+                        nodes = tokens[1:3]
+                        if len(nodes) < 2:
+                            raise ValueError(f"Missing nodes for component {name}")
+                        value = None
+                        if compute_numeric:
+                            value_token = tokens[3] if component_type != 'V' else Parser.extract_value_token(component_type, tokens)
+                            if value_token != 'SYMBOLIC': # Symbolic is used to indicate that the value is not known (input variable for instance)
+                                value = values.get(value_token)
+                                if value is None: # Large netlists repeat a few values: parse each one once
+                                    value = values[value_token] = Parser.parse_value(value_token)
+                        component = componentClass(name, nodes, value)
+                except IndexError as e:
+                    raise ValueError(f"Line {lineNumber}: Missing value for component {name}") from e
+                except ValueError as e:
+                    raise ValueError(f"Line {lineNumber}: {e}") from e
+
+                if definition is not None and component_type in 'DQ':
+                    raise ValueError(f"Line {lineNumber}: Nonlinear device {name} is not supported in subcircuit {definition.name}")
+                target.append(component)
+                if definition is not None:
+                    definition.lines.append(' '.join(tokens))
+                    continue # The nodes of a definition are local to it
                 for node in nodes:
-                    if node not in nodes:
-                        node_list.append(node) # add new nodes the circuit.nodes list
+                    if node not in nodeIds:
+                        nodeIds[node] = len(nodeIds) # Intern the node: its id is its rank of first appearance
+
+            if definition is not None:
+                raise ValueError(f"Line {lineNumber}: Missing .ENDS for subcircuit {definition.name}")
+            Parser.resolve_subcircuits(definitions, instances)
 
-            node_list.sort()
             logging.info("Finished parsing netlist.")
-            return component_list, node_list
+            return component_list, list(nodeIds)
         except Exception as e:
             logging.error(f"Error parsing netlist: {e}")
             raise
 
+    @staticmethod
+    def resolve_subcircuits(definitions, instances):
+        """
+        Link every subcircuit instance to its definition, which may come later in the netlist.
+
+        Args:
+            definitions (dict): The subcircuit definitions by name.
+            instances (list): Tuples (line number, Subcircuit) of every instance, in definitions included.
+
+        Raises:
+            ValueError: If a subcircuit is unknown, instantiated with the wrong number of nodes or instantiates itself.
+        """
+        for lineNumber, instance in instances:
+            definition = definitions.get(instance.definitionName)
+            if definition is None:
+                raise ValueError(f"Line {lineNumber}: Unknown subcircuit {instance.definitionName}")
+            if len(instance.nodes) != len(definition.ports):
+                raise ValueError(f"Line {lineNumber}: Subcircuit {definition.name} has {len(definition.ports)} ports, {len(instance.nodes)} nodes given for {instance.name}")
+            instance.definition = definition
+        for definition in definitions.values():
+            definition.checkRecursion()
+
     @staticmethod
     def parse_value(value_str):
         """
         Parses the value string, handling units, and returns a numerical value.
+        The unit is read from its first letters as in SPICE (e.g. '10KOHM' is 10e3, '1MEG' is 1e6, '1E-6' is 1e-6).
 
         Args:
             value_str (str): The value string to be parsed.
@@ -107,26 +212,15 @@ class Parser:
         Returns:
             float: The numerical value of the component.
         """
-        units = {
-            'T': 1e12,
-            'G': 1e9,
-            'MEG': 1e6,
-            'K': 1e3,
-            'M': 1e-3,
-            'MIL': 25.4e-6,
-            'U': 1e-6,
-            'N': 1e-9,
-            'P': 1e-12,
-            'F': 1e-15,
-        }
         try:
-            match = re.match(r"([0-9\.]+)([A-Za-z]*)", value_str)
+            match = Parser.VALUE_PATTERN.match(value_str.upper())
             if match:
                 value, unit = match.groups()
-                value = float(value)
-                unit = unit.upper()
-                multiplier = units.get(unit, 1)
-                return value * multiplier
+                if unit.startswith('MEG') or unit.startswith('MIL'):
+                    multiplier = Parser.UNITS[unit[:3]]
+                else:
+                    multiplier = Parser.UNITS.get(unit[:1], 1)
+                return float(value) * multiplier
             else:
                 return float(value_str)
         except ValueError as e:
@@ -157,23 +251,6 @@ class Parser:
                 return tokens[3]
         else:
             return tokens[3]
-    
-    @staticmethod
-    def extract_node_tokens(tokens, component_type):
-        """
-        Extracts the node tokens from the tokens. Depending on the component, there may be more than two nodes.
-
-        Args:
-            tokens (list): The list of tokens from the netlist line.
-            component_type (str): The type of the component (e.g., 'R', 'V').
-
-        Returns:
-            list: The list of node tokens.
-        """
-        if component_type == 'O':
-            return tokens[1:4]
-        else :
-            return tokens[1:3]
 
 class Component:
     """
@@ -184,6 +261,9 @@ class Component:
         value (float): The value of the component (e.g., resistance, capacitance).
         nodes (list): The list of nodes this component is connected to.
     """
+    # No per-instance __dict__: large generated circuits hold hundreds of thousands of components
+    __slots__ = ('name', 'nodes', 'value', 'motherComponent', 'isLinear', 'isVirtual', 'needsAdditionalEquation')
+
     def __init__(self, name, nodes, value=None):
         self.name = name  # Component name (e.g., 'R1', 'C1')
         self.nodes = nodes  # List of nodes this component is connected to
@@ -191,26 +271,20 @@ class Component:
         self.motherComponent = None  # Reference to the mother component (e.g., for linearized elements)
         self.isLinear = True
         self.isVirtual = False  # Boolean indicating if the component is virtual (e.g., for linearized elements)
-        self.equation = None  # The Voltage-Current equation for the component
         self.needsAdditionalEquation = False
     
     def __str__(self):
         return f"{self.name}[{self.nodes}]"
     
     @abstractmethod
-    def getEquation(self, nodeVoltages, unknownCurrents, knownParameters):
+    def stamp(self, mna):
         """
-        Return the Voltage-Current equation for the component.
+        Stamp the contribution of the component into the MNA system.
 
         Args:
-            nodeVoltages (dict): Dictionary of node voltages.
-            unknownCurrents (dict): Dictionary of unknown branch currents.
-            knownParameters (dict): Dictionary of known parameters.
-
-        Returns:
-            sympy.Expr: The Voltage-Current equation for the component.
+            mna (MNASystem): The system in which the component is stamped.
         """
-        
+
     @abstractmethod
     def linearize(self): 
         """ 
@@ -231,25 +305,19 @@ class Resistor(Component):
         value (float): The resistance value in Ohms.
         nodes (list): The list of nodes this resistor is connected to.
     """
+    __slots__ = ()
+
     def __init__(self, name, nodes, value=None):
         super().__init__(name, nodes, value)
     
-    def getEquation(self, node, nodeVoltages, unknownCurrents, knownParameters):
+    def stamp(self, mna):
         """
-        TODO ce n'est pas une equation qu'on retourne ici, mais une expression : changer le nom de la méthode
-        Return the Voltage-Current equation for the resistor.
+        Stamp the conductance 1/R between the two nodes of the resistor.
 
         Args:
-            node (str): The node for which the equation is being generated.
-            nodeVoltages (dict): Dictionary of node voltages.
-            unknownCurrents (dict): Dictionary of unknown branch currents.
-            knownParameters (dict): Dictionary of known parameters.
-
-        Returns:
-            sympy.Expr: The Voltage-Current equation for the resistor.
+            mna (MNASystem): The system in which the resistor is stamped.
         """
-        other_node = self.nodes[0] if self.nodes[1] == node else self.nodes[1]
-        return (nodeVoltages[node] - nodeVoltages[other_node]) / knownParameters[self.name]
+        mna.stampAdmittance(mna.G, self.nodes[0], self.nodes[1], 1 / mna.parameters[self.name])
     
 class VoltageSource(Component):
     """
@@ -262,41 +330,25 @@ class VoltageSource(Component):
         value (float): The voltage value in Volts.
         nodes (list): The list of nodes this voltage source is connected to.
     """
+    __slots__ = ()
+
     def __init__(self, name, nodes, value=None):
         super().__init__(name, nodes, value)
         self.needsAdditionalEquation = True # Indicates that an additional equation is needed for this component
     
-    def getEquation(self, node, nodeVoltages, unknownCurrents, knownParameters):
-        """
-        Return the Voltage-Current equation for the voltage source. It is positive if it flows from the node[1] to node[0].
-
-        Args:
-            node (str): The node for which the equation is being generated.
-            nodeVoltages (dict): Dictionary of node voltages.
-            unknownCurrents (dict): Dictionary of unknown branch currents.
-            knownParameters (dict): Dictionary of known parameters.
-
-        Returns:
-            sympy.Expr: The Voltage-Current equation for the voltage source.
-        """
-        if node == self.nodes[0]: # The current is positive if it flows from the node[1] to node[0]
-            return unknownCurrents[self.name]
-        else :
-            return -unknownCurrents[self.name]
-
-    def getAdditionalEquation(self, nodeVoltages, unknownCurrents, knownParameters):
+    def stamp(self, mna):
         """
-        Return the additional equation for the voltage source.
+        Stamp the unknown branch current of the voltage source and, if needed, the equation fixing its value.
 
         Args:
-            nodeVoltages (dict): Dictionary of node voltages.
-            unknownCurrents (dict): Dictionary of unknown branch currents.
-            knownParameters (dict): Dictionary of known parameters.
-
-        Returns:
-            tuple: A tuple containing the additional equation and its explanation.
+            mna (MNASystem): The system in which the voltage source is stamped.
         """
-        return (sympy.Eq(nodeVoltages[self.nodes[0]] - nodeVoltages[self.nodes[1]], knownParameters[self.name]), f"valeur de la source de tension {self.name}")
+        branch = mna.addBranch(self.name)
+        mna.stampIncidence(branch, self.nodes[0], self.nodes[1])
+        if self.needsAdditionalEquation:
+            row = mna.addConstraint(f"valeur de la source de tension {self.name}", self.name)
+            mna.stampConstraint(row, self.nodes[0], self.nodes[1])
+            mna.stampExcitation(row, mna.parameters[self.name])
 
 class CurrentSource(Component):
     """
@@ -307,26 +359,22 @@ class CurrentSource(Component):
         value (float): The current value in Amperes.
         nodes (list): The list of nodes this current source is connected to.
     """
+    __slots__ = ()
+
     def __init__(self, name, nodes, value=None):
         super().__init__(name, nodes, value)
     
-    def getEquation(self, node, nodeVoltages, unknownCurrents, knownParameters):
+    def stamp(self, mna):
         """
-        Return the Voltage-Current equation for the current source.
+        Stamp the current of the source into the right-hand side of the nodal equations.
 
         Args:
-            node (str): The node for which the equation is being generated.
-            nodeVoltages (dict): Dictionary of node voltages.
-            unknownCurrents (dict): Dictionary of unknown branch currents.
-            knownParameters (dict): Dictionary of known parameters.
-
-        Returns:
-            sympy.Expr: The Voltage-Current equation for the current source.
+            mna (MNASystem): The system in which the current source is stamped.
         """
-        if node == self.nodes[0]: # The current is positive if it flows from the node[1] to node[0]
-            return unknownCurrents[self.name]
-        else :
-            return -unknownCurrents[self.name]
+        current = mna.parameters[self.name]
+        mna.stampExcitation(mna.node(self.nodes[0]), -current)
+        mna.stampExcitation(mna.node(self.nodes[1]), current)
+
 class Inductor(Component):
     """
     Represents an inductor component in the circuit.
@@ -335,24 +383,24 @@ class Inductor(Component):
         name (str): The name of the inductor (e.g., 'L1').
         nodes (list): The list of nodes this inductor is connected to.
     """
+    __slots__ = ()
+
     def __init__(self, name, nodes, value=None):
         super().__init__(name, nodes, value)
     
-    def getEquation(self, node, nodeVoltages, unknownCurrents, knownParameters):
+    def stamp(self, mna):
         """
-        Return the Voltage-Current equation for the inductor.
+        Stamp the inductor with its own branch current i_L and the equation V_node[0] - V_node[1] = L p i_L.
+        Keeping the current as an unknown keeps the system polynomial in p (G + pC form).
 
         Args:
-            node (str): The node for which the equation is being generated.
-            nodeVoltages (dict): Dictionary of node voltages.
-            unknownCurrents (dict): Dictionary of unknown branch currents.
-            knownParameters (dict): Dictionary of known parameters.
-
-        Returns:
-            sympy.Expr: The Voltage-Current equation for the inductor.
+            mna (MNASystem): The system in which the inductor is stamped.
         """
-        other_node = self.nodes[0] if self.nodes[1] == node else self.nodes[1]
-        return (nodeVoltages[node] - nodeVoltages[other_node]) / (knownParameters[self.name]*knownParameters["p"])
+        branch = mna.addBranch(self.name)
+        mna.stampIncidence(branch, self.nodes[0], self.nodes[1])
+        row = mna.addConstraint(f"relation courant-tension de la bobine {self.name}", self.name)
+        mna.stampConstraint(row, self.nodes[0], self.nodes[1])
+        mna.stampEntry(mna.C, row, branch, -mna.parameters[self.name])
 
 class Capacitor(Component):
     """
@@ -362,24 +410,19 @@ class Capacitor(Component):
         name (str): The name of the capacitor (e.g., 'C1').
         nodes (list): The list of nodes this capacitor is connected to.
     """
+    __slots__ = ()
+
     def __init__(self, name, nodes, value=None):
         super().__init__(name, nodes, value)
     
-    def getEquation(self, node, nodeVoltages, unknownCurrents, knownParameters):
+    def stamp(self, mna):
         """
-        Return the Voltage-Current equation for the capacitor.
+        Stamp the susceptance coefficient C between the two nodes of the capacitor.
 
         Args:
-            node (str): The node for which the equation is being generated.
-            nodeVoltages (dict): Dictionary of node voltages.
-            unknownCurrents (dict): Dictionary of unknown branch currents.
-            knownParameters (dict): Dictionary of known parameters.
-
-        Returns:
-            sympy.Expr: The Voltage-Current equation for the capacitor.
+            mna (MNASystem): The system in which the capacitor is stamped.
         """
-        other_node = self.nodes[0] if self.nodes[1] == node else self.nodes[1]
-        return (nodeVoltages[node] - nodeVoltages[other_node]) * knownParameters["p"] * knownParameters[self.name]
+        mna.stampAdmittance(mna.C, self.nodes[0], self.nodes[1], mna.parameters[self.name])
     
 class Wire(Component):
     """
@@ -389,38 +432,21 @@ class Wire(Component):
         name (str): The name of the wire (e.g., 'wire1').
         nodes (list): The list of nodes this wire is connected to.
     """
+    __slots__ = ()
+
     def __init__(self, name, nodes):
         super().__init__(name, nodes)
         self.needsAdditionalEquation = True
 
-    def getEquation(self, node, nodeVoltages, unknownCurrents, knownParameters):
-        """
-        Return the Voltage-Current equation for the wire.
-
-        Args:
-            node (str): The node for which the equation is being generated.
-            nodeVoltages (dict): Dictionary of node voltages.
-            unknownCurrents (dict): Dictionary of unknown branch currents.
-            knownParameters (dict): Dictionary of known parameters.
-
-        Returns:
-            sympy.Expr: The Voltage-Current equation for the wire.
-        """
-        return 0
-
-    def getAdditionalEquation(self, nodeVoltages, unknownCurrents, knownParameters):
+    def stamp(self, mna):
         """
-        Return the additional equation for the wire.
+        Stamp the equation V_node[0] = V_node[1]. The wire carries no current unknown of its own.
 
         Args:
-            nodeVoltages (dict): Dictionary of node voltages.
-            unknownCurrents (dict): Dictionary of unknown branch currents.
-            knownParameters (dict): Dictionary of known parameters.
-
-        Returns:
-            tuple: A tuple containing the additional equation and its explanation.
+            mna (MNASystem): The system in which the wire is stamped.
         """
-        return (sympy.Eq(nodeVoltages[self.nodes[0]] - nodeVoltages[self.nodes[1]], 0), f"hypothèse {self.motherComponent.name} parfait : V+ = V-")
+        row = mna.addConstraint(f"hypothèse {self.motherComponent.name} parfait : V+ = V-", self.name)
+        mna.stampConstraint(row, self.nodes[0], self.nodes[1])
 class Opamp(Component):
     """
     Represents an opamp component in the circuit.
@@ -430,6 +456,8 @@ class Opamp(Component):
         name (str): The name of the opamp (e.g., 'opamp1').
         nodes (list): The list of nodes this opamp is connected to.
     """
+    __slots__ = ()
+
     def __init__(self, name, nodes):
         super().__init__(name, nodes)
         self.isLinear = False
@@ -450,195 +478,1548 @@ class Opamp(Component):
         voltageSource.needsAdditionalEquation = False # Do not need the usual additional equation for voltage sources : this voltage source is of unkonwn value
         return [wire, voltageSource]
 
-        
-    
-class Circuit:
+    # Saturating model of the nonlinear DC solver: V_out = VSAT.tanh(A.(V+ - V-)/VSAT) replaces the equation V+ = V-
+    MODEL_PARAMETERS = ('A', 'VSAT')
+
+    def getModelTerminals(self, mna):
+        """
+        Return the unknowns the saturating model depends on (V+, V-, V_out), the row it adds to and the rows it replaces:
+        the equation of the virtual wire.
+
+        Args:
+            mna (MNASystem): The numeric system of the linearized circuit.
+
+        Returns:
+            tuple: A tuple containing the input indices, the output rows and the replaced rows (None for the ground).
+        """
+        row = mna.constraintRows[f'{self.name}_wire']
+        return [mna.node(node) for node in self.nodes], [row], [row]
+
+    @staticmethod
+    def modelExpressions(v, parameters):
+        """
+        Return the residual of the saturating model as a function of the symbols v = (V+, V-, V_out).
+        """
+        gain, saturation = parameters
+        return [v[2] - saturation * sympy.tanh(gain * (v[0] - v[1]) / saturation)]
+
+
+THERMAL_VOLTAGE = 0.025852 # kT/q at 300 K, in Volts
+
+
+class LimitedExp(sympy.Function):
     """
-    Represents the entire electronic circuit and provides methods to analyze and solve it.
+    exp(x) up to MAX_EXPONENT, then its tangent. The junction currents stay finite when a Newton-Raphson iterate
+    overshoots, and the derivative stays consistent with the function.
+    """
+    MAX_EXPONENT = 40.0
 
-    Attributes:
-        components (list): List of Component instances in the circuit.
-        nodes (list): List of all nodes in the circuit.
-        connections (defaultdict): Dictionary mapping nodes to components.
-        isNodeComponentDicBuilt (bool): Indicates if the connection list is built.
-        isEqSysEstablished (bool): Indicates if the equation system is established.
-        equations (list): List of Sympy Equation objects representing the circuit equations.
+    def fdiff(self, argindex=1):
+        return LimitedExpDerivative(self.args[0])
+
+    @staticmethod
+    def evaluate(x):
+        x = np.asarray(x, dtype=float)
+        limit = LimitedExp.MAX_EXPONENT
+        return np.where(x < limit, np.exp(np.minimum(x, limit)), np.exp(limit) * (1 + x - limit))
+
+
+def limitJunction(new, old, critical):
     """
-    def __init__(self, netlist):
-        self.components = []  # List of Component instances
-        self.nodes = []  # List of all nodes in the circuit
-        self.connections = defaultdict(list)  # Dictionary mapping nodes to components
-        self.isNodeComponentDicBuilt = False  # Boolean indicating if the connection list is built
-        self.isEqSysEstablished = False  # Boolean indicating if the equation system is established
-        self.isCircuitLinear = False  # Boolean indicating if the circuit has been linearized
-        self.equations = []  # List of Sympy Equation objects
+    Limit the change of junction voltages between two Newton-Raphson iterations, as SPICE does (pnjlim): above the critical voltage
+    an increase is followed logarithmically, so that the exponential does not overshoot.
 
-        # Parse the netlist to get the components and nodes
-        self.components, self.nodes = Parser.parse_netlist(netlist)
+    Args:
+        new (numpy.ndarray): The junction voltages of the new iterate.
+        old (numpy.ndarray): The junction voltages the devices were evaluated at in the previous iteration.
+        critical (numpy.ndarray): The critical voltages VT.ln(VT/(sqrt(2).IS)).
 
+    Returns:
+        numpy.ndarray: The limited junction voltages.
+    """
+    vt = THERMAL_VOLTAGE
+    with np.errstate(divide='ignore', invalid='ignore'):
+        argument = 1 + (new - old) / vt
+        fromPositive = np.where(argument > 0, old + vt * np.log(np.maximum(argument, 1e-300)), critical)
+        fromNegative = vt * np.log(np.maximum(new / vt, 1e-300))
+    limited = np.where(old > 0, fromPositive, fromNegative)
+    return np.where((new > critical) & (np.abs(new - old) > 2 * vt), limited, new)
 
-        # Build the node to component dictionary
-        self.buildNodeComponentDic()
 
-    def addComponent(self, component):
-        """
-        Add a component to the circuit.
+class LimitedExpDerivative(sympy.Function):
+    """
+    Derivative of LimitedExp: exp(min(x, MAX_EXPONENT)).
+    """
+    @staticmethod
+    def evaluate(x):
+        return np.exp(np.minimum(np.asarray(x, dtype=float), LimitedExp.MAX_EXPONENT))
 
-        Args:
-            component (Component): The component to add to the circuit.
+
+class Diode(Component):
+    """
+    Represents a junction diode: I = IS.(exp(V/(N.VT)) - 1), V = V_node[0] - V_node[1], the current flowing from node[0] (anode) to node[1] (cathode).
+    The diode has no linear model: the circuit is solved by nonlinear.NonlinearDCSolver.
+
+    Attributes:
+        name (str): The name of the diode (e.g., 'D1').
+        value (float): The saturation current IS in Amperes, SATURATION_CURRENT if None.
+        nodes (list): The anode and the cathode.
+    """
+    __slots__ = ()
+    SATURATION_CURRENT = 1e-14
+    EMISSION_COEFFICIENT = 1.0
+    MODEL_PARAMETERS = ('IS',)
+
+    def __init__(self, name, nodes, value=None):
+        super().__init__(name, nodes, value)
+        self.isLinear = False
+
+    def getLinearizedVersion(self):
         """
-        self.components.append(component)
+        A diode has no linear equivalent without an operating point.
 
-    def linearizeCircuit(self):
+        Returns:
+            list: An empty list.
         """
-        Handle the linearization of nonlinear circuit elements.
+        return []
 
-        Raises:
-            Exception: If an error occurs during linearization.
+    def getModelParameters(self):
+        return (self.SATURATION_CURRENT if self.value is None else self.value,)
+
+    @staticmethod
+    def initialInputs(current, parameters):
         """
-        try:
-            logging.info("Starting to linearize circuit.")
-            for component in self.components:
-                if not component.isLinear:
-                    logging.info(f"Linearizing nonlinear component: {component.name}")
-                    linearizedComponents = component.getLinearizedVersion()
-                    for linearizedComponent in linearizedComponents:
-                        self.components.append(linearizedComponent)
-            self.isCircuitLinear = True
-            logging.info("Finished linearizing circuit.")
-        except Exception as e:
-            logging.error(f"Error linearizing circuit: {e}")
-            raise
+        Return the inputs of the first iteration from a blind guess: the diodes at their critical voltage, see limitJunction.
+        """
+        vt = Diode.EMISSION_COEFFICIENT * THERMAL_VOLTAGE
+        return np.column_stack([current[:, 1] + vt * np.log(vt / (np.sqrt(2) * parameters[:, 0])), current[:, 1]])
 
-    def buildNodeComponentDic(self):
+    @staticmethod
+    def limitInputs(previous, current, parameters):
         """
-        Build a dictionary mapping nodes to components. Used to iterate over the components connected to a node during nodal analysis.
+        Limit the junction voltage of every diode between two iterations, see limitJunction.
 
-        Raises:
-            Exception: If an error occurs during building the connection list.
+        Args:
+            previous (numpy.ndarray): The inputs the diodes were evaluated at, shape (diodes, 2).
+            current (numpy.ndarray): The inputs of the new iterate.
+            parameters (numpy.ndarray): The model parameters, shape (diodes, 1).
+
+        Returns:
+            numpy.ndarray: The inputs to evaluate the diodes at.
         """
-        try:
-            logging.info("Starting to build connection list.")
-            if not self.isCircuitLinear:
-                self.linearizeCircuit()
-            for component in self.components:
-                if component.isLinear :
-                    for node in component.nodes:
-                        self.connections[node].append(component)
-                        if node not in self.nodes:
-                            self.nodes.append(node)
-            self.isNodeComponentDicBuilt = True
-            logging.info("Finished building connection list.")
-        except Exception as e:
-            logging.error(f"Error building connection list: {e}")
-            raise
+        vt = Diode.EMISSION_COEFFICIENT * THERMAL_VOLTAGE
+        critical = vt * np.log(vt / (np.sqrt(2) * parameters[:, 0]))
+        junction = limitJunction(current[:, 0] - current[:, 1], previous[:, 0] - previous[:, 1], critical)
+        return np.column_stack([current[:, 1] + junction, current[:, 1]])
 
-    def setNodes(self, nodes):
+    def getModelTerminals(self, mna):
         """
-        Set the list of nodes in the circuit.
+        Return the unknowns the model depends on, the rows it adds to (the node equations of the anode and the cathode) and the rows it replaces.
+        """
+        nodes = [mna.node(node) for node in self.nodes]
+        return nodes, nodes, []
 
-        Args:
-            nodes (list): List of nodes in the circuit.
+    @staticmethod
+    def modelExpressions(v, parameters):
         """
-        self.nodes = nodes
+        Return the currents leaving the anode and the cathode into the diode as a function of the symbols v = (V_anode, V_cathode).
+        """
+        saturationCurrent, = parameters
+        current = saturationCurrent * (LimitedExp((v[0] - v[1]) / (Diode.EMISSION_COEFFICIENT * THERMAL_VOLTAGE)) - 1)
+        return [current, -current]
 
-class Solver:
+
+class BJT(Component):
     """
-    Handles Sympy manipulations for solving the circuit equations.
+    Represents a bipolar junction transistor with the transport Ebers-Moll model. Nodes are connected in the following order: collector, base, emitter.
+    The transistor has no linear model: the circuit is solved by nonlinear.NonlinearDCSolver.
 
     Attributes:
-        circuit (Circuit): The circuit instance associated with the solver.
+        name (str): The name of the transistor (e.g., 'Q1').
+        value (str): 'NPN' or 'PNP'.
+        nodes (list): The collector, the base and the emitter.
     """
+    __slots__ = ()
+    POLARITIES = ('NPN', 'PNP')
+    SATURATION_CURRENT = 1e-16
+    FORWARD_GAIN = 100.0
+    REVERSE_GAIN = 1.0
+    MODEL_PARAMETERS = ('IS', 'BF', 'BR', 'POLARITY')
+
+    def __init__(self, name, nodes, value='NPN'):
+        super().__init__(name, nodes, value)
+        self.isLinear = False
 
-    def __init__(self, circuit):
-        """
-        Initialize the Solver with a specific circuit.
-        It starts from a circuit and gives the expression of every voltage and current in the circuit in terms of the known parameters.
-  
-        Args:
-            circuit (Circuit): The circuit to be solved.
+    def getLinearizedVersion(self):
         """
-        self.circuit = circuit
-        # First linearize the circuit
-        if not self.circuit.isCircuitLinear:
-            self.circuit.linearizeCircuit()
-        self.nodeVoltages = {} # Dictionary of unknown node voltages
-        self.unknownCurrents = {} # Dictionary of unknown branch currents
-        self.knownParameters = {} # Dictionary of known values (e.g., resistors, input voltages, etc.)
-        self.equations = [] # List of equations used to solve every current and voltage in the circuit
-        self.solutions = None # Dictionary of solutions for the unknowns parameters expressed in terms of the known parameters
-        self.analyticTransferFunction = None # Symbols are still used for known parameters
-        self.paramValues = {} # Dictionary to replace the symbolic parameters with numerical values
+        A transistor has no linear equivalent without an operating point.
 
-        self.initializeKnownParameters()
-        self.initializeUnknownParameters()
-        self.getEqSys()
-        self.solveEqSys()
+        Returns:
+            list: An empty list.
+        """
+        return []
 
+    def getModelParameters(self):
+        return (self.SATURATION_CURRENT, self.FORWARD_GAIN, self.REVERSE_GAIN, 1.0 if self.value == 'NPN' else -1.0)
 
-    def initializeKnownParameters(self):
+    @staticmethod
+    def initialInputs(current, parameters):
         """
-        Initialize a dictionary with key component.name and value sympy.symbols(f'{component.name}') for each linear component in the circuit.
+        Return the inputs of the first iteration from a blind guess: the base-emitter junction at its critical voltage, the base-collector junction off.
         """
-        self.knownParameters["p"] = sympy.symbols('p') # Laplace variable
-        for component in self.circuit.components:
-            if component.isLinear:
-                if component.isVirtual==False:
-                    if isinstance(component, Resistor) or isinstance(component, Inductor) or isinstance(component, Capacitor):
-                        self.knownParameters[component.name] = sympy.symbols(f'{component.name}')
-                    elif isinstance(component, VoltageSource):
-                        self.knownParameters[component.name] = sympy.symbols(f'{component.name}')
+        polarity = parameters[:, 3]
+        critical = THERMAL_VOLTAGE * np.log(THERMAL_VOLTAGE / (np.sqrt(2) * parameters[:, 0]))
+        base = current[:, 1]
+        return np.column_stack([base, base, base - polarity * critical])
 
-    def initializeUnknownParameters(self):
+    @staticmethod
+    def limitInputs(previous, current, parameters):
         """
-        Initialize dictionaries of key node and value sympy.symbols(f'v_{node}') for each node and branch in the circuit and sympy.symbols(f'i_{branch}') for each voltage source.
-        """ 
-        # Populate the nodeVoltages dictionary with node names
-        for node in self.circuit.nodes:
-            if node != '0':
-                self.nodeVoltages[node] = sympy.symbols(f'v_{node}')
-            else :
-                self.nodeVoltages['0'] = 0 # TODO améliorer cette partie, ce n'est pas très rigoureux de mettre la masse dans nodeVoltages
+        Limit the base-emitter and base-collector junction voltages of every transistor between two iterations, see limitJunction.
 
-        # Populate the unknownCurrents dictionary with branch names
-        # For each voltage source we add a unknown current, this is how MNA solvers parametrize the problem. 
-        # The keys of the dictionnary are the name of the source and the value is the unknown current.
-        for component in self.circuit.components:
-            if isinstance(component, VoltageSource) or isinstance(component, CurrentSource):
-                self.unknownCurrents[component.name] = sympy.symbols(f'i_{component.name}')
+        Args:
+            previous (numpy.ndarray): The inputs the transistors were evaluated at, shape (transistors, 3).
+            current (numpy.ndarray): The inputs of the new iterate.
+            parameters (numpy.ndarray): The model parameters, shape (transistors, 4).
 
+        Returns:
+            numpy.ndarray: The inputs to evaluate the transistors at.
+        """
+        polarity = parameters[:, 3]
+        critical = THERMAL_VOLTAGE * np.log(THERMAL_VOLTAGE / (np.sqrt(2) * parameters[:, 0]))
+        base = current[:, 1]
+        emitter = limitJunction(polarity * (base - current[:, 2]), polarity * (previous[:, 1] - previous[:, 2]), critical)
+        collector = limitJunction(polarity * (base - current[:, 0]), polarity * (previous[:, 1] - previous[:, 0]), critical)
+        return np.column_stack([base - polarity * collector, base, base - polarity * emitter])
+
+    def getModelTerminals(self, mna):
+        """
+        Return the unknowns the model depends on, the rows it adds to (the node equations of the three terminals) and the rows it replaces.
+        """
+        nodes = [mna.node(node) for node in self.nodes]
+        return nodes, nodes, []
 
-    def getEqSys(self):
+    @staticmethod
+    def modelExpressions(v, parameters):
         """
-        Establish the system of equations from the circuit.
+        Return the currents entering the collector, the base and the emitter as a function of the symbols v = (V_c, V_b, V_e).
+        A PNP transistor is an NPN transistor with the voltages and the currents reversed (polarity -1).
+        """
+        saturationCurrent, forwardGain, reverseGain, polarity = parameters
+        forward = LimitedExp(polarity * (v[1] - v[2]) / THERMAL_VOLTAGE) - 1
+        reverse = LimitedExp(polarity * (v[1] - v[0]) / THERMAL_VOLTAGE) - 1
+        collector = polarity * saturationCurrent * (forward - reverse - reverse / reverseGain)
+        base = polarity * saturationCurrent * (forward / forwardGain + reverse / reverseGain)
+        return [collector, base, -collector - base]
 
-        Returns:
-            list: A list of Sympy equations representing the circuit.
+
+class Subcircuit(Component):
+    """
+    Represents an instance of a subcircuit (X line). In the symbolic system, the instance is stamped with the port model of its definition:
+    one unknown current entering each port, and one port equation per port relating the port voltages and currents.
+    In the numeric system, it is flattened.
+
+    Attributes:
+        name (str): The name of the instance (e.g., 'X1').
+        nodes (list): The nodes connected to the ports of the subcircuit, in the order of the ports.
+        definitionName (str): The name of the subcircuit.
+        definition (SubcircuitDefinition): The definition of the subcircuit, set once the netlist is parsed.
+    """
+    __slots__ = ('definitionName', 'definition')
+
+    def __init__(self, name, nodes, definitionName):
+        super().__init__(name, nodes)
+        self.definitionName = definitionName
+        self.definition = None
+
+    def stamp(self, mna):
         """
-        logging.info("Starting to establish the system of equations.")
-        # Analyse nodale classique
-        for node in self.circuit.nodes:
-            if node != '0':
-                # Equation de noeud
-                expr = 0
-                for component in self.circuit.connections[node]:
-                    if component.isLinear: # Only linear components have equations
-                        expr += component.getEquation(node, self.nodeVoltages, self.unknownCurrents, self.knownParameters)
-                equation = sympy.Eq(expr, 0)
-                explanation = f"Loi des noeuds pour le noeud {node}"
-                self.equations.append((equation,explanation)) 
-
-        # Ajout des equations pour les composants spéciaux (sources de tension, courant, etc.)
-        for component in self.circuit.components:
-            if component.isLinear:
-                if component.needsAdditionalEquation:
-                    (equ,explanation)=component.getAdditionalEquation(self.nodeVoltages, self.unknownCurrents, self.knownParameters)
-                    self.equations.append((equ, explanation))
-        logging.info("Finished establishing the system of equations.")
+        Stamp the port model of the subcircuit: a branch current i_<instance>.<port> entering each port, and the port equations
+        sum_j a_j.v_j + sum_j c_j.i_j = r of the definition.
 
-    def solveEqSys(self):
+        Args:
+            mna (MNASystem): The system in which the subcircuit is stamped.
+        """
+        branches = []
+        for port, node in zip(self.definition.ports, self.nodes):
+            branches.append(mna.addBranch(f'{self.name}.{port}'))
+            mna.stampIncidence(branches[-1], node, MNASystem.GROUND)
+        for k, (voltages, currents, rhs) in enumerate(self.definition.getPortModel(mna.parameters)):
+            row = mna.addConstraint(f"équation {k + 1} du modèle aux ports du sous-circuit {self.name} ({self.definition.name})")
+            for node, branch, voltage, current in zip(self.nodes, branches, voltages, currents):
+                mna.stampEntry(mna.P, row, mna.node(node), voltage)
+                mna.stampEntry(mna.P, row, branch, current)
+            mna.stampExcitation(row, rhs)
+
+    def flatten(self):
         """
-        Solve the system of equations to find the transfer function.
+        Return the linear components of the instance, renamed '<instance>.<name>', internal nodes renamed '<instance>.<node>'.
+
+        Returns:
+            list: The linear components, nested instances flattened and opamps linearized.
+        """
+        return self.definition.flatten(self.name, self.nodes)
+
+
+class SubcircuitDefinition:
+    """
+    A .SUBCKT definition. Its port model is computed once, by fraction-free elimination of the internal unknowns
+    (Schur complement of the internal block), and shared by every instance.
+
+    The port model is made of one equation per port relating the port voltages v and the currents i entering the ports.
+    It is more general than a port admittance matrix: a port driven by an opamp output or a voltage source has none.
+    The symbols of the components of a definition are named '<subcircuit>.<component>' (e.g. 'FILTER.R1'): the instances share them.
+
+    Attributes:
+        name (str): The name of the subcircuit.
+        ports (list): The names of the port nodes, in the order of the instance nodes.
+        components (list): The components of the subcircuit, with their local names and nodes.
+        lines (list): The normalized lines of the definition.
+    """
+    MAX_MODELS = 256 # Port models kept across netlists, keyed by the source of the definition
+    _models = OrderedDict()
+
+    def __init__(self, name, ports):
+        self.name = name
+        self.ports = ports
+        self.components = []
+        self.lines = []
+        self._parameters = None
+
+    def definitions(self):
+        """
+        Return this definition and every definition it instantiates, directly or not, each once.
+        """
+        found = {self.name: self}
+        stack = [self]
+        while stack:
+            for component in stack.pop().components:
+                if isinstance(component, Subcircuit) and component.definition.name not in found:
+                    found[component.definition.name] = component.definition
+                    stack.append(component.definition)
+        return list(found.values())
+
+    def checkRecursion(self, path=()):
+        """
+        Raises:
+            ValueError: If the subcircuit instantiates itself, directly or not.
+        """
+        if self.name in path:
+            raise ValueError(f"Subcircuit {self.name} instantiates itself: {' -> '.join(path + (self.name,))}")
+        for component in self.components:
+            if isinstance(component, Subcircuit):
+                component.definition.checkRecursion(path + (self.name,))
+
+    @property
+    def source(self):
+        """
+        The text of the definition and of the definitions it uses, which determines its port model.
+        """
+        return '\n'.join(f".SUBCKT {definition.name} {' '.join(definition.ports)}\n" + '\n'.join(definition.lines) + "\n.ENDS"
+                         for definition in sorted(self.definitions(), key=lambda definition: definition.name))
+
+    def getParameters(self):
+        """
+        Return the components of this definition and of the definitions it uses, by qualified name '<subcircuit>.<component>'.
+
+        Returns:
+            dict: Qualified name -> Component, instances and opamps excluded.
+        """
+        if self._parameters is None:
+            self._parameters = {}
+            for definition in self.definitions():
+                for component in definition.components:
+                    if component.isLinear and not isinstance(component, Subcircuit):
+                        self._parameters[f'{definition.name}.{component.name}'] = component
+        return self._parameters
+
+    def getPortModel(self, parameters):
+        """
+        Return the port equations of the subcircuit with the parameters of a system substituted.
+        Each equation reads sum_j a_j.v_j + sum_j c_j.i_j = r, the coefficients being polynomials in the component values and p.
+
+        Args:
+            parameters (dict): Value stamped for each component, by qualified name (sympy symbol or number).
+
+        Returns:
+            list: One tuple (a, c, r) per equation, a and c being lists indexed as the ports, as sympy expressions.
+        """
+        model = self._models.get(self.source)
+        if model is None:
+            model = self._reduce()
+            self._models[self.source] = model
+            while len(self._models) > self.MAX_MODELS:
+                self._models.popitem(last=False)
+        else:
+            self._models.move_to_end(self.source)
+        equations, symbols, conductances = model
+        substitution = {symbol: parameters[name] for name, symbol in symbols.items()}
+        substitution.update({symbol: 1 / parameters[name] for name, symbol in conductances.items()})
+        return [([entry.xreplace(substitution) for entry in voltages], [entry.xreplace(substitution) for entry in currents], rhs.xreplace(substitution))
+                for voltages, currents, rhs in equations]
+
+    def _reduce(self):
+        """
+        Eliminate the internal unknowns from the polynomial MNA system of the subcircuit, extended with the port currents.
+
+        Returns:
+            tuple: A tuple containing the port equations, the symbols of the component values and the conductance placeholders
+            of the resistors by qualified name, for getPortModel.
+        """
+        logging.info(f"Starting to reduce subcircuit {self.name}.")
+        symbols, conductances, local = {}, {}, {}
+        for name, component in self.getParameters().items():
+            if isinstance(component, Resistor):
+                conductances[name] = sympy.Dummy(f'g_{name}')
+                value = 1 / conductances[name]
+            else:
+                symbols[name] = sympy.Symbol(f'i_{name}' if isinstance(component, CurrentSource) else name)
+                value = symbols[name]
+            if name.startswith(f'{self.name}.'):
+                local[component.name] = value
+        parameters = {**local, **{name: 1 / symbol for name, symbol in conductances.items()}, **symbols}
+        circuit = Circuit(None, self.components, self.ports)
+        mna = MNASystem(circuit, parameters)
+        system = PolynomialSystem.fromMNA(mna, list(symbols.values()) + list(conductances.values()) + [MNASystem.LAPLACE])
+        # The current entering port k is injected in its node equation: column size + 1 + k, after the right-hand side
+        portColumns = [mna.node(port) for port in self.ports]
+        currentColumns = [system.size + 1 + k for k in range(len(self.ports))]
+        for row, col in zip(portColumns, currentColumns):
+            system.rows[row][col] = -system.ring.one
+        rows = system.eliminate(set(range(system.size)) - set(portColumns))
+        zero = system.ring.zero
+        equations = [([entries.get(col, zero).as_expr() for col in portColumns], [entries.get(col, zero).as_expr() for col in currentColumns],
+                      entries.get(system.size, zero).as_expr()) for row, entries in sorted(rows.items())]
+        logging.info(f"Finished reducing subcircuit {self.name}.")
+        return equations, symbols, conductances
+
+    def flatten(self, prefix, nodes):
+        """
+        Return the linear components of an instance of the subcircuit.
+
+        Args:
+            prefix (str): The name of the instance, prepended to the component and internal node names.
+            nodes (list): The nodes connected to the ports.
+
+        Returns:
+            list: The linear components of the instance.
+        """
+        mapping = dict(zip(self.ports, nodes))
+        mapping[MNASystem.GROUND] = MNASystem.GROUND
+        flattened = []
+        for component in self.components:
+            instance = copy.copy(component)
+            instance.name = f'{prefix}.{component.name}'
+            instance.nodes = [mapping.get(node) or f'{prefix}.{node}' for node in component.nodes]
+            if isinstance(instance, Subcircuit):
+                flattened.extend(instance.flatten())
+            elif not instance.isLinear:
+                flattened.extend(instance.getLinearizedVersion())
+            else:
+                flattened.append(instance)
+        return flattened
+
+
+class CircuitArrays:
+    """
+    Struct-of-arrays view of the linear components of a circuit: one NumPy array per attribute instead of one Python object
+    per component, and a CSR node-to-component adjacency. The numeric MNA system is stamped from it with vectorized operations.
+    The components stay the source of truth: the arrays are a read-only snapshot of them, built by Circuit.getArrays
+    and dropped (circuit.arrays = None) when a component is added or changed.
+
+    Attributes:
+        components (list): The linear components, in the order of the arrays, subcircuit instances flattened.
+        nodeNames (list): Name of each node id: the nodes of the circuit, then the internal nodes of the flattened subcircuits.
+        nodeIds (dict): Id of each node name.
+        names (list): Name of each component.
+        types (numpy.ndarray): Type code of each component (int8), see TYPE_CODES.
+        nodes (numpy.ndarray): Node ids of the two terminals of each component, shape (m, 2).
+        values (numpy.ndarray): Value of each component, NaN when symbolic.
+        virtual (numpy.ndarray): Whether each component is virtual (from a linearized opamp).
+        constrained (numpy.ndarray): Whether each component adds a branch constraint equation.
+        indptr (numpy.ndarray): CSR row pointers: the components at node id k are indices[indptr[k]:indptr[k + 1]].
+        indices (numpy.ndarray): CSR column indices (component indices).
+    """
+    RESISTOR, CAPACITOR, INDUCTOR, VOLTAGE_SOURCE, CURRENT_SOURCE, WIRE = range(6)
+    TYPE_CODES = {'Resistor': RESISTOR, 'Capacitor': CAPACITOR, 'Inductor': INDUCTOR, 'VoltageSource': VOLTAGE_SOURCE, 'CurrentSource': CURRENT_SOURCE, 'Wire': WIRE}
+
+    def __init__(self, circuit):
+        """
+        Build the arrays from the linearized circuit.
+
+        Args:
+            circuit (Circuit): The circuit, with its nodes and node ids built.
+        """
+        self.components = []
+        self.nodeNames, self.nodeIds = circuit.nodes, circuit.nodeIds
+        for component in circuit.components:
+            if isinstance(component, Subcircuit):
+                if self.nodeNames is circuit.nodes:
+                    self.nodeNames, self.nodeIds = list(circuit.nodes), dict(circuit.nodeIds)
+                for flattened in component.flatten():
+                    self.components.append(flattened)
+                    for node in flattened.nodes:
+                        if node not in self.nodeIds:
+                            self.nodeIds[node] = len(self.nodeNames)
+                            self.nodeNames.append(node)
+            elif component.isLinear:
+                self.components.append(component)
+        m = len(self.components)
+        nodeIds = self.nodeIds
+        self.names = [component.name for component in self.components]
+        self.types = np.fromiter((self.TYPE_CODES[type(component).__name__] for component in self.components), dtype=np.int8, count=m)
+        self.nodes = np.fromiter((nodeIds[node] for component in self.components for node in component.nodes[:2]), dtype=np.int32, count=2 * m).reshape(m, 2)
+        self.values = np.fromiter((np.nan if component.value is None else component.value for component in self.components), dtype=float, count=m)
+        self.virtual = np.fromiter((component.isVirtual for component in self.components), dtype=bool, count=m)
+        self.constrained = np.fromiter((component.needsAdditionalEquation for component in self.components), dtype=bool, count=m)
+        self.constrained |= self.types == self.INDUCTOR
+        # CSR adjacency: sort the (node, component) incidences by node
+        incidentNodes = self.nodes.ravel()
+        order = np.argsort(incidentNodes, kind='stable')
+        self.indices = (order // 2).astype(np.int32)
+        self.indptr = np.zeros(len(self.nodeNames) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(incidentNodes, minlength=len(self.nodeNames)), out=self.indptr[1:])
+        for array in (self.types, self.nodes, self.values, self.virtual, self.constrained, self.indices, self.indptr):
+            array.flags.writeable = False # A change goes through the components, never into the snapshot
+
+    def __len__(self):
+        return len(self.components)
+
+    def neighbours(self, nodeId):
+        """
+        Return the indices of the components connected to a node.
+
+        Args:
+            nodeId (int): The id of the node.
+
+        Returns:
+            numpy.ndarray: The component indices, in component order.
+        """
+        return self.indices[self.indptr[nodeId]:self.indptr[nodeId + 1]]
+
+
+class MNASystem:
+    """
+    Sparse Modified Nodal Analysis system A(p).x = b with A(p) = G + B + p*C.
+
+    Unknowns x are ordered as [node voltages, branch currents] and equations as [node equations, branch constraints].
+    Each component stamps its contribution with integer indices into dictionaries of keys {(row, col): coefficient},
+    so that the same system can feed a Sympy matrix or a numeric sparse matrix.
+
+    Attributes:
+        parameters (dict): Value used for each component when stamping (sympy symbol or number).
+        nodeIndex (dict): Integer index of each node, the ground '0' is not an unknown.
+        branchNames (list): Names of the components carrying an unknown branch current.
+        branchIndex (dict): Column index of the branch current of each of these components.
+        constraintExplanations (list): Explanation of each branch constraint equation.
+        constraintRows (dict): Row index of the constraint equation of each named component (inductors, voltage sources and opamp wires).
+        G (dict): Conductance stamps.
+        C (dict): Susceptance stamps (coefficients of the Laplace variable p).
+        B (dict): Incidence stamps (+1/-1 entries coupling branch currents and node voltages).
+        P (dict): Stamps that are already polynomials of the Laplace variable p (subcircuit port models).
+        b (dict): Excitation vector {row: value}.
+        triplets (dict): For a system stamped from CircuitArrays, the stamps as COO arrays {'G', 'C', 'B': (rows, cols, values), 'b': (rows, values)} instead of G, C, B and b.
+    """
+    GROUND = '0'
+    LAPLACE = sympy.Symbol('p') # The Laplace variable of the P stamps
+
+    def __init__(self, circuit, parameters):
+        """
+        Build the system by stamping every linear component of the circuit.
+
+        Args:
+            circuit (Circuit): The (linearized) circuit to stamp.
+            parameters (dict): Dictionary of key component.name and value the symbol or number to stamp.
+                None stamps the component values all at once from the arrays of the circuit (numeric system).
+        """
+        self.parameters = parameters
+        self.nodeIndex = {}
+        for node in (circuit.nodes if parameters is not None else circuit.getArrays().nodeNames):
+            if node != self.GROUND and node not in self.nodeIndex:
+                self.nodeIndex[node] = len(self.nodeIndex)
+        self.branchNames = []
+        self.branchIndex = {}
+        self.constraintExplanations = []
+        self.constraintRows = {}
+        self.G = defaultdict(int)
+        self.C = defaultdict(int)
+        self.B = defaultdict(int)
+        self.P = defaultdict(int)
+        self.b = defaultdict(int)
+        self.triplets = None
+
+        if parameters is None:
+            self._stampArrays(circuit.getArrays())
+        else:
+            for component in circuit.components:
+                if component.isLinear:
+                    component.stamp(self)
+
+        if len(self.branchNames) != len(self.constraintExplanations):
+            logging.warning(f"MNA system is not square: {len(self.branchNames)} branch currents for {len(self.constraintExplanations)} constraints.")
+
+    def _stampArrays(self, arrays):
+        """
+        Stamp every component at once from the struct-of-arrays view of the circuit, with the component values.
+        Gives the same system as stamping the components one by one with their values.
+
+        Args:
+            arrays (CircuitArrays): The arrays of the circuit.
+
+        Raises:
+            ZeroDivisionError: If a resistor has a zero value.
+        """
+        index = np.full(len(arrays.indptr) - 1, -1, dtype=np.int64) # Node id -> row/column, -1 for the ground
+        index[np.fromiter((arrays.nodeIds[node] for node in self.nodeIndex), dtype=np.int64, count=self.nodeCount)] = np.arange(self.nodeCount)
+        n0, n1 = index[arrays.nodes[:, 0]], index[arrays.nodes[:, 1]]
+        types, values, constrained = arrays.types, arrays.values, arrays.constrained
+
+        hasBranch = (types == arrays.VOLTAGE_SOURCE) | (types == arrays.INDUCTOR)
+        branchOf = self.nodeCount + np.cumsum(hasBranch) - 1 # Column of the branch current of each component
+        rowOf = self.nodeCount + np.cumsum(constrained) - 1 # Row of the constraint equation of each component
+        for k in np.flatnonzero(hasBranch):
+            self.addBranch(arrays.names[k])
+        for k in np.flatnonzero(constrained):
+            name = arrays.names[k]
+            if types[k] == arrays.WIRE:
+                self.addConstraint(f"hypothèse {arrays.components[k].motherComponent.name} parfait : V+ = V-", name)
+            elif types[k] == arrays.INDUCTOR:
+                self.addConstraint(f"relation courant-tension de la bobine {name}", name)
+            else:
+                self.addConstraint(f"valeur de la source de tension {name}", name)
+
+        def admittances(mask, admittance):
+            i, j, y = n0[mask], n1[mask], admittance[mask]
+            return np.concatenate([i, j, i, j]), np.concatenate([i, j, j, i]), np.concatenate([y, y, -y, -y])
+
+        resistors, capacitors, inductors = types == arrays.RESISTOR, types == arrays.CAPACITOR, types == arrays.INDUCTOR
+        if np.any(values[resistors] == 0):
+            raise ZeroDivisionError(f"Resistor {arrays.names[np.flatnonzero(resistors & (values == 0))[0]]} has a zero value.")
+        G = admittances(resistors, 1 / np.where(resistors, values, 1))
+        C = [np.concatenate(pair) for pair in zip(admittances(capacitors, values), (rowOf[inductors], branchOf[inductors], -values[inductors]))]
+        branches, constraints = np.flatnonzero(hasBranch), np.flatnonzero(constrained)
+        B = (np.concatenate([n0[branches], n1[branches], rowOf[constraints], rowOf[constraints]]),
+             np.concatenate([branchOf[branches], branchOf[branches], n0[constraints], n1[constraints]]),
+             np.repeat([1.0, -1.0, 1.0, -1.0], [len(branches), len(branches), len(constraints), len(constraints)]))
+        sources, currents = (types == arrays.VOLTAGE_SOURCE) & constrained, types == arrays.CURRENT_SOURCE
+        b = (np.concatenate([rowOf[sources], n0[currents], n1[currents]]), np.concatenate([values[sources], -values[currents], values[currents]]))
+
+        def dropGround(rows, cols, entries):
+            mask = (rows >= 0) & (cols >= 0)
+            return rows[mask], cols[mask], entries[mask]
+
+        self.triplets = {"G": dropGround(*G), "C": dropGround(*C), "B": dropGround(*B), "b": (b[0][b[0] >= 0], b[1][b[0] >= 0])}
+
+    @property
+    def nodeCount(self):
+        return len(self.nodeIndex)
+
+    @property
+    def size(self):
+        """
+        Number of unknowns (node voltages and branch currents).
+        """
+        return len(self.nodeIndex) + len(self.branchNames)
+
+    @property
+    def rowCount(self):
+        """
+        Number of equations (node equations and branch constraints).
+        """
+        return len(self.nodeIndex) + len(self.constraintExplanations)
+
+    def node(self, name):
+        """
+        Return the integer index of a node, or None for the ground.
+        """
+        return self.nodeIndex.get(name)
+
+    def addBranch(self, name):
+        """
+        Add an unknown branch current and return its column index.
+        """
+        self.branchNames.append(name)
+        self.branchIndex[name] = self.nodeCount + len(self.branchNames) - 1
+        return self.branchIndex[name]
+
+    def addConstraint(self, explanation, name=None):
+        """
+        Add a branch constraint equation and return its row index, recorded in constraintRows under the component name if given.
+        """
+        self.constraintExplanations.append(explanation)
+        row = self.nodeCount + len(self.constraintExplanations) - 1
+        if name is not None:
+            self.constraintRows[name] = row
+        return row
+
+    def stampEntry(self, matrix, row, col, value):
+        """
+        Add value to matrix[row, col], rows or columns of the ground (None) are dropped.
+        """
+        if row is not None and col is not None:
+            matrix[(row, col)] += value
+
+    def stampAdmittance(self, matrix, node1, node2, value):
+        """
+        Stamp an admittance between two nodes (classical nodal analysis pattern).
+        """
+        i, j = self.node(node1), self.node(node2)
+        self.stampEntry(matrix, i, i, value)
+        self.stampEntry(matrix, j, j, value)
+        self.stampEntry(matrix, i, j, -value)
+        self.stampEntry(matrix, j, i, -value)
+
+    def stampIncidence(self, branch, node1, node2):
+        """
+        Stamp a branch current leaving node1 and entering node2 in the node equations.
+        """
+        self.stampEntry(self.B, self.node(node1), branch, 1)
+        self.stampEntry(self.B, self.node(node2), branch, -1)
+
+    def stampConstraint(self, row, node1, node2):
+        """
+        Stamp the voltage V_node1 - V_node2 in a branch constraint equation.
+        """
+        self.stampEntry(self.B, row, self.node(node1), 1)
+        self.stampEntry(self.B, row, self.node(node2), -1)
+
+    def stampExcitation(self, row, value):
+        """
+        Add value to the right-hand side of an equation, the ground equation (None) is dropped.
+        """
+        if row is not None:
+            self.b[row] += value
+
+    def unknownLabels(self):
+        """
+        Return the label of every unknown of the system, in column order (v_<node> then i_<branch>).
+        """
+        return [f'v_{node}' for node in self.nodeIndex] + [f'i_{name}' for name in self.branchNames]
+
+    def rowExplanations(self):
+        """
+        Return the explanation of every equation of the system, in row order.
+        """
+        return [f"Loi des noeuds pour le noeud {node}" for node in self.nodeIndex] + self.constraintExplanations
+
+    def entries(self, p):
+        """
+        Return the dictionary of keys of A(p) = G + B + p*C, without the zero entries.
+
+        Args:
+            p: The value of the Laplace variable (symbol or number).
+        """
+        entries = defaultdict(int)
+        for key, value in self.G.items():
+            entries[key] += value
+        for key, value in self.B.items():
+            entries[key] += value
+        for key, value in self.C.items():
+            entries[key] += p * value
+        for key, value in self.P.items():
+            entries[key] += value if p == self.LAPLACE else sympy.sympify(value).xreplace({self.LAPLACE: p})
+        return {key: value for key, value in entries.items() if value != 0}
+
+    def toSympy(self, p):
+        """
+        Return the Sympy sparse matrix A(p) and the right-hand side vector b.
+
+        Args:
+            p (sympy.Symbol): The Laplace variable.
+
+        Returns:
+            tuple: A tuple containing the sympy.SparseMatrix A(p) and the sympy.Matrix b.
+        """
+        A = sympy.SparseMatrix(self.rowCount, self.size, self.entries(p))
+        b = sympy.Matrix([self.b.get(row, 0) for row in range(self.rowCount)])
+        return A, b
+
+    def toScipy(self):
+        """
+        Return the numeric matrices of the system, the stamped parameters must be numbers.
+
+        Returns:
+            tuple: A tuple containing the scipy.sparse CSC matrices G + B and C, and the numpy right-hand side vector b.
+        """
+        shape = (self.rowCount, self.size)
+        b = np.zeros(self.rowCount)
+        if self.triplets is not None:
+            G, B, C = self.triplets["G"], self.triplets["B"], self.triplets["C"]
+            G = coo_matrix((np.concatenate([G[2], B[2]]), (np.concatenate([G[0], B[0]]), np.concatenate([G[1], B[1]]))), shape=shape).tocsc()
+            C = coo_matrix((C[2], (C[0], C[1])), shape=shape).tocsc()
+            np.add.at(b, *self.triplets["b"])
+            return G, C, b
+        if self.P:
+            raise ValueError("Subcircuit port models have no G + pC form, the numeric system is stamped from the flattened circuit.")
+        G = self._toCsc(shape, self.G, self.B)
+        C = self._toCsc(shape, self.C)
+        for row, value in self.b.items():
+            b[row] = value
+        return G, C, b
+
+    @staticmethod
+    def _toCsc(shape, *stamps):
+        """
+        Convert dictionaries of keys into one scipy CSC matrix, duplicate keys are summed by the conversion.
+        """
+        rows, cols, values = [], [], []
+        for entries in stamps:
+            for (row, col), value in entries.items():
+                rows.append(row)
+                cols.append(col)
+                values.append(value)
+        return coo_matrix((np.array(values, dtype=float), (rows, cols)), shape=shape).tocsc()
+
+
+class PolynomialSystem:
+    """
+    Fraction-free solver of an MNA system whose entries are polynomials of the polynomial ring ZZ[symbols, p].
+
+    The elimination is a sparse Bareiss elimination with Markowitz pivoting: every intermediate entry is a minor of the
+    matrix, divisions are exact, and no rational function is ever built. The solution is returned with Cramer's rule
+    form x_j = numerators[j] / determinant, where both terms are polynomials.
+
+    Attributes:
+        ring (PolyRing): The polynomial ring of the entries.
+        size (int): The number of unknowns (and equations).
+        rows (dict): Sparse augmented matrix {row: {col: poly}}, the column size holds the right-hand side.
+        determinant (PolyElement): The determinant, with a positive leading coefficient, once factorized.
+    """
+    def __init__(self, ring, size, entries, rhs):
+        """
+        Args:
+            ring (PolyRing): The polynomial ring of the entries.
+            size (int): The number of unknowns (and equations).
+            entries (dict): Dictionary of keys {(row, col): poly} of the matrix.
+            rhs (dict): Dictionary {row: poly} of the right-hand side.
+        """
+        self.ring = ring
+        self.size = size
+        self.order = None # Triangular rows (col, entries) in elimination order, set by factorize
+        self.determinant = None
+        self.numerators = {} # Memoized numerators of the back substitution
+        self.rows = {row: {} for row in range(size)}
+        for (row, col), value in entries.items():
+            if value:
+                self.rows[row][col] = value
+        for row, value in rhs.items():
+            if value:
+                self.rows[row][size] = value
+
+    @classmethod
+    def fromMNA(cls, mna, gens):
+        """
+        Convert a symbolic MNA system into a polynomial system.
+
+        Args:
+            mna (MNASystem): A system stamped with polynomial entries (resistors stamped with their conductance).
+            gens (list): The sympy symbols generating the polynomial ring, the Laplace variable included.
+
+        Returns:
+            PolynomialSystem: The system over ZZ[gens].
+
+        Raises:
+            ValueError: If the system is not square.
+        """
+        if mna.rowCount != mna.size:
+            raise ValueError(f"The system of equations is not square: {mna.rowCount} equations for {mna.size} unknowns.")
+        ring = PolyRing(gens, ZZ)
+        p = gens[-1]
+        entries = {key: ring.from_expr(value) for key, value in mna.entries(p).items()}
+        rhs = {row: ring.from_expr(value) for row, value in mna.b.items() if value != 0}
+        return cls(ring, mna.size, entries, rhs)
+
+    def factorize(self, targets=()):
+        """
+        Triangularize the system by fraction-free elimination. The triangular rows are kept for the back substitutions.
+
+        Args:
+            targets (iterable): Columns to eliminate last, so that the back substitution reaches them first.
+
+        Raises:
+            ValueError: If the system is singular.
+        """
+        rows = {row: dict(entries) for row, entries in self.rows.items()}
+        columns = defaultdict(set)
+        for row, entries in rows.items():
+            for col in entries:
+                if col != self.size:
+                    columns[col].add(row)
+
+        one = self.ring.one
+        pivots = [one] # pivots[k] is the pivot of step k, pivots[0] = 1 by convention
+        rowStep = {row: 0 for row in rows} # Step at which the stored entries of each row are exact
+        order = [] # (col, entries) of each pivot row, in elimination order
+        deferred = set(targets)
+
+        for step in range(1, self.size + 1):
+            pivotRow, pivotCol = self._choosePivot(rows, columns, deferred)
+            if pivotRow is None:
+                pivotRow, pivotCol = self._choosePivot(rows, columns, set())
+            if pivotRow is None:
+                raise ValueError("The system of equations is singular.")
+            self._bringToStep(rows[pivotRow], rowStep[pivotRow], step - 1, pivots)
+            pivotEntries = rows.pop(pivotRow)
+            pivot = pivotEntries[pivotCol]
+
+            for col in pivotEntries:
+                if col != self.size:
+                    columns[col].discard(pivotRow)
+            for row in columns.pop(pivotCol):
+                entries = rows[row]
+                # Bareiss update (pivot.a_ij - a_ik.a_kj) / pivots[step - 1] applied to the lazily scaled row,
+                # the scaling pivots[step - 1] / pivots[rowStep[row]] cancels with the Bareiss divisor
+                divisor = pivots[rowStep[row]]
+                factor = entries.pop(pivotCol)
+                for col in set(entries) | set(pivotEntries):
+                    if col == pivotCol:
+                        continue
+                    value = pivot * entries.get(col, 0) - factor * pivotEntries.get(col, 0)
+                    if divisor != one:
+                        value = self.exquo(value, divisor)
+                    if value:
+                        entries[col] = value
+                        if col != self.size:
+                            columns[col].add(row)
+                    elif col in entries:
+                        del entries[col]
+                        columns[col].discard(row)
+                rowStep[row] = step
+
+            pivots.append(pivot)
+            deferred.discard(pivotCol)
+            order.append((pivotCol, pivotEntries))
+
+        # The last pivot is the determinant up to the sign of the permutations, normalized to a positive leading coefficient
+        # so that numerators computed from different factorizations stay consistent
+        self.determinant = pivots[-1] if pivots[-1].LC > 0 else -pivots[-1]
+        self.order = order
+        self.position = len(order) # Back substitution progress: order[position:] is solved
+        self.numerators = {}
+
+    def eliminate(self, columns):
+        """
+        Eliminate some unknowns by fraction-free elimination, with pivots taken in any row. The remaining rows only involve
+        the other columns: when the eliminated unknowns are the internal unknowns of a subcircuit, they are its port equations
+        (the Schur complement of the internal block, scaled by its determinant).
+
+        Args:
+            columns (set): Indices of the unknowns to eliminate.
+
+        Returns:
+            dict: The remaining rows {row: {col: poly}}, the column size holding the right-hand side.
+
+        Raises:
+            ValueError: If the eliminated unknowns are not determined by the system.
+        """
+        one = self.ring.one
+        rows = {row: dict(entries) for row, entries in self.rows.items()}
+        eliminated = set(columns)
+        previous = one
+        while eliminated:
+            # Sparsest row first, as a cheap Markowitz criterion
+            pivotRow, pivotCol = None, None
+            for _, row in sorted((len(entries), row) for row, entries in rows.items()):
+                cols = [col for col in rows[row] if col in eliminated]
+                if cols:
+                    pivotRow, pivotCol = row, min(cols, key=lambda col: (len(rows[row][col].terms()), col))
+                    break
+            if pivotRow is None:
+                raise ValueError("The internal unknowns of the subcircuit are not determined by its equations.")
+            pivotEntries = rows.pop(pivotRow)
+            pivot = pivotEntries[pivotCol]
+            for entries in rows.values():
+                # Bareiss update (pivot.a_ij - a_ik.a_kj) / previous pivot, exact for every row
+                factor = entries.pop(pivotCol, self.ring.zero)
+                for col in set(entries) | set(pivotEntries):
+                    if col == pivotCol:
+                        continue
+                    value = pivot * entries.get(col, self.ring.zero) - factor * pivotEntries.get(col, self.ring.zero)
+                    if previous != one:
+                        value = self.exquo(value, previous)
+                    if value:
+                        entries[col] = value
+                    else:
+                        entries.pop(col, None)
+            previous = pivot
+            eliminated.discard(pivotCol)
+        return rows
+
+    def numerator(self, col):
+        """
+        Return the numerator of x_col = numerator / determinant, continuing the fraction-free back substitution only as far as needed.
+
+        Args:
+            col (int): The column of the unknown.
+
+        Returns:
+            PolyElement: The numerator polynomial.
+        """
+        if self.order is None:
+            self.factorize([col])
+        while col not in self.numerators:
+            self.position -= 1
+            pivotCol, entries = self.order[self.position]
+            if self.position == len(self.order) - 1:
+                # determinant * x_last = rhs of the last pivot row, up to the sign of the normalization
+                value = entries.get(self.size, self.ring.zero)
+                self.numerators[pivotCol] = value if self.determinant == entries[pivotCol] else -value
+                continue
+            value = self.determinant * entries.get(self.size, 0)
+            for other, coefficient in entries.items():
+                if other != pivotCol and other != self.size:
+                    value -= coefficient * self.numerators[other]
+            self.numerators[pivotCol] = self.exquo(value, entries[pivotCol])
+        return self.numerators[col]
+
+    def solve(self, targets=None):
+        """
+        Solve the system by fraction-free elimination followed by a fraction-free back substitution.
+
+        Args:
+            targets (list): Optional columns to solve for. On the first call they are eliminated last so that the back substitution stops as soon as they are known.
+
+        Returns:
+            tuple: A tuple containing the dictionary {col: numerator poly} and the determinant poly.
+
+        Raises:
+            ValueError: If the system is singular.
+        """
+        targets = list(range(self.size)) if targets is None else list(targets)
+        if self.order is None:
+            self.factorize(targets)
+        return {col: self.numerator(col) for col in targets}, self.determinant
+
+    @staticmethod
+    def exquo(dividend, divisor):
+        """
+        Exact division of two polynomials of the (lex ordered) ring.
+        The remainder terms are kept in a heap so that the leading term is found in log time instead of scanning the whole
+        remainder for every term of the quotient, as PolyElement.exquo does.
+
+        Raises:
+            ExactQuotientFailed: If the division is not exact.
+        """
+        ring = dividend.ring
+        if not dividend or divisor == ring.one:
+            return dividend
+        if len(divisor) == 1:
+            # Most pivots of an MNA system are monomials (incidence entries, single component values)
+            ((monom, coeff),) = divisor.items()
+            if coeff in (1, -1) and not any(monom):
+                return dividend if coeff == 1 else -dividend
+            quotient = {}
+            for term, value in dividend.items():
+                quotientMonom = ring.monomial_div(term, monom)
+                if quotientMonom is None or value % coeff:
+                    raise ExactQuotientFailed(dividend, divisor)
+                quotient[quotientMonom] = value // coeff
+            return ring.from_dict(quotient)
+        leadingMonom = max(divisor)
+        leadingCoeff = divisor[leadingMonom]
+        divisorTail = [(monom, coeff) for monom, coeff in divisor.items() if monom != leadingMonom]
+        remainder = dict(dividend)
+        heap = [tuple(-e for e in monom) for monom in remainder]
+        heapq.heapify(heap)
+        quotient = {}
+        while heap:
+            monom = tuple(-e for e in heapq.heappop(heap))
+            coeff = remainder.pop(monom, 0)
+            if not coeff:
+                continue
+            quotientMonom = ring.monomial_div(monom, leadingMonom)
+            if quotientMonom is None or coeff % leadingCoeff:
+                raise ExactQuotientFailed(dividend, divisor)
+            quotientCoeff = coeff // leadingCoeff
+            quotient[quotientMonom] = quotientCoeff
+            for tailMonom, tailCoeff in divisorTail:
+                product = ring.monomial_mul(quotientMonom, tailMonom)
+                value = remainder.get(product, 0) - quotientCoeff * tailCoeff
+                if value:
+                    if product not in remainder:
+                        heapq.heappush(heap, tuple(-e for e in product))
+                    remainder[product] = value
+                else:
+                    remainder.pop(product, None)
+        return ring.from_dict(quotient)
+
+    def _choosePivot(self, rows, columns, deferred):
+        """
+        Choose the non-zero entry of minimal Markowitz cost (r-1)(c-1), then of minimal number of terms.
+        Columns in deferred are not eligible.
+        """
+        best, bestCost = (None, None), None
+        for row, entries in rows.items():
+            rowCost = len(entries) - 1 - (self.size in entries)
+            for col, value in entries.items():
+                if col == self.size or col in deferred:
+                    continue
+                cost = (rowCost * (len(columns[col]) - 1), len(value))
+                if bestCost is None or cost < bestCost:
+                    best, bestCost = (row, col), cost
+        return best
+
+    @staticmethod
+    def _bringToStep(entries, fromStep, toStep, pivots):
+        """
+        Rows untouched by the steps fromStep+1..toStep are only scaled by pivots[toStep] / pivots[fromStep] in Bareiss elimination.
+        The scaling is applied lazily, when the row is used again.
+        """
+        if fromStep == toStep:
+            return
+        for col in entries:
+            entries[col] = PolynomialSystem.exquo(entries[col] * pivots[toStep], pivots[fromStep])
+
+
+class CompiledTransferFunction:
+    """
+    Transfer function N(p)/D(p) compiled once into a NumPy-vectorized callable of the component values and p.
+    The coefficients in p of N and D are lambdified together with common subexpression elimination.
+
+    Attributes:
+        expression (sympy.Expr): The analytic transfer function.
+        parameters (list): Names of the components the transfer function depends on, in argument order.
+        defaults (dict): Value of each component used when none is given.
+    """
+    def __init__(self, expression, parameters, p, defaults=None):
+        """
+        Compile the transfer function.
+
+        Args:
+            expression (sympy.Expr): The analytic transfer function.
+            parameters (dict): Dictionary of key component name and value its symbol.
+            p (sympy.Symbol): The Laplace variable.
+            defaults (dict): Value of each component used when none is given.
+        """
+        self.expression = expression
+        self.parameters = [name for name, symbol in parameters.items() if symbol in expression.free_symbols]
+        self.defaults = dict(defaults or {})
+        numerator, denominator = sympy.fraction(expression)
+        self.numeratorDegree = sympy.degree(numerator, p)
+        coefficients = sympy.Poly(numerator, p).all_coeffs() + sympy.Poly(denominator, p).all_coeffs()
+        self._coefficients = sympy.lambdify([parameters[name] for name in self.parameters], coefficients, 'numpy', cse=True)
+
+    def _arguments(self, values):
+        values = {**self.defaults, **(values or {})}
+        missing = [name for name in self.parameters if values.get(name) is None]
+        if missing:
+            raise ValueError(f"Missing numerical values for components: {missing}")
+        return [np.asarray(values[name], dtype=float) for name in self.parameters]
+
+    def coefficients(self, values=None):
+        """
+        Evaluate the coefficients of the numerator and of the denominator, highest power of p first.
+
+        Args:
+            values (dict): Value (number or array) of the components, defaults are used for the others.
+
+        Returns:
+            tuple: A tuple containing the lists of numerator and denominator coefficients (numbers or arrays).
+
+        Raises:
+            ValueError: If a component has no value.
+        """
+        coefficients = self._coefficients(*self._arguments(values))
+        return coefficients[:self.numeratorDegree + 1], coefficients[self.numeratorDegree + 1:]
+
+    def __call__(self, p, values=None):
+        """
+        Evaluate the transfer function.
+
+        Args:
+            p (complex or array-like): The value of the Laplace variable, e.g. 1j*w.
+            values (dict): Value (number or array) of the components, defaults are used for the others.
+                Arrays of values and of p are broadcast together.
+
+        Returns:
+            numpy.ndarray: The value of the transfer function.
+        """
+        p = np.asarray(p)
+        numerator, denominator = self.coefficients(values)
+        return self._horner(numerator, p) / self._horner(denominator, p)
+
+    @staticmethod
+    def _horner(coefficients, p):
+        value = 0
+        for c in coefficients:
+            value = value * p + c
+        return value
+
+
+class Circuit:
+    """
+    Represents the entire electronic circuit and provides methods to analyze and solve it.
+
+    Attributes:
+        components (list): List of Component instances in the circuit.
+        nodes (list): List of all nodes in the circuit.
+        nodeIds (dict): Integer id of each node, its index in nodes.
+        arrays (CircuitArrays): Struct-of-arrays view of the linear components, with the node-to-component adjacency.
+        isNodeComponentDicBuilt (bool): Indicates if the connection list is built.
+        isEqSysEstablished (bool): Indicates if the equation system is established.
+        equations (list): List of Sympy Equation objects representing the circuit equations.
+    """
+    def __init__(self, netlist, components=None, nodes=None):
+        """
+        Args:
+            netlist (str or iterable): The netlist of the circuit, see Parser.parse_netlist. None to build the circuit from components.
+            components (list): The components of the circuit, when no netlist is given.
+            nodes (list): Nodes to register before the nodes of the components, when no netlist is given.
+        """
+        self.components = []  # List of Component instances
+        self.nodes = []  # List of all nodes in the circuit
+        self.arrays = None  # Struct-of-arrays view of the linear components and CSR node-to-component adjacency
+        self.isNodeComponentDicBuilt = False  # Boolean indicating if the connection list is built
+        self.isEqSysEstablished = False  # Boolean indicating if the equation system is established
+        self.isCircuitLinear = False  # Boolean indicating if the circuit has been linearized
+        self.equations = []  # List of Sympy Equation objects
+
+        # Parse the netlist to get the components and nodes
+        if netlist is not None:
+            self.components, self.nodes = Parser.parse_netlist(netlist)
+        else:
+            self.components, self.nodes = list(components), list(nodes or [])
+        self.nodeIds = {node: i for i, node in enumerate(self.nodes)}  # Integer id of each node, its index in self.nodes
+
+
+        # Build the node to component dictionary
+        self.buildNodeComponentDic()
+
+    def addComponent(self, component):
+        """
+        Add a component to the circuit.
+
+        Args:
+            component (Component): The component to add to the circuit.
+        """
+        self.components.append(component)
+        self.arrays = None # Rebuilt on the next getArrays
+
+    def linearizeCircuit(self):
+        """
+        Handle the linearization of nonlinear circuit elements.
+
+        Raises:
+            Exception: If an error occurs during linearization.
+        """
+        try:
+            logging.info("Starting to linearize circuit.")
+            for component in self.components:
+                if not component.isLinear:
+                    logging.info(f"Linearizing nonlinear component: {component.name}")
+                    linearizedComponents = component.getLinearizedVersion()
+                    for linearizedComponent in linearizedComponents:
+                        self.components.append(linearizedComponent)
+            self.isCircuitLinear = True
+            logging.info("Finished linearizing circuit.")
+        except Exception as e:
+            logging.error(f"Error linearizing circuit: {e}")
+            raise
+
+    def buildNodeComponentDic(self):
+        """
+        Register the nodes of the linear components and build the arrays of the circuit, with the CSR adjacency mapping nodes to components.
+
+        Raises:
+            Exception: If an error occurs during building the connection list.
+        """
+        try:
+            logging.info("Starting to build connection list.")
+            if not self.isCircuitLinear:
+                self.linearizeCircuit()
+            for component in self.components:
+                if component.isLinear :
+                    for node in component.nodes:
+                        if node not in self.nodeIds:
+                            self.nodeIds[node] = len(self.nodes)
+                            self.nodes.append(node)
+            self.arrays = CircuitArrays(self)
+            self.isNodeComponentDicBuilt = True
+            logging.info("Finished building connection list.")
+        except Exception as e:
+            logging.error(f"Error building connection list: {e}")
+            raise
+
+    def setNodes(self, nodes):
+        """
+        Set the list of nodes in the circuit.
+
+        Args:
+            nodes (list): List of nodes in the circuit.
+        """
+        self.nodes = nodes
+        self.nodeIds = {node: i for i, node in enumerate(nodes)}
+        self.arrays = None
+
+    def getSubcircuitParameters(self):
+        """
+        Return the components of the subcircuits instantiated in the circuit, by qualified name '<subcircuit>.<component>'.
+
+        Returns:
+            dict: Qualified name -> Component, see SubcircuitDefinition.getParameters.
+        """
+        parameters = {}
+        for component in self.components:
+            if isinstance(component, Subcircuit):
+                parameters.update(component.definition.getParameters())
+        return parameters
+
+    def getArrays(self):
+        """
+        Return the struct-of-arrays view of the linear components, built on first use.
+        After changing a component in place (e.g. its value), set self.arrays to None so that the view is rebuilt.
+
+        Returns:
+            CircuitArrays: The arrays of the circuit.
+        """
+        if self.arrays is None:
+            self.buildNodeComponentDic()
+        return self.arrays
+
+    def getConnectedComponents(self, node):
+        """
+        Return the linear components connected to a node, read from the CSR adjacency. Subcircuit instances are flattened.
+
+        Args:
+            node (str): The name of the node.
+
+        Returns:
+            list: The components connected to the node.
+        """
+        arrays = self.getArrays()
+        return [arrays.components[k] for k in arrays.neighbours(arrays.nodeIds[node])]
+
+class Solver:
+    """
+    Handles Sympy manipulations for solving the circuit equations.
+    In numeric mode, the MNA system is stamped directly with the component values and solved with sparse numeric linear algebra, bypassing Sympy.
+    In lazy mode, the system is only set up: unknowns and transfer functions are computed on request and memoized.
+
+    Attributes:
+        circuit (Circuit): The circuit instance associated with the solver.
+        mode (str): 'symbolic' (default) or 'numeric'.
+        lazy (bool): Whether the unknowns are solved on request only.
+    """
+    MODES = ('symbolic', 'numeric')
+
+    def __init__(self, circuit, mode='symbolic', lazy=False, state=None):
+        """
+        Initialize the Solver with a specific circuit.
+        It starts from a circuit and gives the expression of every voltage and current in the circuit in terms of the known parameters.
+        In numeric mode, only the numeric MNA system is built: use getNumericalSolution and evaluateTransferFunction.
+        In lazy mode, nothing is solved until getSolution or getTransferFunction is called.
+  
+        Args:
+            circuit (Circuit): The circuit to be solved.
+            mode (str): 'symbolic' or 'numeric'. The numeric mode requires a value for every component.
+            lazy (bool): Only set up the system, solve the requested unknowns later.
+            state (dict): Results previously exported with getState for the same netlist, restored instead of solving again.
+
+        Raises:
+            ValueError: If the mode is unknown, a component value is missing in numeric mode or the circuit has diodes or transistors.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown solver mode '{mode}', expected one of {self.MODES}.")
+        self.mode = mode
+        self.lazy = lazy
+        self.circuit = circuit
+        # First linearize the circuit
+        if not self.circuit.isCircuitLinear:
+            self.circuit.linearizeCircuit()
+        devices = [component.name for component in self.circuit.components if isinstance(component, (Diode, BJT))]
+        if devices:
+            raise ValueError(f"Nonlinear devices {', '.join(devices)} have no linear model, use nonlinear.NonlinearDCSolver for the operating point.")
+        self.nodeVoltages = {} # Dictionary of unknown node voltages
+        self.unknownCurrents = {} # Dictionary of unknown branch currents
+        self.knownParameters = {} # Dictionary of known values (e.g., resistors, input voltages, etc.)
+        self.equations = [] # List of equations used to solve every current and voltage in the circuit
+        self.solutions = None # Dictionary of solutions for the unknowns parameters expressed in terms of the known parameters
+        self.analyticTransferFunction = None # Symbols are still used for known parameters
+        self.paramValues = {} # Dictionary to replace the symbolic parameters with numerical values
+        self.mna = None # Stamped MNA system A(p).x = b the equations and solutions are derived from
+        self.unknowns = [] # Unknown symbols ordered as the columns of the MNA system
+        self.numericSystem = None # Tuple (G, C, b) of scipy sparse matrices in numeric mode
+        self.numericMNA = None # MNA system of numericSystem, subcircuit instances flattened
+        self.conductances = {} # Placeholder symbol g = 1/R of each resistor, keeps the polynomial system free of fractions
+        self.polynomialSystem = None # MNA system over the polynomial ring of the known parameters and p
+        self.transferFunctions = {} # Memoized analytic transfer functions {(inputNode, outputNode): sympy.Expr}
+        self.numericalTransferFunctions = {} # Memoized coefficients {(inputNode, outputNode): (num, den)}
+        self.compiledTransferFunctions = {} # Compiled transfer functions {(inputNode, outputNode): CompiledTransferFunction}
+
+        if self.mode == 'numeric':
+            self.initializeParamValues()
+            self.buildMNASystem()
+            self.numericMNA = self.mna
+            self.numericSystem = self.mna.toScipy()
+            return
+
+        self.initializeKnownParameters()
+        self.buildMNASystem()
+        self.initializeUnknownParameters()
+        if state is not None:
+            self.restoreState(state)
+            if not self.equations:
+                self.getEqSys()
+            if not self.lazy and len(self.solutions) < len(self.unknowns):
+                self.solveEqSys()
+            return
+        self.getEqSys()
+        if self.lazy:
+            self.solutions = {} # Filled by getSolution
+        else:
+            self.solveEqSys()
+
+
+    def initializeKnownParameters(self):
+        """
+        Initialize a dictionary with key component.name and value sympy.symbols(f'{component.name}') for each linear component in the circuit.
+        Current sources are known excitations, their symbol is sympy.symbols(f'i_{component.name}').
+        """
+        self.knownParameters["p"] = sympy.symbols('p') # Laplace variable
+        for component in self.circuit.components:
+            if component.isLinear:
+                if component.isVirtual==False:
+                    if isinstance(component, Resistor) or isinstance(component, Inductor) or isinstance(component, Capacitor):
+                        self.knownParameters[component.name] = sympy.symbols(f'{component.name}')
+                    elif isinstance(component, VoltageSource):
+                        self.knownParameters[component.name] = sympy.symbols(f'{component.name}')
+                    elif isinstance(component, CurrentSource):
+                        self.knownParameters[component.name] = sympy.symbols(f'i_{component.name}')
+        for name, component in self.circuit.getSubcircuitParameters().items():
+            self.knownParameters[name] = sympy.symbols(f'i_{name}' if isinstance(component, CurrentSource) else name)
+
+    def initializeParamValues(self):
+        """
+        Initialize the dictionary of key component.name and value component.value for each linear component in the circuit.
+
+        Raises:
+            ValueError: If a component that needs a value has none.
+        """
+        missing = []
+        for component in self.circuit.components:
+            if component.isLinear and component.isVirtual==False and not isinstance(component, (Wire, Subcircuit)):
+                if component.value is None:
+                    missing.append(component.name)
+                else:
+                    self.paramValues[component.name] = component.value
+        for name, component in self.circuit.getSubcircuitParameters().items():
+            if component.value is None:
+                missing.append(name)
+            else:
+                self.paramValues[name] = component.value
+        if missing:
+            logging.error(f"Missing numerical values for components: {missing}")
+            raise ValueError(f"Error: Missing numerical values for components: {missing}")
+
+    def buildMNASystem(self):
+        """
+        Stamp every linear component of the circuit into the MNA system, using the symbols of the known parameters (or their values in numeric mode).
+        """
+        logging.info("Starting to stamp the MNA system.")
+        parameters = None if self.mode == 'numeric' else self.knownParameters # Numeric values are stamped from the circuit arrays
+        self.mna = MNASystem(self.circuit, parameters)
+        logging.info("Finished stamping the MNA system.")
+
+    def initializeUnknownParameters(self):
+        """
+        Initialize dictionaries of key node and value sympy.symbols(f'v_{node}') for each node and branch in the circuit and sympy.symbols(f'i_{branch}') for each branch of the MNA system.
+        """ 
+        # Populate the nodeVoltages dictionary with node names
+        for node in self.circuit.nodes:
+            if node != '0':
+                self.nodeVoltages[node] = sympy.symbols(f'v_{node}')
+            else :
+                self.nodeVoltages['0'] = 0 # TODO améliorer cette partie, ce n'est pas très rigoureux de mettre la masse dans nodeVoltages
+
+        # Populate the unknownCurrents dictionary with branch names
+        # For each voltage source (and inductor) we add a unknown current, this is how MNA solvers parametrize the problem. 
+        # The keys of the dictionnary are the name of the component and the value is the unknown current.
+        for name in self.mna.branchNames:
+            self.unknownCurrents[name] = sympy.symbols(f'i_{name}')
+
+        self.unknowns = [sympy.symbols(label) for label in self.mna.unknownLabels()]
+
+
+    def getEqSys(self):
+        """
+        Establish the system of equations from the rows of the MNA system.
+
+        Returns:
+            list: A list of Sympy equations representing the circuit.
+        """
+        logging.info("Starting to establish the system of equations.")
+        rows = defaultdict(int)
+        for (row, col), value in self.mna.entries(self.knownParameters["p"]).items():
+            rows[row] += value * self.unknowns[col]
+        for row, explanation in enumerate(self.mna.rowExplanations()):
+            equation = sympy.Eq(rows[row], self.mna.b.get(row, 0))
+            self.equations.append((equation, explanation))
+        logging.info("Finished establishing the system of equations.")
+        return self.equations
+
+    def buildPolynomialSystem(self):
+        """
+        Stamp the circuit a second time in the polynomial ring of the known parameters and p.
+        Resistors are stamped with a conductance placeholder g = 1/R, which is mapped back to 1/R in rationalToSympy.
+        """
+        parameters = dict(self.knownParameters)
+        resistors = [component.name for component in self.circuit.components if isinstance(component, Resistor)]
+        resistors += [name for name, component in self.circuit.getSubcircuitParameters().items() if isinstance(component, Resistor)]
+        for name in resistors:
+            if name in parameters:
+                self.conductances[name] = sympy.Dummy(f'g_{name}')
+                parameters[name] = 1 / self.conductances[name]
+        p = self.knownParameters["p"]
+        gens = [symbol for name, symbol in self.knownParameters.items() if name != "p" and name not in self.conductances]
+        gens += list(self.conductances.values()) + [p]
+        self.polynomialSystem = PolynomialSystem.fromMNA(MNASystem(self.circuit, parameters), gens)
+        return self.polynomialSystem
+
+    def getPolynomialSystem(self):
+        """
+        Return the polynomial system, built on first use only.
+
+        Returns:
+            PolynomialSystem: The MNA system over the polynomial ring of the known parameters and p.
+        """
+        if self.polynomialSystem is None:
+            self.buildPolynomialSystem()
+        return self.polynomialSystem
+
+    def rationalToSympy(self, numerator, denominator):
+        """
+        Convert a ratio of polynomials of the polynomial system into a canonical Sympy expression in terms of the known parameters.
+        The common factors are cancelled and every conductance placeholder g is replaced by 1/R, clearing the new denominators.
+
+        Args:
+            numerator (PolyElement): The numerator.
+            denominator (PolyElement): The denominator.
+
+        Returns:
+            sympy.Expr: The expression numerator / denominator.
+        """
+        numerator, denominator = numerator.cancel(denominator)
+        ring = numerator.ring
+        resistances = {symbol: self.knownParameters[name] for name, symbol in self.conductances.items()}
+        indices = [i for i, symbol in enumerate(ring.symbols) if symbol in resistances]
+        degrees = [max(numerator.degree(i), denominator.degree(i), 0) for i in indices]
+        target = PolyRing([resistances.get(symbol, symbol) for symbol in ring.symbols], ZZ)
+
+        def revert(poly):
+            terms = {}
+            for monom, coeff in poly.terms():
+                monom = list(monom)
+                for i, degree in zip(indices, degrees):
+                    monom[i] = degree - monom[i]
+                terms[tuple(monom)] = coeff
+            return target.from_dict(terms).as_expr()
+
+        return revert(numerator) / revert(denominator)
+
+    def solveEqSys(self):
+        """
+        Solve the MNA system to find every unknown voltage and current.
+        The fraction-free polynomial solver gives every unknown as a ratio of polynomials, no simplification is needed.
 
         Returns:
             dict: A dictionary of solutions for the variables in the circuit.
@@ -648,13 +2029,68 @@ class Solver:
         """
         try:
             logging.info("Starting to solve the system of equations.")
-            unknowns = [x for x in list(self.nodeVoltages.values()) if x != 0] + list(self.unknownCurrents.values()) 
-            self.solutions = sympy.solve([equ for equ,expl in self.equations], unknowns)
+            numerators, determinant = self.getPolynomialSystem().solve()
+            self.solutions = {unknown: self.rationalToSympy(numerators[col], determinant) for col, unknown in enumerate(self.unknowns)}
             logging.info("Finished solving the system of equations.")
+            return self.solutions
         except Exception as e:
             logging.error(f"Error solving equation system: {e}")
             raise
     
+    def getSolution(self, unknown):
+        """
+        Return the expression of one unknown, solving only what it needs. The result is memoized in self.solutions.
+
+        Args:
+            unknown (sympy.Symbol or str): The unknown or its label, e.g. 'v_3' or 'i_V1'.
+
+        Returns:
+            sympy.Expr: The expression of the unknown in terms of the known parameters.
+
+        Raises:
+            ValueError: If the unknown is not an unknown of the circuit.
+        """
+        if self.mode == 'numeric':
+            raise ValueError("Analytic solutions are not available in numeric mode, use getNumericalSolution.")
+        symbol = sympy.Symbol(unknown) if isinstance(unknown, str) else unknown
+        if symbol == sympy.Symbol('v_0'):
+            return sympy.Integer(0)
+        if symbol not in self.unknowns:
+            raise ValueError(f"Unknown '{unknown}' is not an unknown of the circuit.")
+        if symbol not in self.solutions:
+            col = self.unknowns.index(symbol)
+            polynomialSystem = self.getPolynomialSystem()
+            numerator = polynomialSystem.numerator(col)
+            self.solutions[symbol] = self.rationalToSympy(numerator, polynomialSystem.determinant)
+        return self.solutions[symbol]
+
+    def getState(self):
+        """
+        Export everything solved so far, so that an identical circuit can be restored without solving it again.
+
+        Returns:
+            dict: A dictionary with the equations, solutions, transfer functions and numerical transfer functions.
+        """
+        return {
+            "equations": list(self.equations),
+            "solutions": dict(self.solutions or {}),
+            "transferFunctions": dict(self.transferFunctions),
+            "numericalTransferFunctions": dict(self.numericalTransferFunctions),
+        }
+
+    def restoreState(self, state):
+        """
+        Restore results exported with getState. The polynomial system is only built again if an unknown is still missing.
+        Without equations in the state, call getEqSys to establish them.
+
+        Args:
+            state (dict): A dictionary as returned by getState.
+        """
+        self.equations = list(state.get("equations", []))
+        self.solutions = dict(state.get("solutions", {}))
+        self.transferFunctions.update(state.get("transferFunctions", {}))
+        self.numericalTransferFunctions.update(state.get("numericalTransferFunctions", {}))
+
     def getTransferFunction(self, inputNode, outputNode):
         """
         Get the transfer function of the circuit.
@@ -669,11 +2105,21 @@ class Solver:
         Raises:
             ValueError: If the input or output node is not found in nodeVoltages.
         """
-        if inputNode not in self.nodeVoltages or outputNode not in self.nodeVoltages:
+        if self.mode == 'numeric':
+            raise ValueError("The analytic transfer function is not available in numeric mode, use evaluateTransferFunction.")
+        if self.mna.node(inputNode) is None or self.mna.node(outputNode) is None:
             logging.error(f"Input node '{inputNode}' or output node '{outputNode}' not found in nodeVoltages.")
-        logging.info(f"Calculating transfer function from {inputNode} to {outputNode}.")
-        self.analyticTransferFunction = sympy.simplify(self.solutions[self.nodeVoltages[outputNode]] / self.solutions[self.nodeVoltages[inputNode]])
-        logging.info("Finished calculating transfer function.")
+            raise ValueError(f"Input node '{inputNode}' or output node '{outputNode}' is not a (non-ground) node of the circuit.")
+        if (inputNode, outputNode) not in self.transferFunctions:
+            logging.info(f"Calculating transfer function from {inputNode} to {outputNode}.")
+            inputCol, outputCol = self.mna.node(inputNode), self.mna.node(outputNode)
+            polynomialSystem = self.getPolynomialSystem()
+            if polynomialSystem.order is None:
+                polynomialSystem.factorize([inputCol, outputCol]) # Only these two unknowns need a back substitution
+            # Both voltages share the determinant as denominator: the ratio of their numerators is already a rational function
+            self.transferFunctions[(inputNode, outputNode)] = self.rationalToSympy(polynomialSystem.numerator(outputCol), polynomialSystem.numerator(inputCol))
+            logging.info("Finished calculating transfer function.")
+        self.analyticTransferFunction = self.transferFunctions[(inputNode, outputNode)]
         return self.analyticTransferFunction
     
     def getNumericalTransferFunction(self, inputNode, outputNode):
@@ -690,32 +2136,164 @@ class Solver:
         Raises:
             Exception: If an error occurs during getting the numerical transfer function.
         """
-        analytictf = self.getTransferFunction(inputNode, outputNode)
+        self.getTransferFunction(inputNode, outputNode)
+        if (inputNode, outputNode) in self.numericalTransferFunctions:
+            num_coeffs, den_coeffs = self.numericalTransferFunctions[(inputNode, outputNode)]
+            return list(num_coeffs), list(den_coeffs)
+        compiled = self.getCompiledTransferFunction(inputNode, outputNode)
         try:
             logging.info("Starting to get numerical transfer function.")
-            p = self.knownParameters["p"]
             for component in self.circuit.components:
                 if component.value != None:
                     self.paramValues[component.name] = component.value
+            for name, component in self.circuit.getSubcircuitParameters().items():
+                if component.value is not None:
+                    self.paramValues[name] = component.value
 
-            # Replace the symbolic parameters with numerical values
-            analytictf = self.analyticTransferFunction.subs(self.paramValues)
-            missing_symbols = analytictf.free_symbols - set(self.paramValues.keys()) - {p}
+            missing_symbols = {self.knownParameters[name] for name in compiled.parameters if name not in self.paramValues}
             if missing_symbols:
                 logging.error(f"Missing numerical values for symbols: {missing_symbols}")
                 raise ValueError("Error: Missing numerical values for symbols:", missing_symbols)
-            
-            # Extract numerator and denominator coefficients
-            numerator, denominator = sympy.fraction(analytictf)
-            num_coeffs = [float(c) for c in numerator.as_poly(p).all_coeffs()]
-            den_coeffs = [float(c) for c in denominator.as_poly(p).all_coeffs()]
+
+            # Evaluate the compiled coefficients, leading zeros (cancelled by the values) are dropped as as_poly would
+            numerator, denominator = compiled.coefficients(self.paramValues)
+            num_coeffs = np.trim_zeros(np.array(numerator, dtype=float), 'f').tolist() or [0.0]
+            den_coeffs = np.trim_zeros(np.array(denominator, dtype=float), 'f').tolist() or [0.0]
+            self.numericalTransferFunctions[(inputNode, outputNode)] = (num_coeffs, den_coeffs)
 
             logging.info("Finished getting numerical transfer function.")
-            return num_coeffs, den_coeffs
+            return list(num_coeffs), list(den_coeffs)
         except Exception as e:
             logging.error(f"Error getting numerical transfer function: {e}")
             raise
 
+    def getApproximateTransferFunction(self, inputNode, outputNode, tolerance=0.05, w=None, budget=1.0):
+        """
+        Get a compact approximation of the transfer function: the terms that are insignificant at the netlist values are dropped
+        as long as the frequency response stays within the tolerance, then the coefficients are simplified within the time budget.
+
+        Args:
+            inputNode (str): The node where the input voltage is applied.
+            outputNode (str): The node where the output voltage is measured.
+            tolerance (float): The relative error bound of the frequency response, e.g. 0.05 for 5 %.
+            w (array-like): Angular frequencies in rad/s where the error is bounded, a grid spanning the poles and zeros if None.
+            budget (float): Time budget in seconds of the simplification.
+
+        Returns:
+            TransferFunctionApproximation: The approximation, with its expression and the achieved error.
+
+        Raises:
+            ValueError: If a component has no numerical value.
+        """
+        # Not through getNumericalTransferFunction: memoized (or restored from the cache), it returns before collecting the values
+        self.initializeParamValues()
+        values = {self.knownParameters[name]: value for name, value in self.paramValues.items() if name in self.knownParameters}
+        return TransferFunctionApproximation(self.getTransferFunction(inputNode, outputNode), self.knownParameters["p"], values, tolerance, w, budget)
+
+    def getCompiledTransferFunction(self, inputNode, outputNode):
+        """
+        Return the transfer function compiled into a NumPy-vectorized callable of (p, component values), compiled once per node pair.
+
+        Args:
+            inputNode (str): The node where the input voltage is applied.
+            outputNode (str): The node where the output voltage is measured.
+
+        Returns:
+            CompiledTransferFunction: The compiled transfer function, the netlist values are used by default.
+        """
+        if (inputNode, outputNode) not in self.compiledTransferFunctions:
+            expression = self.getTransferFunction(inputNode, outputNode)
+            parameters = {name: symbol for name, symbol in self.knownParameters.items() if name != "p"}
+            defaults = {component.name: component.value for component in self.circuit.components if component.value is not None}
+            defaults.update({name: component.value for name, component in self.circuit.getSubcircuitParameters().items() if component.value is not None})
+            self.compiledTransferFunctions[(inputNode, outputNode)] = CompiledTransferFunction(expression, parameters, self.knownParameters["p"], defaults)
+        return self.compiledTransferFunctions[(inputNode, outputNode)]
+
+    def getNumericSystem(self):
+        """
+        Return the numeric MNA matrices (G, C, b) built straight from the component values. Built once, then reused.
+
+        Returns:
+            tuple: A tuple containing the scipy.sparse matrices G and C and the numpy vector b.
+
+        Raises:
+            ValueError: If a component value is missing.
+        """
+        if self.numericSystem is None:
+            self.initializeParamValues()
+            self.numericMNA = MNASystem(self.circuit, None)
+            self.numericSystem = self.numericMNA.toScipy()
+        return self.numericSystem
+
+    def solveNumeric(self, p=0.0):
+        """
+        Solve numerically A(p).x = b for a given value of the Laplace variable.
+
+        Args:
+            p (complex): The value of the Laplace variable, 0 gives the DC operating point.
+
+        Returns:
+            numpy.ndarray: The vector of unknowns ordered as the columns of the MNA system.
+        """
+        G, C, b = self.getNumericSystem()
+        A = G + p * C if p != 0 else G
+        return splu(A.tocsc()).solve(b.astype(A.dtype))
+
+    def getNumericalSolution(self, p=0.0):
+        """
+        Return the numerical value of every node voltage and branch current.
+
+        Args:
+            p (complex): The value of the Laplace variable, 0 gives the DC operating point.
+
+        Returns:
+            dict: A dictionary of key label (e.g. 'v_1', 'i_V1') and value the numerical solution.
+
+        Raises:
+            ZeroDivisionError: If a resistor has a zero value.
+            numpy.linalg.LinAlgError: If the system is singular (e.g. a floating node or two voltage sources in parallel).
+        """
+        try:
+            logging.info(f"Starting to solve the numeric system for p={p}.")
+            x = self.solveNumeric(p)
+            logging.info("Finished solving the numeric system.")
+            return dict(zip(self.numericMNA.unknownLabels(), x.tolist()))
+        except RuntimeError as e: # SuperLU: singular factor
+            logging.error(f"Error solving the numeric system: {e}")
+            raise np.linalg.LinAlgError(str(e))
+        except Exception as e:
+            logging.error(f"Error solving the numeric system: {e}")
+            raise
+
+    def evaluateTransferFunction(self, inputNode, outputNode, p):
+        """
+        Evaluate the transfer function V_outputNode / V_inputNode numerically, without any symbolic computation.
+
+        Args:
+            inputNode (str): The node where the input voltage is applied.
+            outputNode (str): The node where the output voltage is measured.
+            p (complex or array-like): Value(s) of the Laplace variable, e.g. 1j * w.
+
+        Returns:
+            complex or numpy.ndarray: The value(s) of the transfer function.
+
+        Raises:
+            ValueError: If the input or output node is not a node of the circuit.
+        """
+        self.getNumericSystem()
+        for node in (inputNode, outputNode):
+            if self.numericMNA.node(node) is None:
+                raise ValueError(f"Node '{node}' is not a (non-ground) node of the circuit.")
+        inputIndex, outputIndex = self.numericMNA.node(inputNode), self.numericMNA.node(outputNode)
+        G, C, _ = self.numericSystem
+        b = smallSignalExcitation(self) # Unit sources when they are all at zero
+        values = []
+        for pk in np.atleast_1d(p):
+            A = G + pk * C if pk != 0 else G
+            x = splu(A.tocsc()).solve(b.astype(A.dtype))
+            values.append(x[outputIndex] / x[inputIndex])
+        return values[0] if np.ndim(p) == 0 else np.array(values)
+
 
 class Simulator:
     """
@@ -725,15 +2303,94 @@ class Simulator:
         circuit (Circuit): The circuit instance associated with the simulator.
         num (list): The numerator coefficients of the transfer function.
         denom (list): The denominator coefficients of the transfer function.
+        ac (ACAnalysis): Batched AC analysis of the MNA system, used for the frequency response when a solver is given.
+        transient (TransientAnalysis): Transient analysis of the MNA system, built on the first getTransientResponse.
+        stateSpace (StateSpaceModel): State-space realization of the MNA system, built on first use when a solver is given,
+            or its reduced-order model (ReducedOrderModel) of the input and output voltages with a reduction.
     """
-    def __init__(self, circuit, num, denom):
+    def __init__(self, circuit, num=None, denom=None, solver=None, inputNode=None, outputNode=None, reduction=None):
+        """
+        Args:
+            circuit (Circuit): The simulated circuit.
+            num (list): The numerator coefficients of the transfer function.
+            denom (list): The denominator coefficients of the transfer function.
+            solver (Solver): Optional solver with numerical values, the frequency response is then computed on its MNA system.
+            inputNode (str): The input node of the transfer function, required with solver.
+            outputNode (str): The output node of the transfer function, required with solver.
+            reduction (int or ReducedOrderModel): Order of a PRIMA reduced model of the solver's MNA system, or an already
+                reduced (e.g. cached) model of the input and output voltages, used for the step and frequency responses of large networks.
+        """
         self.circuit = circuit  
         self.num, self.denom = num, denom
-        self.sys = lti(self.num, self.denom) # create a scipy linear time invariant system
+        self.sys = lti(self.num, self.denom) if num is not None else None # create a scipy linear time invariant system
+        self.inputNode, self.outputNode = inputNode, outputNode
+        self.solver = solver
+        self.reduction = reduction
+        self.ac = ACAnalysis.fromSolver(solver) if solver is not None and reduction is None else None
+        self.transient = None
+        self.stateSpace = reduction if isinstance(reduction, ReducedOrderModel) else None
+
+    def getStateSpace(self):
+        """
+        Return the state-space realization of the MNA system of the solver, or its reduced-order model, computed once.
+
+        Raises:
+            ValueError: If the simulator has no solver or the circuit has no state-space realization.
+        """
+        if self.stateSpace is None:
+            if self.solver is None:
+                raise ValueError("The state-space model needs a solver with numerical values.")
+            if self.reduction is not None:
+                outputs = [f'v_{self.inputNode}', f'v_{self.outputNode}']
+                self.stateSpace = ReducedOrderModel.fromSolver(self.solver, outputs=outputs, order=self.reduction)
+            else:
+                self.stateSpace = StateSpaceModel.fromSolver(self.solver)
+        return self.stateSpace
+
+    def _inputSource(self, model):
+        """
+        Find the source that sets the input voltage on its own, v_in = gain.u: its step is the step of the transfer function.
+
+        Returns:
+            tuple: A tuple containing the source name and the gain, (None, None) if there is no such source.
+        """
+        row = model.index.get(f'v_{self.inputNode}')
+        if row is None or np.abs(model.C[row]).max(initial=0) > 1e-12 * max(np.abs(model.D[row]).max(initial=0), 1e-300):
+            return None, None
+        driving = np.flatnonzero(np.abs(model.D[row]) > 1e-12 * np.abs(model.D[row]).max(initial=0))
+        if len(driving) != 1:
+            return None, None
+        return model.inputs[driving[0]], model.D[row, driving[0]]
+
+    def getTimeResponse(self, t, u=None, outputs=None):
+        """
+        Get the response of node voltages and branch currents to one or many source signals, on the state-space model.
+
+        Args:
+            t (array-like): Increasing time points in seconds.
+            u (dict or array-like): Source name -> signal sampled on t, or an array of the values of every source, see StateSpaceModel.simulate.
+            outputs (list): Labels of the unknowns to return (e.g. ['v_3', 'i_V1']), all of them if None.
+
+        Returns:
+            tuple: A tuple containing the time array and a dictionary of key label and value the response array.
+        """
+        try:
+            logging.info("Starting to get time response.")
+            result = self.getStateSpace().simulate(t, u, outputs)
+            logging.info("Finished getting time response.")
+            return result
+        except Exception as e:
+            logging.error(f"Error getting time response: {e}")
+            raise
 
-    def getStepResponse(self):
+    def getStepResponse(self, t=None):
         """
         Get the step response of the circuit.
+        With a solver or a reduction, it is computed on the state-space (or reduced-order) model of the MNA system when one source
+        sets the input voltage, otherwise from the transfer function coefficients.
+
+        Args:
+            t (array-like): Optional time points in seconds, a default grid is used if None.
 
         Returns:
             tuple: A tuple containing the time array, input array, and output array of the step response.
@@ -743,7 +2400,21 @@ class Simulator:
         """
         try:
             logging.info("Starting to get step response.")
-            t, y = step(self.sys)
+            source = None
+            if (self.solver is not None or self.reduction is not None) and self.inputNode is not None:
+                try:
+                    model = self.getStateSpace()
+                    source, gain = self._inputSource(model)
+                except ValueError as e:
+                    if self.sys is None:
+                        raise
+                    logging.warning(f"Step response from the transfer function coefficients: {e}")
+            if source is not None:
+                output = f'v_{self.outputNode}'
+                t, y = model.getStepResponse(source, t, [output], amplitude=1 / gain)
+                y = y[output]
+            else:
+                t, y = step(self.sys, T=t)
             x = np.ones(len(t))
             # Insert t=0, y=0 and x=0 to have plotting beginning at zero
             t = np.insert(t, 0, 0)
@@ -755,9 +2426,67 @@ class Simulator:
             logging.error(f"Error getting step response: {e}")
             raise
 
-    def getFrequencyResponse(self):
+    def getTransientResponse(self, tStop, step, waveforms=None, outputs=None, method='trapezoidal'):
+        """
+        Get the waveforms of the node voltages and branch currents of the whole circuit, integrated on its MNA system.
+
+        Args:
+            tStop (float): The end time in seconds.
+            step (float): The fixed time step in seconds.
+            waveforms (dict): Source name -> waveform (analysis.Step, Pulse, Sine, PWL, any vectorized function of t, or constant).
+            outputs (list): Labels of the unknowns to return (e.g. ['v_3', 'i_V1']), all of them if None.
+            method (str): 'trapezoidal' or 'euler'.
+
+        Returns:
+            tuple: A tuple containing the time array and a dictionary of key label and value the waveform array.
+
+        Raises:
+            ValueError: If the simulator has no solver, or the arguments are not valid.
+        """
+        try:
+            logging.info("Starting to get transient response.")
+            if self.solver is None:
+                raise ValueError("The transient response needs a solver with numerical values.")
+            if self.transient is None or self.transient.method != method:
+                self.transient = TransientAnalysis.fromSolver(self.solver, method=method)
+            t, waveforms = self.transient.run(tStop, step, waveforms, outputs)
+            logging.info("Finished getting transient response.")
+            return t, waveforms
+        except Exception as e:
+            logging.error(f"Error getting transient response: {e}")
+            raise
+
+    def getPolesZeros(self):
+        """
+        Get the poles and zeros of the transfer function with the natural frequency, damping ratio and Q of every pole (pair).
+        With a solver, they are the generalized eigenvalues of the MNA pencil instead of the roots of the coefficients.
+
+        Returns:
+            tuple: A tuple containing the poles, the zeros (complex arrays), the gain and the pole descriptions, see PoleZeroAnalysis.describePoles.
+
+        Raises:
+            Exception: If an error occurs during getting the poles and zeros.
+        """
+        try:
+            logging.info("Starting to get poles and zeros.")
+            if self.solver is not None:
+                poles, zeros, gain = PoleZeroAnalysis.fromSolver(self.solver).getPolesZeros(self.inputNode, self.outputNode)
+            else:
+                zeros, poles, gain = np.roots(self.num), np.roots(self.denom), self.num[0] / self.denom[0]
+            logging.info("Finished getting poles and zeros.")
+            return poles, zeros, gain, PoleZeroAnalysis.describePoles(poles)
+        except Exception as e:
+            logging.error(f"Error getting poles and zeros: {e}")
+            raise
+
+    def getFrequencyResponse(self, w=None):
         """
         Get the frequency response of the circuit.
+        With a solver, every frequency is solved on the MNA system in one batch instead of evaluating the polynomial coefficients,
+        or on its reduced-order model with a reduction.
+
+        Args:
+            w (array-like): Optional angular frequencies in rad/s, a default grid is used if None.
 
         Returns:
             tuple: A tuple containing the frequency array, magnitude array, and phase array of the frequency response.
@@ -767,7 +2496,12 @@ class Simulator:
         """
         try:
             logging.info("Starting to get frequency response.")
-            w, mag, phase = bode(self.sys)
+            if self.reduction is not None:
+                w, mag, phase = self.getStateSpace().getTransferFunctionResponse(self.inputNode, self.outputNode, w)
+            elif self.ac is not None:
+                w, mag, phase = self.ac.getTransferFunctionResponse(self.inputNode, self.outputNode, w)
+            else:
+                w, mag, phase = bode(self.sys, w=w)
             logging.info("Finished getting frequency response.")
             return w, mag, phase
         except Exception as e:
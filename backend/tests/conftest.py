@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# The backend modules are imported as top-level modules (solver, analysis, cache...), as in the application
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    from app import create_app
+    monkeypatch.setenv('SOLVER_CACHE_PATH', str(tmp_path / 'solver_cache.db')) # Read by the spawned solve workers
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'circuits.db'}",
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'SOLVE_WORKERS': 1,
+        'SOLVE_TIMEOUT': 60,
+    })
+    yield app
+    app.extensions['solve_executor'].shutdown()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,176 @@
+import numpy as np
+import pytest
+
+from analysis import (ACAnalysis, PoleZeroAnalysis, ReducedOrderModel, SensitivityAnalysis, StateSpaceModel, TuningSession,
+                      smallSignalExcitation)
+from solver import Circuit, Solver
+
+RC = "V1 1 0 {}\nR1 1 2 1k\nC1 2 0 1u"
+
+
+def numericSolver(netlist):
+    return Solver(Circuit(netlist), mode='numeric')
+
+
+@pytest.mark.parametrize("value", ['0', '1', '5'])
+def testBodeDoesNotDependOnTheSourceValue(value):
+    w, mag, phase = ACAnalysis.fromSolver(numericSolver(RC.format(value))).getTransferFunctionResponse('1', '2', [1e2, 1e3, 1e4])
+    H = 1 / (1 + 1j * w * 1e-3)
+    assert np.allclose(mag, 20 * np.log10(np.abs(H)))
+    assert np.allclose(phase, np.rad2deg(np.angle(H)))
+
+
+def testZeroSourceTakesUnitValue():
+    solver = numericSolver(RC.format(0))
+    b = smallSignalExcitation(solver)
+    assert np.count_nonzero(b) == 1 and b.sum() == 1
+    assert not solver.getNumericSystem()[2].any() # The netlist system keeps its zero source
+
+
+def testPolesZerosOfAZeroSource():
+    poles, zeros, gain = PoleZeroAnalysis.fromSolver(numericSolver(RC.format(0))).getPolesZeros('1', '2')
+    assert np.allclose(poles, [-1e3]) and zeros.size == 0
+    assert np.isclose(gain, 1e3)
+
+
+def testOtherSmallSignalPathsOfAZeroSource():
+    solver = numericSolver(RC.format(0))
+    assert np.isclose(solver.evaluateTransferFunction('1', '2', 1j * 1e3), 0.5 - 0.5j)
+    _, mag, _ = ReducedOrderModel.fromSolver(solver, order=2).getTransferFunctionResponse('1', '2', [1e3])
+    assert np.allclose(mag, -10 * np.log10(2))
+    assert np.all(np.isfinite(SensitivityAnalysis.fromSolver(solver).solve([1e3])))
+
+
+def testUndrivenInput():
+    # The input source is at zero while another source drives the circuit: V2 / V1 is undefined
+    analysis = ACAnalysis.fromSolver(numericSolver("V1 1 0 0\nR1 1 2 1k\nC1 2 0 1u\nI1 0 2 1m"))
+    with pytest.raises(ValueError, match="not driven"):
+        analysis.getTransferFunctionResponse('1', '2', [1e3])
+
+
+LADDER = "V1 1 0 {V1}\nR1 1 2 {R1}\nC1 2 0 {C1}\nL1 2 3 {L1}\nR2 3 0 {R2}\nC2 3 0 {C2}"
+LADDER_VALUES = {"V1": 2, "R1": 1e3, "C1": 1e-6, "L1": 1e-3, "R2": 50, "C2": 1e-8}
+
+
+def freshSolutions(values, w):
+    solver = numericSolver(LADDER.format(**values))
+    G, C, b = solver.getNumericSystem()
+    return solver.getNumericalSolution(), ACAnalysis(G, C, b, solver.numericMNA.unknownLabels()).solve(w)
+
+
+@pytest.mark.parametrize("changes", [{"R1": 2.2e3}, {"C2": 4.7e-8}, {"V1": 5}, {"R1": 470, "L1": 1e-2, "V1": -1},
+                                     {"R1": 1e4, "C1": 1e-7, "L1": 1e-4, "R2": 75, "C2": 1e-9}])
+def testTuningSessionMatchesAFreshSolve(changes):
+    session = TuningSession.fromSolver(numericSolver(LADDER.format(**LADDER_VALUES)), w=np.logspace(2, 6, 50), maxRank=2)
+    for name, value in changes.items():
+        session.setValue(name, value)
+    dc, ac = freshSolutions({**LADDER_VALUES, **changes}, session.w)
+    assert session.getSolution() == pytest.approx(dc, rel=1e-9, abs=1e-12)
+    assert np.allclose(session.solve(session.w), ac, rtol=1e-9, atol=1e-12)
+    # Off the session grid: a direct solve of the current system
+    assert np.allclose(session.solve([1e3, 3e3]), freshSolutions({**LADDER_VALUES, **changes}, [1e3, 3e3])[1], rtol=1e-9)
+
+
+def testTuningSessionKeepsOnlyTheModifiedColumns():
+    session = TuningSession.fromSolver(numericSolver(LADDER.format(**LADDER_VALUES)), w=np.logspace(2, 6, 50), maxRank=2)
+    assert session.columns == {'dc': {}, 'ac': {}}
+    session.setValue("R1", 2e3)
+    session.solve(session.w)
+    assert set(session.columns['ac']) == {"R1"} and not session.columns['dc']
+    session.setValue("C1", 2e-6)
+    session.setValue("L1", 2e-3) # Third modified component above maxRank: the system is refactored
+    assert session.columns == {'dc': {}, 'ac': {}} and session.baseValues == session.values
+    session.setValue("R1", 1e3) # Back to the nominal value, a change from the new base
+    _, ac = freshSolutions({**LADDER_VALUES, "C1": 2e-6, "L1": 2e-3}, session.w)
+    assert np.allclose(session.solve(session.w), ac, rtol=1e-9, atol=1e-12)
+
+
+POLE_ZERO_CIRCUITS = {
+    "rlcSeries": ("V1 1 0 1\nR1 1 2 1k\nL1 2 3 10m\nC1 3 0 1u", '1', '3'),
+    "bridgedT": ("V1 1 0 1\nR1 1 2 1k\nR2 2 3 1k\nC1 2 0 10n\nC2 1 3 100n\nR3 3 0 10k", '1', '3'),
+    # Twin-T notch at 1/(2*pi*R*C): a pole and a zero cancel at -1/(R*C)
+    "twinT": ("V1 1 0 1\nR1 1 2 10k\nR2 2 3 10k\nC3 2 0 2n\nC1 1 4 1n\nC2 4 3 1n\nR3 4 0 5k\nR4 3 0 1meg", '1', '3'),
+}
+
+
+def withoutCommonRoots(numerator, denominator):
+    zeros, poles = list(np.roots(numerator)), []
+    for pole in np.roots(denominator):
+        match = [k for k, zero in enumerate(zeros) if abs(zero - pole) <= 1e-6 * max(abs(pole), 1)]
+        if match:
+            zeros.pop(match[0])
+        else:
+            poles.append(pole)
+    return np.sort_complex(np.array(zeros, dtype=complex)), np.sort_complex(np.array(poles, dtype=complex))
+
+
+@pytest.mark.parametrize("name", POLE_ZERO_CIRCUITS)
+def testPolesZerosMatchTheSymbolicTransferFunction(name):
+    netlist, inputNode, outputNode = POLE_ZERO_CIRCUITS[name]
+    numerator, denominator = Solver(Circuit(netlist)).getNumericalTransferFunction(inputNode, outputNode)
+    expectedZeros, expectedPoles = withoutCommonRoots(numerator, denominator)
+    poles, zeros, gain = PoleZeroAnalysis.fromSolver(numericSolver(netlist)).getPolesZeros(inputNode, outputNode)
+    scale = max(np.abs(expectedPoles).max(), 1)
+    assert np.allclose(np.sort_complex(poles), expectedPoles, rtol=1e-6, atol=1e-9 * scale)
+    assert np.allclose(np.sort_complex(zeros), expectedZeros, rtol=1e-6, atol=1e-9 * scale)
+    # The factored form evaluates to the direct solve
+    solver = numericSolver(netlist)
+    for s in [1j * 1e3, 1j * 3e4, -2e3 + 5e4j]:
+        assert gain * np.prod(s - zeros) / np.prod(s - poles) == pytest.approx(solver.evaluateTransferFunction(inputNode, outputNode, s), rel=1e-6)
+
+
+def testNotchZerosOnTheImaginaryAxis():
+    poles, zeros, _ = PoleZeroAnalysis.fromSolver(numericSolver(POLE_ZERO_CIRCUITS["twinT"][0])).getPolesZeros('1', '3')
+    assert np.allclose(np.sort_complex(zeros), [-1e5j, 1e5j], rtol=1e-6, atol=1e-3)
+    assert len(poles) == 2 and np.all(poles.real < 0)
+
+
+def testDescribeAnUnderdampedPair():
+    # R = 20, L = 10m, C = 1u: wn = 1/sqrt(LC) = 1e4 rad/s, Q = sqrt(L/C)/R = 5
+    analysis = PoleZeroAnalysis.fromSolver(numericSolver("V1 1 0 1\nR1 1 2 20\nL1 2 3 10m\nC1 3 0 1u"))
+    poles, _, gain = analysis.getPolesZeros('1', '3')
+    (pair,) = PoleZeroAnalysis.describePoles(poles)
+    assert pair["pair"] and pair["naturalFrequency"] == pytest.approx(1e4) and pair["Q"] == pytest.approx(5)
+    assert gain == pytest.approx(1e8)
+    assert np.allclose(np.sort_complex(analysis.getNaturalFrequencies()), np.sort_complex(poles))
+    assert analysis.getStability() == 'stable'
+
+
+def ladder(sections, inductors=False):
+    lines = ["V1 1 0 1"]
+    for k in range(1, sections + 1):
+        lines += [f"R{k} {k} m{k} 10", f"L{k} m{k} {k + 1} 1u"] if inductors else [f"R{k} {k} {k + 1} 100"]
+        lines.append(f"C{k} {k + 1} 0 1n")
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("inductors", [False, True])
+def testReducedModelMatchesTheDirectSolve(inductors):
+    solver = numericSolver(ladder(200, inductors))
+    w = np.logspace(1, 3.5, 30) # Up to a few dominant poles: the band the moments around DC are matched in
+    _, mag, phase = ACAnalysis.fromSolver(solver).getTransferFunctionResponse('1', '201', w)
+    errors = []
+    for order in (5, 10):
+        model = ReducedOrderModel.fromSolver(solver, outputs=['v_1', 'v_201'], order=order)
+        assert model.passive and model.order <= order and np.all(np.linalg.eigvals(model.A).real < 0)
+        _, reducedMag, reducedPhase = model.getTransferFunctionResponse('1', '201', w)
+        errors.append(max(np.abs(reducedMag - mag).max(), np.abs(reducedPhase - phase).max()))
+    assert errors[1] < 1e-6 and errors[1] < errors[0]
+
+
+def testReducedStepResponse():
+    solver = numericSolver(ladder(60))
+    t = np.linspace(0, 2e-3, 200)
+    _, full = StateSpaceModel.fromSolver(solver).getStepResponse('V1', t, outputs=['v_61'])
+    _, reduced = ReducedOrderModel.fromSolver(solver, outputs=['v_61'], order=12).getStepResponse('V1', t, outputs=['v_61'])
+    assert np.allclose(reduced['v_61'], full['v_61'], atol=1e-4)
+    assert reduced['v_61'][-1] == pytest.approx(1, abs=1e-3)
+
+
+def testReductionOfASmallCircuitIsExact():
+    # The Krylov subspace is invariant before the order is reached
+    solver = numericSolver("V1 1 0 1\nR1 1 2 1k\nL1 2 3 10m\nC1 3 0 1u\nR2 3 0 5k")
+    model = ReducedOrderModel.fromSolver(solver, order=30)
+    assert model.order <= 2
+    w = np.logspace(2, 6, 20)
+    assert np.allclose(model.getTransferFunctionResponse('1', '3', w)[1], ACAnalysis.fromSolver(solver).getTransferFunctionResponse('1', '3', w)[1], atol=1e-9)
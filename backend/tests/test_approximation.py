@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from cache import SolverCache
+from solver import Circuit, Solver
+
+NETLIST = "V1 1 0 1\nR1 1 2 1k\nC1 2 0 1u\nR2 2 3 100k\nC2 3 0 10p"
+
+
+def exactResponse(solver, w):
+    num, den = solver.getNumericalTransferFunction('1', '3')
+    return np.polyval(num, 1j * w) / np.polyval(den, 1j * w)
+
+
+def approximateResponse(solver, approximation, w):
+    values = {solver.knownParameters[name]: value for name, value in solver.paramValues.items() if name in solver.knownParameters}
+    expression = approximation.expression.subs(values)
+    p = solver.knownParameters["p"]
+    return np.array([complex(expression.subs(p, 1j * x)) for x in w])
+
+
+def testDropsInsignificantTermsWithinTolerance():
+    solver = Solver(Circuit(NETLIST))
+    approximation = solver.getApproximateTransferFunction('1', '3', tolerance=0.05)
+    assert approximation.terms < approximation.exactTerms
+    assert approximation.error <= 0.05
+    w = approximation.w[::20]
+    measured = np.max(np.abs(approximateResponse(solver, approximation, w) / exactResponse(solver, w) - 1))
+    assert measured <= approximation.error * (1 + 1e-6) + 1e-12
+
+
+def testZeroToleranceKeepsTheExactFunction():
+    approximation = Solver(Circuit(NETLIST)).getApproximateTransferFunction('1', '3', tolerance=0.0)
+    assert approximation.terms == approximation.exactTerms
+    assert approximation.error == 0.0
+
+
+def testSecondCallOnTheSameSolver():
+    solver = Solver(Circuit(NETLIST))
+    solver.getNumericalTransferFunction('1', '3') # Memoized coefficients
+    first = solver.getApproximateTransferFunction('1', '3', tolerance=0.05)
+    second = solver.getApproximateTransferFunction('1', '3', tolerance=0.05)
+    assert first.expression == second.expression
+
+
+def testSolverRestoredFromTheCache():
+    cache = SolverCache(path=None)
+    solver = cache.getSolver(NETLIST)
+    solver.getNumericalTransferFunction('1', '3')
+    expected = solver.getApproximateTransferFunction('1', '3', tolerance=0.05)
+    cache.save(NETLIST, solver)
+    restored = cache.getSolver(NETLIST)
+    assert ('1', '3') in restored.numericalTransferFunctions
+    assert restored.getApproximateTransferFunction('1', '3', tolerance=0.05).expression == expected.expression
+
+
+def testSolveNetlistTwice(tmp_path, monkeypatch):
+    import jobs
+    monkeypatch.setattr(jobs, "_cache", SolverCache(path=str(tmp_path / "cache.db")))
+    first = jobs.solveNetlist(NETLIST, '1', '3', approximation=0.05)
+    second = jobs.solveNetlist(NETLIST, '1', '3', approximation=0.05)
+    assert first["approximateTransferFunction"] == second["approximateTransferFunction"]
+    assert second["approximationError"] <= 0.05
+
+
+def testMissingValue():
+    solver = Solver(Circuit("V1 1 0 1\nR1 1 2 SYMBOLIC\nC1 2 0 1u"))
+    with pytest.raises(ValueError):
+        solver.getApproximateTransferFunction('1', '2')
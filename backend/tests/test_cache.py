@@ -0,0 +1,90 @@
+import pytest
+
+from cache import SolverCache
+from canonical import CanonicalNetlist
+from solver import Circuit, Parser, Solver
+
+NETLIST = "V1 1 0 1\nR1 1 2 1k\nC1 2 0 100n\nL1 2 3 2u\nR2 3 0 50"
+
+
+def fingerprint(netlist):
+    return CanonicalNetlist(netlist).fingerprint
+
+
+@pytest.mark.parametrize("first, second", [("100n", "0.1u"), ("2u", "2000n"), ("1k", "1000"), ("1meg", "1000k"), ("4.7k", "4700")])
+def testEquivalentSpellingsShareTheValueKey(first, second):
+    (a,), _ = Parser.parse_netlist(f"R1 1 0 {first}")
+    (b,), _ = Parser.parse_netlist(f"R1 1 0 {second}")
+    assert CanonicalNetlist._valueKey(a) == CanonicalNetlist._valueKey(b)
+
+
+def testDifferentValuesHaveDifferentKeys():
+    assert fingerprint("V1 1 0 1\nR1 1 0 1k") != fingerprint("V1 1 0 1\nR1 1 0 1.001k")
+
+
+def testRenamingNodesAndComponents():
+    renamed = "Vin in 0 1\nRa in mid 1k\nCx mid 0 100n\nLy mid out 2u\nRload out 0 50"
+    assert fingerprint(renamed) == fingerprint(NETLIST)
+
+
+def testReorderingLinesAndTerminals():
+    reordered = "R2 0 3 50\nL1 2 3 2u\nC1 0 2 100n\nR1 2 1 1k\nV1 1 0 1"
+    assert fingerprint(reordered) == fingerprint(NETLIST)
+
+
+def testUnitSpelling():
+    spelled = "V1 1 0 1\nR1 1 2 1000\nC1 2 0 0.1u\nL1 2 3 2000n\nR2 3 0 0.05k"
+    assert fingerprint(spelled) == fingerprint(NETLIST)
+
+
+def testDifferentTopology():
+    assert fingerprint("V1 1 0 1\nR1 1 2 1k\nC1 2 0 100n\nL1 2 3 2u\nR2 3 2 50") != fingerprint(NETLIST)
+
+
+def testCacheHitUnderRenamingAndUnitSpelling():
+    cache = SolverCache(path=None)
+    cache.getSolver(NETLIST)
+    equivalent = "Vin in 0 1\nLy mid out 2000n\nRa mid in 1000\nCx mid 0 0.1u\nRload out 0 0.05k"
+    key = cache.key(CanonicalNetlist(equivalent).netlist, mode='symbolic', lazy=False)
+    assert cache.get(key) is not None
+    solver = cache.getSolver(equivalent)
+    assert {'v_OUT', 'v_MID', 'i_VIN'} <= set(map(str, solver.solutions))
+
+
+def testReversedInductorIsAnotherCircuit():
+    # The branch current of an inductor is oriented: reversing it negates i_L, the two netlists cannot share an entry
+    forward, reversed = "V1 1 0 1\nR1 1 2 1k\nL1 2 0 1m", "V1 1 0 1\nR1 1 2 1k\nL1 0 2 1m"
+    assert fingerprint(forward) != fingerprint(reversed)
+    cache = SolverCache(path=None)
+    cache.getSolver(forward)
+    cached = {str(unknown): solution for unknown, solution in cache.getSolver(reversed).solutions.items()}
+    fresh = {str(unknown): solution for unknown, solution in Solver(Circuit(reversed)).solutions.items()}
+    assert (cached['i_L1'] - fresh['i_L1']).equals(0)
+
+
+def testSwappedResistorAndCapacitorTerminals():
+    assert fingerprint("V1 1 0 1\nR1 1 2 1k\nC1 2 0 1u") == fingerprint("V1 1 0 1\nR1 2 1 1k\nC1 0 2 1u")
+
+
+def testCanonicalNetlistIsAFixedPoint():
+    canonical = CanonicalNetlist("Vin in 0 1\nRa in mid 1k\nCx mid 0 100n\nLy mid out 2u\nRload out 0 50")
+    assert CanonicalNetlist(canonical.netlist).netlist == canonical.netlist
+
+
+def testMappingBackToTheUserNames():
+    canonical = CanonicalNetlist("Vin in 0 1\nRa in mid 1k\nCx mid 0 100n\nLy mid out 2u\nRload out 0 50")
+    assert sorted(canonical.componentNames.values()) == ['CX', 'LY', 'RA', 'RLOAD', 'VIN']
+    assert sorted(canonical.nodeNames.values()) == ['0', 'IN', 'MID', 'OUT']
+    for line in canonical.netlist.splitlines():
+        name, *nodes = line.split()[:-1]
+        user = canonical.componentNames[name]
+        assert user[0] == name[0]
+        assert canonical.nodeNames[nodes[0]] in {'0', 'IN', 'MID', 'OUT'}
+
+
+def testSymmetricCircuitUnderPermutation():
+    # Identical branches in parallel and in series: many automorphisms, one canonical form
+    lines = ["V1 1 0 1"] + [f"R{i} 1 {i + 1} 1k\nC{i} {i + 1} 0 1u" for i in range(1, 6)]
+    permuted = ["V1 1 0 1"] + [f"R{i} 1 n{7 - i} 1k\nC{i} 0 n{7 - i} 1u" for i in range(5, 0, -1)]
+    assert fingerprint("\n".join(lines)) == fingerprint("\n".join(permuted))
+    assert fingerprint("\n".join(lines)) != fingerprint("\n".join(lines[:-1] + ["R5 1 6 1k\nC5 6 0 2u"]))
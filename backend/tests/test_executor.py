@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+from executor import SolveExecutor, SolveMemoryError, SolveTimeoutError
+
+MAX_MEMORY = 256 * 2**20
+
+
+def add(a, b):
+    return a + b
+
+
+def sleep(seconds):
+    time.sleep(seconds)
+
+
+def allocate(size, seconds=0):
+    data = b"\x01" * size # Written pages: resident memory
+    time.sleep(seconds)
+    return len(data)
+
+
+def addressSpaceLimit():
+    import resource
+    return resource.getrlimit(resource.RLIMIT_AS)[0]
+
+
+def chatter():
+    # Streaming job that never ends and always has an event in the pipe
+    while True:
+        yield "event"
+
+
+@pytest.fixture
+def executor():
+    executor = SolveExecutor(1, timeout=1, preload=[], pollInterval=0.01)
+    yield executor
+    executor.shutdown()
+
+
+def testResult(executor):
+    assert executor.run(add, 2, 3) == 5
+
+
+def testTimeoutReplacesTheWorker(executor):
+    with pytest.raises(SolveTimeoutError):
+        executor.run(sleep, 10)
+    assert executor.run(add, 1, 1) == 2
+
+
+def testTimeoutOfAStreamThatKeepsSendingEvents(executor):
+    # The deadline is checked on every event, not only when the pipe is empty
+    start, events = time.monotonic(), 0
+    with pytest.raises(SolveTimeoutError):
+        for _ in executor.stream(chatter):
+            events += 1
+    assert events > 0 and time.monotonic() - start < 10
+    assert executor.run(add, 1, 1) == 2
+
+
+@pytest.fixture
+def cappedExecutor():
+    executor = SolveExecutor(1, timeout=30, maxMemory=MAX_MEMORY, preload=[], pollInterval=0.01)
+    yield executor
+    executor.shutdown()
+
+
+def testWorkerAddressSpaceIsLimited(cappedExecutor):
+    pytest.importorskip("resource")
+    limit = cappedExecutor.run(addressSpaceLimit)
+    assert MAX_MEMORY < limit < MAX_MEMORY + 2**30 # The cap on top of what the interpreter already maps
+
+
+def testAllocationAboveTheAddressSpaceLimit(cappedExecutor):
+    # RLIMIT_AS: the allocation fails at once in the worker, long before the timeout
+    start = time.monotonic()
+    with pytest.raises(SolveMemoryError):
+        cappedExecutor.run(allocate, 2 * MAX_MEMORY, 30)
+    assert time.monotonic() - start < 10
+    assert cappedExecutor.run(allocate, 2**20) == 2**20
+
+
+def testResidentMemoryAboveTheCap(cappedExecutor):
+    # Within the address space limit (on top of the interpreter), above the resident memory cap: killed by the polling
+    start = time.monotonic()
+    with pytest.raises(SolveMemoryError):
+        cappedExecutor.run(allocate, MAX_MEMORY - 8 * 2**20, 30)
+    assert time.monotonic() - start < 10
+    assert cappedExecutor.run(add, 1, 1) == 2
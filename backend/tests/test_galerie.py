@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app import db
+from app.models import Circuit
+
+
+@pytest.fixture
+def circuits(app):
+    with app.app_context():
+        for i in range(25):
+            db.session.add(Circuit(nom=f"Filtre {i:02d}", description=f"Description {i}", image=f"Filtre {i:02d}.png",
+                                   auteur="Alice" if i % 2 else "Bob", date=date(2024, 1, 1) + timedelta(days=i % 5),
+                                   netlist=f"V1 1 0 1\nR1 1 2 {i + 1}k\nC1 2 0 1u"))
+        db.session.commit()
+
+
+def walk(client, url):
+    # Follow the cursors until the last page
+    pages, cursor = [], None
+    while True:
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+        assert response.status_code == 200
+        pages.append(response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            return pages
+        assert f"cursor={cursor}" in response.headers['Link']
+
+
+def testPagesCoverEveryCircuitOnce(client, circuits):
+    pages = walk(client, "/galerie/?limit=10")
+    assert [len(page) for page in pages] == [10, 10, 5]
+    ids = [circuit["id"] for page in pages for circuit in page]
+    assert ids == sorted(ids) and len(set(ids)) == 25
+
+
+def testSortByDateDescendingWithTies(client, circuits):
+    rows = [circuit for page in walk(client, "/galerie/?limit=7&sort=date&order=desc") for circuit in page]
+    assert len(rows) == 25
+    assert [(row["date"], row["id"]) for row in rows] == sorted(((row["date"], row["id"]) for row in rows), reverse=True)
+
+
+def testDefaultFieldsLeaveOutTheLongTexts(client, circuits):
+    row = client.get("/galerie/?limit=1").get_json()[0]
+    assert set(row) == {"id", "nom", "image", "auteur", "date"}
+
+
+def testFieldsProjection(client, circuits):
+    rows = client.get("/galerie/?limit=3&fields=id,netlist").get_json()
+    assert all(set(row) == {"id", "netlist"} for row in rows)
+    assert rows[0]["netlist"].startswith("V1 1 0 1")
+
+
+def testFilters(client, circuits):
+    rows = client.get("/galerie/?limit=200&auteur=Alice&dateMin=2024-01-02&dateMax=2024-01-03&fields=auteur,date").get_json()
+    assert rows and all(row["auteur"] == "Alice" and "2024-01-02" <= row["date"] <= "2024-01-03" for row in rows)
+    assert len(client.get("/galerie/?nom=filtre 1&limit=200").get_json()) == 10
+    # Prefix match, served by the lower(nom) index
+    assert client.get("/galerie/?nom=ltre&limit=200").get_json() == []
+
+
+def testCircuitDetails(client, circuits):
+    row = client.get("/galerie/?limit=1").get_json()[0]
+    details = client.get(f"/galerie/{row['id']}?fields=description,netlist").get_json()
+    assert details == {"description": "Description 0", "netlist": "V1 1 0 1\nR1 1 2 1k\nC1 2 0 1u"}
+    assert set(client.get(f"/galerie/{row['id']}").get_json()) == {"id", "nom", "description", "image", "auteur", "date", "netlist"}
+    assert client.get("/galerie/9999").status_code == 404
+    assert client.get(f"/galerie/{row['id']}?fields=mot_de_passe").status_code == 400
+
+
+def testNoCursorOnTheLastPage(client, circuits):
+    response = client.get("/galerie/?limit=200")
+    assert len(response.get_json()) == 25
+    assert 'X-Next-Cursor' not in response.headers
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=201", "limit=abc", "fields=id,mot_de_passe", "sort=image", "order=up",
+                                   "dateMin=hier", "cursor=invalide"])
+def testInvalidParameters(client, circuits, query):
+    response = client.get(f"/galerie/?{query}")
+    assert response.status_code == 400
+    assert "message" in response.get_json()
+
+
+def testCursorOfAnotherSort(client, circuits):
+    cursor = client.get("/galerie/?limit=5&sort=nom").headers['X-Next-Cursor']
+    response = client.get(f"/galerie/?limit=5&sort=date&cursor={cursor}")
+    assert response.status_code == 400
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from nonlinear import NonlinearDCSolver
+from solver import Circuit, Solver, Diode, BJT, THERMAL_VOLTAGE
+
+
+def diodeCurrent(v, saturation=Diode.SATURATION_CURRENT):
+    return saturation * np.expm1(v / (Diode.EMISSION_COEFFICIENT * THERMAL_VOLTAGE))
+
+
+def testForwardDiode():
+    solution = NonlinearDCSolver(Circuit("V1 1 0 5\nR1 1 2 1k\nD1 2 0")).solve()
+    vd = solution['v_2']
+    assert 0.6 < vd < 0.8
+    assert np.isclose((5 - vd) / 1e3, diodeCurrent(vd), rtol=1e-6)
+    assert np.isclose(-solution['i_V1'], (5 - vd) / 1e3, rtol=1e-9)
+
+
+def testReverseDiode():
+    solution = NonlinearDCSolver(Circuit("V1 1 0 5\nR1 1 2 1k\nD1 0 2")).solve()
+    # Only the saturation current (and gmin) flows: the whole source voltage is across the diode
+    assert np.isclose(solution['v_2'], 5, atol=1e-6)
+
+
+def testDiodeSaturationCurrentFromTheNetlist():
+    solution = NonlinearDCSolver(Circuit("V1 1 0 5\nR1 1 2 1k\nD1 2 0 1e-9")).solve()
+    vd = solution['v_2']
+    assert np.isclose((5 - vd) / 1e3, diodeCurrent(vd, 1e-9), rtol=1e-6)
+
+
+@pytest.mark.parametrize("polarity, sign", [('NPN', 1), ('PNP', -1)])
+def testBJTBiasPoint(polarity, sign):
+    # Common emitter with base and emitter resistors, in the forward active region
+    netlist = f"V1 1 0 {sign * 10}\nRB 1 2 470k\nRC 1 3 2k\nRE 4 0 500\nQ1 3 2 4 {polarity}"
+    solver = NonlinearDCSolver(Circuit(netlist))
+    solution = solver.solve()
+    vcc, vb, vc, ve = (solution[f'v_{node}'] for node in ('1', '2', '3', '4'))
+    ib, ic, ie = (vcc - vb) / 470e3, (vcc - vc) / 2e3, ve / 500
+    assert np.isclose(ie, ic + ib, rtol=1e-6) # The transistor currents balance
+    assert np.isclose(ic / ib, BJT.FORWARD_GAIN, rtol=1e-3)
+    assert 0.5 < sign * (vb - ve) < 0.8 and sign * (vc - ve) > 0.3 # Forward active, not saturated
+    assert solver.strategy in ('newton', 'gmin', 'source')
+
+
+def testSaturatedBJT():
+    # A small collector resistor would need more current than the base can drive: saturated, VCE ~ 0.1 V
+    solution = NonlinearDCSolver(Circuit("V1 1 0 5\nRB 1 2 10k\nRC 1 3 10k\nQ1 3 2 0 NPN")).solve()
+    assert 0 < solution['v_3'] < 0.3
+
+
+def testLinearSolverRejectsNonlinearDevices():
+    with pytest.raises(ValueError, match="NonlinearDCSolver"):
+        Solver(Circuit("V1 1 0 5\nR1 1 2 1k\nD1 2 0"))
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+NETLIST = "V1 1 0 1\nR1 1 2 1k\nC1 2 0 1u\nR2 2 3 100k\nC2 3 0 10p"
+
+
+def testSolveSymbolic(client):
+    response = client.post("/solve/", json={"netlist": "V1 1 0 1\nR1 1 2 1k\nC1 2 0 1u", "inputNode": "1", "outputNode": "2"})
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result["transferFunction"] == "\\frac{1}{C_{1} R_{1} p + 1}"
+    assert result["denominator"] == [0.001, 1.0]
+
+
+def testSolveNumeric(client):
+    response = client.post("/solve/", json={"netlist": "V1 1 0 2\nR1 1 2 1k\nR2 2 0 3k", "mode": "numeric"})
+    assert response.status_code == 200
+    assert response.get_json()["solutions"]["v_2"] == pytest.approx(1.5)
+
+
+def testApproximationTwice(client):
+    # The second request is served from the solver cache of the worker
+    request = {"netlist": NETLIST, "inputNode": "1", "outputNode": "3", "approximation": 0.05}
+    first, second = client.post("/solve/", json=request), client.post("/solve/", json=request)
+    assert first.status_code == second.status_code == 200
+    assert first.get_json()["approximateTransferFunction"] == second.get_json()["approximateTransferFunction"]
+    assert second.get_json()["approximationError"] <= 0.05
+
+
+@pytest.mark.parametrize("body, message", [({"inputNode": "1"}, "Données manquantes."), ({"netlist": "R1 1"}, "Circuit invalide")])
+def testSolveErrors(client, body, message):
+    response = client.post("/solve/", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["message"].startswith(message)
+
+
+@pytest.mark.parametrize("netlist, mode", [("V1 1 0 1\nR1 1 2 0\nR2 2 0 1k", "numeric"), ("V1 1 0 1\nV2 1 0 2", "numeric"),
+                                           ("V1 1 0 1\nR1 2 3 1k", "numeric"), ("V1 1 0 1\nV2 1 0 2", "symbolic")])
+def testDegenerateCircuit(client, netlist, mode):
+    # Zero-valued resistor, voltage sources in parallel, floating nodes: a JSON error, not an HTML 500
+    response = client.post("/solve/", json={"netlist": netlist, "mode": mode})
+    assert response.status_code == 400
+    assert response.get_json()["message"].startswith("Circuit invalide")
+    results = client.post("/solve/batch", json={"items": [{"netlist": netlist, "mode": mode}, {"netlist": "V1 1 0 2\nR1 1 0 1k", "mode": "numeric"}]}).get_json()["results"]
+    assert results[0]["message"].startswith("Circuit invalide")
+    assert results[1]["result"]["solutions"]["i_V1"] == pytest.approx(-0.002)
+
+
+def testBatch(client):
+    items = [
+        {"netlist": "V1 1 0 1\nR1 1 2 1k\nC1 2 0 1u", "inputNode": "1", "outputNode": "2"},
+        {"netlist": "R1 1"},
+        {"netlist": "V1 1 0 2\nR1 1 2 1k\nR2 2 0 1k", "mode": "numeric"},
+        {"inputNode": "1"},
+    ]
+    response = client.post("/solve/batch", json={"items": items})
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert results[0]["result"]["transferFunction"] == "\\frac{1}{C_{1} R_{1} p + 1}"
+    assert results[1]["message"].startswith("Circuit invalide")
+    assert results[2]["result"]["solutions"]["v_2"] == pytest.approx(1.0)
+    assert "result" not in results[3]
+
+
+def testBatchErrors(app, client):
+    assert client.post("/solve/batch", json={"items": "V1 1 0 1"}).status_code == 400
+    app.config['SOLVE_BATCH_MAX'] = 2
+    response = client.post("/solve/batch", json={"items": [{"netlist": "V1 1 0 1\nR1 1 0 1k"}] * 3})
+    assert response.status_code == 413
+
+
+def testStreamNdjson(client):
+    response = client.post("/solve/stream?format=ndjson", json={"netlist": "V1 1 0 1\nR1 1 2 1k\nC1 2 0 1u", "inputNode": "1", "outputNode": "2"})
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [event["stage"] for event in events] == ["parse", "equations", "solutions", "transferFunction", "numeric", "bode", "step", "end"]
+    assert next(event for event in events if event["stage"] == "transferFunction")["transferFunction"] == "\\frac{1}{C_{1} R_{1} p + 1}"
+
+
+def testStreamServerSentEvents(client):
+    response = client.get("/solve/stream", query_string={"netlist": "V1 1 0 2\nR1 1 2 1k\nR2 2 0 1k"})
+    assert response.mimetype == 'text/event-stream' and response.headers['Cache-Control'] == 'no-cache'
+    messages = response.get_data(as_text=True).strip().split("\n\n")
+    stages = [message.split("\n")[0].removeprefix("event: ") for message in messages]
+    assert stages == ["parse", "equations", "solutions", "end"]
+    assert all(json.loads(message.split("\n")[1].removeprefix("data: "))["stage"] == stage for message, stage in zip(messages, stages))
+
+
+def testStreamError(client):
+    lines = client.post("/solve/stream?format=ndjson", json={"netlist": "V1 1 0 1\nV2 1 0 2"}).get_data(as_text=True).splitlines()
+    assert json.loads(lines[-1])["stage"] == "error"
+    assert client.post("/solve/stream", json={"inputNode": "1"}).status_code == 400
+
+
+def testStreamTimeout(app, client):
+    app.extensions['solve_executor'].timeout = 0.001
+    lines = client.post("/solve/stream?format=ndjson", json={"netlist": NETLIST, "inputNode": "1", "outputNode": "3"}).get_data(as_text=True).splitlines()
+    assert json.loads(lines[-1]) == {"stage": "error", "message": "La résolution a dépassé le temps imparti."}
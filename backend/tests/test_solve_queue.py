@@ -0,0 +1,60 @@
+import os
+import socket
+import time
+
+from app import db
+from app.models import SolveJob
+from app.solve_queue import SolveQueue
+
+
+def waitFor(client, jobId, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/solve/jobs/{jobId}").get_json()
+        if job["status"] in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {jobId} still {job['status']} after {timeout} s")
+
+
+def testJobLifecycle(client):
+    response = client.post("/solve/jobs", json={"netlist": "V1 1 0 1\nR1 1 2 1k\nC1 2 0 1u", "inputNode": "1", "outputNode": "2"})
+    assert response.status_code == 202
+    submitted = response.get_json()
+    assert submitted["status"] in ('queued', 'running') # The dispatcher may claim the job before the response is built
+    job = waitFor(client, submitted["id"])
+    assert job["status"] == 'done'
+    assert job["result"]["transferFunction"] == "\\frac{1}{C_{1} R_{1} p + 1}"
+    assert {"queue", "total", "solve"} <= set(job["stages"])
+
+
+def testJobsRunInTurn(client):
+    # More jobs than workers: the dispatcher keeps the extra ones queued, all of them end
+    ids = [client.post("/solve/jobs", json={"netlist": f"V1 1 0 1\nR1 1 2 {i + 1}k\nR2 2 0 1k", "mode": "numeric"}).get_json()["id"] for i in range(4)]
+    jobs = [waitFor(client, jobId) for jobId in ids]
+    assert [job["result"]["solutions"]["v_2"] for job in jobs] == [1 / (i + 2) for i in range(4)]
+
+
+def testFailedJob(client):
+    job = waitFor(client, client.post("/solve/jobs", json={"netlist": "V1 1 0 1\nV2 1 0 2"}).get_json()["id"])
+    assert job["status"] == 'failed'
+    assert job["message"].startswith("ValueError")
+
+
+def testJobErrors(client):
+    assert client.get("/solve/jobs/inconnu").status_code == 404
+    assert client.post("/solve/jobs", json={"netlist": "V1 1 0 1", "mode": "exact"}).status_code == 400
+    assert client.post("/solve/jobs", json={"mode": "numeric"}).status_code == 400
+
+
+def testRecoveryRequeuesTheJobsOfDeadProcesses(app):
+    host = socket.gethostname()
+    with app.app_context():
+        for jobId, worker in (("orphan", f"{host}:999999999"), ("alive", f"{host}:{os.getpid()}"), ("remote", "autre-hote:1")):
+            db.session.add(SolveJob(id=jobId, netlist="V1 1 0 1\nR1 1 0 1k", mode='numeric', status='running', worker=worker, created=time.time(), started=time.time()))
+        db.session.commit()
+        SolveQueue(app, app.extensions['solve_executor'])._recover()
+        statuses = {job.id: (job.status, job.worker) for job in SolveJob.query.all()}
+    # Queued again, possibly already claimed by the dispatcher of this process
+    assert statuses["orphan"] in {('queued', None), ('running', f"{host}:{os.getpid()}")}
+    assert statuses["alive"][0] == statuses["remote"][0] == 'running'
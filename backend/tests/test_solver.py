@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from solver import Circuit, Solver
+
+CIRCUITS = {
+    "rcLowPass": ("V1 1 0 2\nR1 1 2 1k\nC1 2 0 1u", '1', '2'),
+    "rlcSeries": ("V1 1 0 2\nR1 1 2 1k\nL1 2 3 1m\nC1 3 0 1u\nR2 3 0 50", '1', '3'),
+    "bridgedT": ("V1 1 0 1\nR1 1 2 1k\nR2 2 3 1k\nC1 2 0 10n\nC2 1 3 100n\nR3 3 0 10k", '1', '3'),
+    "currentSource": ("I1 0 1 1m\nR1 1 0 1k\nL1 1 2 10m\nR2 2 0 2k\nC1 2 0 1u", '1', '2'),
+}
+POINTS = [0.0, 1j * 1e2, 1j * 1e4, -50 + 3e3j]
+
+
+def substitute(solver, expression, p):
+    values = {solver.knownParameters[name]: value for name, value in solver.paramValues.items() if name in solver.knownParameters}
+    values[solver.knownParameters["p"]] = p
+    return complex(expression.subs(values))
+
+
+@pytest.mark.parametrize("name", CIRCUITS)
+def testNumericMNAMatchesTheSymbolicSolution(name):
+    netlist, _, _ = CIRCUITS[name]
+    symbolic = Solver(Circuit(netlist))
+    symbolic.initializeParamValues()
+    numeric = Solver(Circuit(netlist), mode='numeric')
+    for p in POINTS:
+        solution = numeric.getNumericalSolution(p)
+        assert set(solution) == {str(unknown) for unknown in symbolic.solutions}
+        for unknown, expression in symbolic.solutions.items():
+            expected = substitute(symbolic, expression, p)
+            assert np.isclose(solution[str(unknown)], expected, rtol=1e-9, atol=1e-15), (unknown, p)
+
+
+@pytest.mark.parametrize("name", CIRCUITS)
+def testTransferFunctions(name):
+    netlist, inputNode, outputNode = CIRCUITS[name]
+    symbolic = Solver(Circuit(netlist))
+    numerator, denominator = symbolic.getNumericalTransferFunction(inputNode, outputNode)
+    numeric = Solver(Circuit(netlist), mode='numeric')
+    for p in POINTS[1:]:
+        expected = np.polyval(numerator, p) / np.polyval(denominator, p)
+        assert np.isclose(numeric.evaluateTransferFunction(inputNode, outputNode, p), expected, rtol=1e-9)
+        assert np.isclose(substitute(symbolic, symbolic.getTransferFunction(inputNode, outputNode), p), expected, rtol=1e-9)
+
+
+@pytest.mark.parametrize("name", CIRCUITS)
+def testLazyModeSolvesTheSameUnknowns(name):
+    netlist, inputNode, outputNode = CIRCUITS[name]
+    eager, lazy = Solver(Circuit(netlist)), Solver(Circuit(netlist), lazy=True)
+    assert (lazy.getTransferFunction(inputNode, outputNode) - eager.getTransferFunction(inputNode, outputNode)).equals(0)
+
+
+def testRLCSeriesClosedForm():
+    solver = Solver(Circuit("V1 1 0 SYMBOLIC\nR1 1 2 SYMBOLIC\nL1 2 3 SYMBOLIC\nC1 3 0 SYMBOLIC"))
+    R, L, C, p = (solver.knownParameters[name] for name in ("R1", "L1", "C1", "p"))
+    assert (solver.getTransferFunction('1', '3') - 1 / (L * C * p**2 + R * C * p + 1)).equals(0)
+
+
+def testNumericModeNeedsEveryValue():
+    with pytest.raises(ValueError):
+        Solver(Circuit("V1 1 0 1\nR1 1 2 SYMBOLIC\nC1 2 0 1u"), mode='numeric').getNumericalSolution()
+
+
+def testArraysAreASnapshotOfTheComponents():
+    circuit = Circuit(CIRCUITS["rlcSeries"][0])
+    arrays = circuit.getArrays()
+    assert arrays.names == [component.name for component in circuit.components]
+    assert arrays.values.tolist() == [component.value for component in circuit.components]
+    with pytest.raises(ValueError):
+        arrays.values[1] = 2e3
+    # A change goes through the component, then the view is rebuilt
+    circuit.components[1].value = 2e3
+    circuit.arrays = None
+    assert circuit.getArrays().values[1] == 2e3
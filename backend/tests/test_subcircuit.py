@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from solver import Circuit, Solver, SubcircuitDefinition
+
+RC_CELL = ".SUBCKT CELL in out\nR1 in mid 1k\nR2 mid out 2k\nC1 out 0 1u\n.ENDS"
+# Non-inverting amplifier of gain 1 + RF/RG, its output driven by the opamp
+AMPLIFIER = ".SUBCKT AMP in out\nO1 in minus out\nRG minus 0 1k\nRF out minus 3k\n.ENDS"
+POINTS = [0.0, 1j * 1e2, 1j * 1e3, 1j * 1e4]
+
+
+def transferFunctions(netlist, inputNode, outputNode):
+    symbolic, numeric = Solver(Circuit(netlist)), Solver(Circuit(netlist), mode='numeric')
+    return [(symbolic.evaluateTransferFunction(inputNode, outputNode, p), numeric.evaluateTransferFunction(inputNode, outputNode, p)) for p in POINTS]
+
+
+@pytest.mark.parametrize("netlist, flat, inputNode, outputNode", [
+    (f"{RC_CELL}\nV1 1 0 1\nX1 1 2 CELL\nX2 2 3 CELL",
+     "V1 1 0 1\nR1 1 a 1k\nR2 a 2 2k\nC1 2 0 1u\nR3 2 b 1k\nR4 b 3 2k\nC2 3 0 1u", '1', '3'),
+    (f"{AMPLIFIER}\n{RC_CELL}\nV1 1 0 1\nX1 1 2 CELL\nX2 2 3 AMP\nR1 3 0 10k",
+     "V1 1 0 1\nR1 1 a 1k\nR2 a 2 2k\nC1 2 0 1u\nO1 2 m 3\nRG m 0 1k\nRF 3 m 3k\nR3 3 0 10k", '1', '3'),
+    (f"{RC_CELL}\n.SUBCKT TWO a b\nX1 a m CELL\nX2 m b CELL\n.ENDS\nV1 1 0 1\nX1 1 2 TWO\nR1 2 0 5k",
+     "V1 1 0 1\nR1 1 a 1k\nR2 a m 2k\nC1 m 0 1u\nR3 m b 1k\nR4 b 2 2k\nC2 2 0 1u\nR5 2 0 5k", '1', '2'),
+])
+def testSubcircuitMatchesTheFlattenedCircuit(netlist, flat, inputNode, outputNode):
+    # Symbolic port model and numeric flattening against the same circuit written out by hand
+    expected = [value for value, _ in transferFunctions(flat, inputNode, outputNode)]
+    for (symbolic, numeric), reference in zip(transferFunctions(netlist, inputNode, outputNode), expected):
+        assert symbolic == pytest.approx(reference, rel=1e-9, abs=1e-12)
+        assert numeric == pytest.approx(reference, rel=1e-9, abs=1e-12)
+
+
+def testInstancesShareTheSymbolsOfTheDefinition():
+    solver = Solver(Circuit(f"{RC_CELL}\nV1 1 0 1\nX1 1 2 CELL\nX2 2 3 CELL"))
+    assert {'CELL.R1', 'CELL.R2', 'CELL.C1'} <= set(solver.knownParameters)
+    assert {'i_X1.IN', 'i_X1.OUT', 'i_X2.IN', 'i_X2.OUT'} <= {str(unknown) for unknown in solver.solutions}
+    assert sorted(map(str, solver.getTransferFunction('1', '3').free_symbols)) == ['CELL.C1', 'CELL.R1', 'CELL.R2', 'p']
+
+
+def testPortModelIsReducedOnce():
+    SubcircuitDefinition._models.clear()
+    for netlist in (f"{RC_CELL}\nV1 1 0 1\nX1 1 2 CELL\nX2 2 3 CELL", f"{RC_CELL}\nV1 1 0 2\nX1 1 2 CELL\nR1 2 0 1k"):
+        Solver(Circuit(netlist))
+    assert len(SubcircuitDefinition._models) == 1
+
+
+def testNumericSolutionOfTheFlattenedInstances():
+    solution = Solver(Circuit(f"{RC_CELL}\nV1 1 0 3\nX1 1 2 CELL\nR1 2 0 3k"), mode='numeric').getNumericalSolution()
+    assert solution['v_2'] == pytest.approx(1.5)
+    assert solution['i_V1'] == pytest.approx(-0.5e-3)
+
+
+@pytest.mark.parametrize("netlist, message", [
+    ("V1 1 0 1\nX1 1 2 NOWHERE", "NOWHERE"),
+    (".SUBCKT LOOP a b\nX1 a b LOOP\n.ENDS\nV1 1 0 1\nX1 1 2 LOOP", "instantiates itself"),
+    (".SUBCKT G a 0\nR1 a 0 1k\n.ENDS", "ground"),
+    (".SUBCKT A a b\n.SUBCKT B a b\n.ENDS\n.ENDS", "Nested"),
+    ("V1 1 0 1\n.ENDS", ".ENDS without .SUBCKT"),
+    (f"{RC_CELL}\n{RC_CELL}", "already defined"),
+])
+def testSubcircuitErrors(netlist, message):
+    with pytest.raises(ValueError, match=message):
+        Circuit(netlist)
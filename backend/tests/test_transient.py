@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from analysis import TransientAnalysis, Step, Sine
+from solver import Circuit, Solver
+
+R, C, L = 1e3, 1e-6, 1e-3
+
+
+def analysis(netlist, **kwargs):
+    return TransientAnalysis.fromSolver(Solver(Circuit(netlist), mode='numeric'), **kwargs)
+
+
+@pytest.mark.parametrize("denseLimit", [1000, 0]) # Blocked dense products, sparse LU per step
+@pytest.mark.parametrize("method", ['trapezoidal', 'euler'])
+def testRCStepResponse(denseLimit, method):
+    transient = analysis("V1 1 0 0\nR1 1 2 1k\nC1 2 0 1u", method=method, denseLimit=denseLimit)
+    t, waveforms = transient.run(5 * R * C, R * C / 1000, {'V1': Step(1.0)}, ['v_2', 'i_V1'])
+    # Both methods are within a step of the closed form (the trapezoidal rule lags half a step behind the discontinuity)
+    assert np.max(np.abs(waveforms['v_2'] - (1 - np.exp(-t / (R * C))))) < 1e-3
+    # The source current is minus the capacitor charging current
+    assert np.max(np.abs(waveforms['i_V1'][2:] + np.exp(-t[2:] / (R * C)) / R)) < 1e-3 / R
+
+
+def testRLStepResponse():
+    transient = analysis("V1 1 0 0\nR1 1 2 1k\nL1 2 0 1m")
+    t, waveforms = transient.run(5 * L / R, L / R / 1000, {'V1': Step(1.0)}, ['v_2', 'i_L1'])
+    assert np.max(np.abs(waveforms['v_2'][2:] - np.exp(-t[2:] * R / L))) < 1e-3
+    assert np.max(np.abs(waveforms['i_L1'] - (1 - np.exp(-t * R / L)) / R)) < 1e-3 / R
+
+
+def testTrapezoidalConvergesInTheSecondOrder():
+    # Delayed by half a step, the step lands between two time points: the trapezoidal error falls as the step squared
+    errors = []
+    for step in (R * C / 100, R * C / 1000):
+        t, waveforms = analysis("V1 1 0 0\nR1 1 2 1k\nC1 2 0 1u").run(5 * R * C, step, {'V1': Step(1.0, delay=step / 2)}, ['v_2'])
+        exact = np.where(t > step / 2, 1 - np.exp(-(t - step / 2) / (R * C)), 0.0)
+        errors.append(np.max(np.abs(waveforms['v_2'][2:] - exact[2:])))
+    assert errors[1] < errors[0] / 50
+
+
+def testStartsFromTheOperatingPoint():
+    transient = analysis("V1 1 0 2\nR1 1 2 1k\nC1 2 0 1u")
+    t, waveforms = transient.run(R * C, R * C / 100, outputs=['v_2', 'v_0'])
+    assert np.allclose(waveforms['v_2'], 2.0)
+    assert not np.any(waveforms['v_0'])
+
+
+@pytest.mark.parametrize("sections", [3, 40])
+def testDenseAndSparsePathsAgree(sections):
+    netlist = "\n".join(["V1 1 0 0"] + [f"R{i} {i} {i + 1} 1k\nC{i} {i + 1} 0 1n" for i in range(1, sections + 1)])
+    waveforms = {'V1': Sine(0.0, 1.0, 1e5)}
+    _, dense = analysis(netlist, denseLimit=1000).run(1e-4, 1e-7, waveforms)
+    _, sparse = analysis(netlist, denseLimit=0).run(1e-4, 1e-7, waveforms)
+    for label in dense:
+        assert np.allclose(dense[label], sparse[label], rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("steps", [1, 2, 17, 100, 1001])
+def testPropagateMatchesTheStepByStepRecurrence(steps):
+    rng = np.random.default_rng(steps)
+    M = rng.normal(size=(6, 6))
+    M /= 1.1 * np.max(np.abs(np.linalg.eigvals(M))) # Stable
+    x0, Y = rng.normal(size=6), rng.normal(size=(steps, 6))
+    expected, x = np.empty((steps, 6)), x0
+    for k in range(steps):
+        x = M @ x + Y[k]
+        expected[k] = x
+    assert np.allclose(TransientAnalysis.propagate(M, x0, Y), expected)
+
+
+def testInvalidArguments():
+    transient = analysis("V1 1 0 1\nR1 1 2 1k\nC1 2 0 1u")
+    with pytest.raises(ValueError):
+        transient.run(1e-3, 1e-6, {'V2': Step()})
+    with pytest.raises(ValueError):
+        transient.run(1e-3, 1e-6, outputs=['v_9'])
+    with pytest.raises(ValueError):
+        transient.run(1e-3, 0.0)
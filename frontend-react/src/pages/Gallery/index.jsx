@@ -5,7 +5,6 @@ import styled from 'styled-components';
 import colors from '../../utils/style/colors.js';
 
 import { useState, useEffect } from 'react';
-import { useFetch } from '../../utils/hooks/index.js';
 
 import { Link } from 'react-router-dom';
 
@@ -75,6 +74,7 @@ const Card = styled.div`
     background: #fff;
     box-shadow: 0px 4px 6px rgba(0, 0, 0, 0.1);
     transition: transform 0.3s, box-shadow 0.3s;
+    cursor: pointer;
 
     &:hover {
         transform: translateY(-5px);
@@ -103,11 +103,83 @@ const CircuitDetails = styled.p`
     color: #555;
 `;
 
+const MoreButton = styled.button`
+    display: block;
+    margin: 20px auto;
+    padding: 10px 20px;
+    border: none;
+    border-radius: 5px;
+    background: #34495e;
+    color: white;
+    cursor: pointer;
+`;
+
+// Champs des cartes : la description et la netlist ne sont téléchargées qu'à l'ouverture d'une carte
+const GALLERY_FIELDS = 'id,nom,image,auteur,date';
+const DETAIL_FIELDS = 'description,netlist';
+const PAGE_SIZE = 24;
+
 function Gallery() {
-    const { data, isLoading, error } = useFetch(
-        // 'http://localhost:8000/freelances'
-        '/api/galerie/' // <== Utilisation du proxy
-    );
+    const [data, setData] = useState([]);
+    const [cursor, setCursor] = useState(null);
+    const [isLoading, setLoading] = useState(true);
+    const [error, setError] = useState(false);
+    const [openedId, setOpenedId] = useState(null);
+    const [details, setDetails] = useState({});
+
+    // Pagination par curseur : le serveur indique la page suivante dans l'en-tête X-Next-Cursor
+    async function loadPage(after) {
+        setLoading(true);
+        try {
+            const params = new URLSearchParams({
+                fields: GALLERY_FIELDS,
+                limit: PAGE_SIZE,
+            });
+            if (after) params.set('cursor', after);
+            const response = await fetch(`/api/galerie/?${params}`); // <== Utilisation du proxy
+            if (!response.ok) {
+                throw new Error(`Erreur ${response.status} de la galerie`);
+            }
+            const page = await response.json();
+            if (!Array.isArray(page)) {
+                throw new Error('Réponse inattendue de la galerie');
+            }
+            setData((previous) => (after ? [...previous, ...page] : page));
+            setCursor(response.headers.get('X-Next-Cursor'));
+        } catch (err) {
+            console.log(err);
+            setError(true);
+        } finally {
+            setLoading(false);
+        }
+    }
+
+    // Ouverture d'une carte : détail du circuit demandé une seule fois puis gardé en mémoire
+    async function toggleCircuit(id) {
+        if (openedId === id) {
+            setOpenedId(null);
+            return;
+        }
+        setOpenedId(id);
+        if (details[id]) return;
+        try {
+            const response = await fetch(
+                `/api/galerie/${id}?fields=${DETAIL_FIELDS}`
+            );
+            if (!response.ok) {
+                throw new Error(`Erreur ${response.status} du circuit ${id}`);
+            }
+            const circuit = await response.json();
+            setDetails((previous) => ({ ...previous, [id]: circuit }));
+        } catch (err) {
+            console.log(err);
+            setError(true);
+        }
+    }
+
+    useEffect(() => {
+        loadPage(null);
+    }, []);
     // const freelancesData = data?.freelancersList || [];
 
     // freelancesData.map((freelancer) => {
@@ -140,45 +212,63 @@ function Gallery() {
                     Parcourez les circuits disponibles dans la collection.
                 </p>
 
-                {isLoading ? (
+                {isLoading && data.length === 0 ? (
                     <div style={{ textAlign: 'center', marginTop: '50px' }}>
                         <Loader /> {/* Assurez-vous que Loader est défini */}
                     </div>
                 ) : (
                     <GridContainer>
                         {data.map((circuit) => (
-                            <Card key={circuit.id}>
+                            <Card
+                                key={circuit.id}
+                                onClick={() => toggleCircuit(circuit.id)}
+                            >
                                 <CircuitName>{circuit.nom}</CircuitName>
                                 <Image
                                     src={`/api/uploads/${circuit.image}`} // Chemin dynamique pour l'image
                                     alt={circuit.nom}
                                 />
-                                <CircuitDetails>
-                                    <strong>Description :</strong>{' '}
-                                    {circuit.description}
-                                </CircuitDetails>
                                 <CircuitDetails>
                                     <strong>Auteur :</strong> {circuit.auteur}
                                 </CircuitDetails>
                                 <CircuitDetails>
                                     <strong>Date :</strong> {circuit.date}
                                 </CircuitDetails>
-                                <CircuitDetails>
-                                    <strong>Netlist :</strong>
-                                    <pre
-                                        style={{
-                                            background: '#f9f9f9',
-                                            padding: '10px',
-                                            borderRadius: '5px',
-                                        }}
-                                    >
-                                        {circuit.netlist}
-                                    </pre>
-                                </CircuitDetails>
+                                {openedId === circuit.id &&
+                                    (details[circuit.id] ? (
+                                        <>
+                                            <CircuitDetails>
+                                                <strong>Description :</strong>{' '}
+                                                {details[circuit.id].description}
+                                            </CircuitDetails>
+                                            <CircuitDetails>
+                                                <strong>Netlist :</strong>
+                                                <pre
+                                                    style={{
+                                                        background: '#f9f9f9',
+                                                        padding: '10px',
+                                                        borderRadius: '5px',
+                                                    }}
+                                                >
+                                                    {details[circuit.id].netlist}
+                                                </pre>
+                                            </CircuitDetails>
+                                        </>
+                                    ) : (
+                                        <Loader />
+                                    ))}
                             </Card>
                         ))}
                     </GridContainer>
                 )}
+                {cursor && (
+                    <MoreButton
+                        onClick={() => loadPage(cursor)}
+                        disabled={isLoading}
+                    >
+                        {isLoading ? 'Chargement...' : 'Voir plus'}
+                    </MoreButton>
+                )}
             </div>
         </>
     );